@@ -0,0 +1,49 @@
+"""
+Compares the throughput of the thread and async fetch engines of the Producer
+against a local stand-in HTTP server.
+
+Usage:
+    python benchmarks/bench_engines.py [--urls 500] [--latency 0.05]
+"""
+
+import argparse
+import logging
+import os
+import queue
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from producer import Producer  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+
+
+def run_engine(engine, urls, max_concurrency):
+    """Runs one Producer over `urls` and returns (elapsed seconds, pages fetched)."""
+    shared_queue = queue.Queue()
+    producer = Producer(shared_queue, urls, engine=engine, max_concurrency=max_concurrency)
+    start = time.perf_counter()
+    producer.run()
+    return time.perf_counter() - start, producer.successful_fetches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=500, help="Number of URLs to fetch per engine.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Server delay per request in seconds.")
+    parser.add_argument("--max-concurrency", type=int, default=500, help="Concurrency of the async engine.")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with StubServer(latency=args.latency) as server:
+        urls = [f"{server.base_url}/page/{i}" for i in range(args.urls)]
+        for engine in Producer.ENGINES:
+            elapsed, fetched = run_engine(engine, urls, args.max_concurrency)
+            print(f"{engine:>6}: {fetched}/{len(urls)} pages in {elapsed:.2f}s "
+                  f"({fetched / elapsed:.1f} pages/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Builds a synthetic link graph with `LinkGraphWriter` and times queries on it
+through `LinkGraph`.
+
+Link targets are drawn log-uniformly, a power law as on the web, so that a
+few URLs have very many in-links. The report shows the build rate, the size
+on disk, the latency of each query and how much the resident memory grew
+while opening and querying the graph: only the file pages a query touches
+are mapped in, as the files are memory-mapped rather than loaded.
+
+Usage:
+    python benchmarks/bench_graph.py [--pages 100000] [--links 50] [--urls 1000000] [--dir DIR]
+"""
+
+import argparse
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from link_graph import LinkGraph, LinkGraphWriter  # noqa: E402
+
+
+def url_for(index):
+    return f"https://site{index % 5000}.example.com/page/{index}"
+
+
+def build(directory, pages, links, urls, seed=0):
+    """Writes the synthetic graph and returns the seconds it took."""
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    with LinkGraphWriter(directory) as writer:
+        for page in range(pages):
+            targets = {int(urls ** rng.random()) - 1 for _ in range(links)}
+            writer.add(url_for(page), [url_for(target) for target in targets])
+    return time.perf_counter() - start
+
+
+def rss_mb():
+    """Returns the current resident set size in MB, or 0 where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 1e6
+    except OSError:
+        return 0.0
+
+
+def timed(label, function, repeat=100):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    print(f"{label:>28}: {(time.perf_counter() - start) / repeat * 1e3:8.3f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100000, help="Pages with out-links.")
+    parser.add_argument("--links", type=int, default=50, help="Links drawn per page, before deduplication.")
+    parser.add_argument("--urls", type=int, default=1000000, help="Number of distinct link targets.")
+    parser.add_argument("--dir", help="Graph directory to keep; by default a temporary one is removed.")
+    args = parser.parse_args()
+
+    directory = args.dir or tempfile.mkdtemp(prefix="bench_graph_")
+    try:
+        seconds = build(directory, args.pages, args.links, args.urls)
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        before = rss_mb()
+        with LinkGraph(directory) as graph:
+            print(f"Graph: {len(graph)} URLs, {graph.edges} links, {size / 1e6:.1f} MB on disk, "
+                  f"{len(graph.segments)} segments")
+            print(f"Build: {graph.edges / seconds:,.0f} links/sec")
+            hub = graph.top_linked(1)[0][0]
+            timed("out_links(page)", lambda: graph.out_links(url_for(args.pages // 2)))
+            in_links = timed("in_links(most-linked URL)", lambda: graph.in_links(hub), repeat=3)
+            timed("in_degree(most-linked URL)", lambda: graph.in_degree(hub))
+            timed("top_linked(100)", lambda: graph.top_linked(100))
+            timed("domain_counts(10)", lambda: graph.domain_counts(10))
+            print(f"Most-linked URL has {len(in_links)} in-links; RSS grew by {rss_mb() - before:.1f} MB "
+                  f"while querying")
+    finally:
+        if not args.dir:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Reports links/sec of link resolution and canonicalisation.
+
+A synthetic site of pages is generated in which, as on real sites, most links
+are shared navigation, some are relative links to pages in the same directory
+and the rest point elsewhere, some with tracking parameters. Every page is
+resolved with `links.resolve_links` and, for comparison, with a plain
+`urljoin` + `urlsplit` pipeline that canonicalises every link from scratch.
+
+Usage:
+    python benchmarks/bench_links.py [--pages 2000] [--links 100]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from links import resolve_links  # noqa: E402
+
+
+def make_site(pages, links, seed=0):
+    """Returns a list of (page URL, base href, hrefs) tuples."""
+    rng = random.Random(seed)
+    navigation = [f"/section/{i}/" for i in range(40)] + ["/", "/about", "/contact?utm_source=nav", "#top"]
+    site = []
+    for page in range(pages):
+        directory = f"/articles/{page % 50}/"
+        hrefs = rng.sample(navigation, min(len(navigation), links // 2))
+        while len(hrefs) < links:
+            kind = rng.random()
+            if kind < 0.5:
+                hrefs.append(f"story-{rng.randrange(pages)}.html")
+            elif kind < 0.8:
+                hrefs.append(f"https://News.example.org/{rng.randrange(pages)}?ref=a&utm_medium=b")
+            else:
+                hrefs.append(f"../tags/{rng.randrange(100)}/")
+        site.append((f"https://www.example.com{directory}{page}.html", None, hrefs))
+    return site
+
+
+def naive_resolve(hrefs, page_url, base_href=None):
+    """Resolves and canonicalises every link from scratch with urljoin and urlsplit."""
+    base = urljoin(page_url, base_href) if base_href else page_url
+    seen = set()
+    links = []
+    for href in hrefs:
+        parts = urlsplit(urljoin(base, href.strip()))
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            continue
+        query = "&".join(p for p in parts.query.split("&") if p and not p.lower().startswith("utm_"))
+        url = urlunsplit((parts.scheme, parts.netloc.lower(), parts.path or "/", query, ""))
+        if url != page_url and url not in seen:
+            seen.add(url)
+            links.append(url)
+    return links
+
+
+def bench(resolve, site):
+    """Returns links/sec for resolving every page of the site."""
+    total = 0
+    start = time.perf_counter()
+    for page_url, base_href, hrefs in site:
+        resolve(hrefs, page_url, base_href)
+        total += len(hrefs)
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000, help="Number of pages in the synthetic site.")
+    parser.add_argument("--links", type=int, default=100, help="Links per page.")
+    args = parser.parse_args()
+
+    site = make_site(args.pages, args.links)
+    print(f"Site: {args.pages} pages, {args.pages * args.links} links")
+    for name, resolve in [("naive", naive_resolve), ("resolve_links", resolve_links)]:
+        links_per_sec = bench(resolve, site)
+        print(f"{name:>13}: {links_per_sec:10.0f} links/sec ({links_per_sec * 60 / 1e6:5.1f} million/min)")
+
+
+if __name__ == "__main__":
+    main()
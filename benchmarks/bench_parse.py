@@ -0,0 +1,74 @@
+"""
+Reports pages/sec and peak memory of every link-extraction backend.
+
+Each backend parses the HTML fixtures from tests/fixtures/html plus a synthetic
+multi-megabyte page. Peak memory is measured with tracemalloc in a separate pass
+so that tracing does not slow down the timed run.
+
+Usage:
+    python benchmarks/bench_parse.py [--repeat 20] [--large-links 20000]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from extractors import EXTRACTORS, get_extractor  # noqa: E402
+
+
+def load_corpus(large_links):
+    """Returns a list of HTML documents: the test fixtures plus one large synthetic page."""
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "tests", "fixtures", "html", "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            corpus.append(f.read())
+    rows = "".join(
+        f'<div class="row"><p>Paragraph {i} with some <b>filler</b> text.</p>'
+        f'<a href="https://example.com/page/{i}" class="link">Link {i}</a></div>\n'
+        for i in range(large_links)
+    )
+    corpus.append(f"<html><body>{rows}</body></html>")
+    return corpus
+
+
+def bench_backend(name, corpus, repeat):
+    """Returns (pages/sec, peak bytes) for one backend over the corpus."""
+    extractor = get_extractor(name)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html_content in corpus:
+            extractor.extract(html_content)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    for html_content in corpus:
+        extractor.extract(html_content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return repeat * len(corpus) / elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="Number of passes over the corpus.")
+    parser.add_argument("--large-links", type=int, default=20000, help="Links in the synthetic large page.")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.large_links)
+    size_mb = sum(len(html_content) for html_content in corpus) / 1e6
+    print(f"Corpus: {len(corpus)} pages, {size_mb:.1f} MB")
+    for name in EXTRACTORS:
+        pages_per_sec, peak = bench_backend(name, corpus, args.repeat)
+        print(f"{name:>9}: {pages_per_sec:8.1f} pages/sec, peak memory {peak / 1e6:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
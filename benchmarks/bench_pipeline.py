@@ -0,0 +1,298 @@
+"""
+End-to-end benchmark of the Producer -> queue -> Consumer pipeline.
+
+Each scenario starts a synthetic site (see stub_server.py) and runs the real
+pipeline through `main.main` against it in a fresh process, so that peak RSS,
+CPU time and metrics belong to that scenario alone. It reports pages/sec,
+p50/p99 fetch latency, p50/p99 latency per stage, peak RSS and CPU time per
+stage, and writes everything to a JSON file so runs can be compared across
+commits.
+
+CPU per stage is measured per thread: "fetch" is the producer and its fetch
+workers, "consume" is the consumer thread (queue handling and output, plus
+parsing when --processes is 1) and "parse" is the parsing processes.
+Latency quantiles are estimated from the metrics histograms. With --suite,
+the startup measurements of bench_startup.py are recorded too.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--pages 500] [--latency 0.02] [--page-bytes 65536]
+    python benchmarks/bench_pipeline.py --suite --results new.json --baseline old.json
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SRC = os.path.join(ROOT, "src")
+sys.path.insert(0, SRC)
+
+import bench_startup  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+
+DEFAULTS = {
+    "pages": 500,
+    "latency": 0.02,
+    "links": 50,
+    "page_bytes": 16 * 1024,
+    "error_rate": 0.0,
+    "encodings": ["utf-8"],
+    "seed": 0,
+    "engine": "thread",
+    "threads": 20,
+    "max_concurrency": 200,
+    "processes": 2,
+    "extractor": "soup",
+}
+
+SUITE = {
+    "baseline": {},
+    "large-pages": {"page_bytes": 512 * 1024, "links": 500, "pages": 200},
+    "link-dense": {"links": 2000},
+    "errors": {"error_rate": 0.1},
+    "encodings": {"encodings": ["utf-8", "latin-1", "shift_jis", "undeclared"]},
+    "async": {"engine": "async"},
+    "stream-extractor": {"extractor": "stream"},
+}
+
+STAGES = ("connect", "first_byte", "download", "queue_wait", "parse", "output")
+FETCH_THREAD_PREFIXES = ("ProducerThread", "FetchWorker", "asyncio_")
+HARNESS_THREADS = ("MainThread", "CPUSampler")
+
+
+class ThreadCPUSampler:
+    """Samples the CPU clock of every thread of the process until stopped."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.cpu = {}
+        self.initial = {}
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="CPUSampler", daemon=True)
+
+    def sample(self):
+        for thread in threading.enumerate():
+            try:
+                seconds = time.clock_gettime(time.pthread_getcpuclockid(thread.ident))
+            except (OSError, TypeError):
+                continue  # The thread exited or has not started yet.
+            self.cpu[thread] = seconds
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.sample()
+        self.initial = dict(self.cpu)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        self.sample()
+
+    def by_stage(self):
+        """
+        Returns the CPU seconds sampled for each stage. Threads that exited lose
+        at most one sampling interval.
+
+        Returns:
+        - dict: CPU seconds of the "fetch", "consume" and "harness" threads.
+        """
+        stages = {"fetch": 0.0, "consume": 0.0, "harness": 0.0}
+        for thread, seconds in self.cpu.items():
+            seconds -= self.initial.get(thread, 0.0)
+            if thread.name.startswith(FETCH_THREAD_PREFIXES):
+                stages["fetch"] += seconds
+            elif thread.name in HARNESS_THREADS:
+                stages["harness"] += seconds
+            else:
+                stages["consume"] += seconds
+        return stages
+
+
+def build_argv(config, url_file, output_file, log_file):
+    """Returns the command line for `main.main` that runs one scenario."""
+    # The whole site is a single host, so the per-host limit would otherwise cap every run at its default of 2.
+    max_per_host = config["max_concurrency"] if config["engine"] == "async" else config["threads"]
+    return [
+        url_file, "-o", output_file,
+        "--log-file", log_file,
+        "--engine", config["engine"],
+        "--threads", str(config["threads"]),
+        "--max-concurrency", str(config["max_concurrency"]),
+        "--max-per-host", str(max_per_host),
+        "--processes", str(config["processes"]),
+        "--extractor", config["extractor"],
+    ]
+
+
+def run_pipeline(config, base_url, start_method, results):
+    """
+    Runs one scenario in the current (fresh) process and puts its measurements on `results`.
+
+    Args:
+    - config (dict): The scenario settings.
+    - base_url (str): Address of the synthetic site.
+    - start_method (str): Start method the parsing processes would use outside the benchmark.
+    - results (multiprocessing.Queue): Receives the measurements.
+    """
+    # A spawned process makes "spawn" its default; restore the usual one for the consumer's pool.
+    multiprocessing.set_start_method(start_method, force=True)
+    # Imported here, as this module's own `main` is the benchmark's entry point.
+    import main
+    import metrics
+
+    with tempfile.TemporaryDirectory() as workdir:
+        url_file = os.path.join(workdir, "urls.txt")
+        with open(url_file, "w") as f:
+            f.writelines(f"{base_url}/page/{i}\n" for i in range(config["pages"]))
+        output_file = os.path.join(workdir, "links.jsonl")
+
+        logging.disable(logging.CRITICAL)
+        sampler = ThreadCPUSampler()
+        sampler.start()
+        usage_before = resource.getrusage(resource.RUSAGE_SELF)
+        start = time.perf_counter()
+        main.main(build_argv(config, url_file, output_file, os.path.join(workdir, "main.log")))
+        elapsed = time.perf_counter() - start
+        sampler.stop()
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    stage_histograms = {metric.labels["stage"]: metric for metric in metrics.REGISTRY.metrics
+                        if metric.name == "webextractor_stage_seconds"}
+    cpu = sampler.by_stage()
+    cpu["parse"] = children.ru_utime + children.ru_stime
+    cpu["process_total"] = (usage.ru_utime - usage_before.ru_utime) + (usage.ru_stime - usage_before.ru_stime)
+    results.put({
+        "elapsed_seconds": round(elapsed, 3),
+        "pages_fetched": metrics.PAGES_FETCHED.value,
+        "pages_parsed": metrics.PAGES_PARSED.value,
+        "fetch_errors": metrics.FETCH_ERRORS.value,
+        "bytes_fetched": metrics.BYTES_FETCHED.value,
+        "links_extracted": metrics.LINKS_EXTRACTED.value,
+        "pages_per_second": round(metrics.PAGES_PARSED.value / elapsed, 2),
+        "fetch_latency": {"p50": quantile(metrics.FETCH_SECONDS, 0.5), "p99": quantile(metrics.FETCH_SECONDS, 0.99)},
+        "stage_latency": {stage: {"p50": quantile(stage_histograms[stage], 0.5),
+                                  "p99": quantile(stage_histograms[stage], 0.99)} for stage in STAGES},
+        # ru_maxrss is in kilobytes on Linux; RUSAGE_CHILDREN reports the largest child.
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+        "peak_child_rss_mb": round(children.ru_maxrss / 1024, 1),
+        "cpu_seconds": {stage: round(seconds, 3) for stage, seconds in cpu.items()},
+    })
+
+
+def quantile(histogram, q):
+    value = histogram.quantile(q)
+    return None if value is None else round(value, 6)
+
+
+def run_scenario(name, config):
+    """
+    Serves the scenario's synthetic site and runs the pipeline against it in a new process.
+
+    Args:
+    - name (str): Scenario name.
+    - config (dict): The scenario settings.
+
+    Returns:
+    - dict: The scenario name, settings and measurements.
+    """
+    start_method = multiprocessing.get_start_method()
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    with StubServer(latency=config["latency"], links=config["links"], page_bytes=config["page_bytes"],
+                    error_rate=config["error_rate"], encodings=config["encodings"], seed=config["seed"]) as server:
+        process = context.Process(target=run_pipeline, args=(config, server.base_url, start_method, results), name=name)
+        process.start()
+        measurements = results.get()
+        process.join()
+    return {"name": name, "config": config, "results": measurements}
+
+
+def git_commit():
+    """Returns the commit being benchmarked, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_scenario(scenario, baseline=None):
+    results = scenario["results"]
+    latency = results["fetch_latency"]
+    cpu = results["cpu_seconds"]
+    line = (f"{scenario['name']:>16}: {results['pages_per_second']:8.1f} pages/sec, "
+            f"fetch p50 {1000 * (latency['p50'] or 0):6.1f} ms p99 {1000 * (latency['p99'] or 0):6.1f} ms, "
+            f"RSS {results['peak_rss_mb']:6.1f} MB, CPU fetch {cpu['fetch']:.2f}s "
+            f"consume {cpu['consume']:.2f}s parse {cpu['parse']:.2f}s, errors {results['fetch_errors']}")
+    if baseline is not None and baseline["results"]["pages_per_second"]:
+        change = results["pages_per_second"] / baseline["results"]["pages_per_second"] - 1
+        line += f" ({change:+.1%} pages/sec vs baseline)"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", action="store_true", help="Run the standard scenarios instead of a single one.")
+    parser.add_argument("--pages", type=int, help="Number of pages per scenario.")
+    parser.add_argument("--latency", type=float, help="Server delay per request in seconds.")
+    parser.add_argument("--links", type=int, help="Links per page.")
+    parser.add_argument("--page-bytes", type=int, help="Minimum size of each page.")
+    parser.add_argument("--error-rate", type=float, help="Fraction of pages that fail with a 503.")
+    parser.add_argument("--encodings", nargs="+", help='Page encodings, "undeclared" omits the charset.')
+    parser.add_argument("--seed", type=int, help="Seed for the failing pages and per-page encodings.")
+    parser.add_argument("--engine", choices=("thread", "async"), help="Producer fetch engine.")
+    parser.add_argument("--threads", type=int, help="Fetch threads of the thread engine.")
+    parser.add_argument("--max-concurrency", type=int, help="Concurrency of the async engine.")
+    parser.add_argument("--processes", type=int, help="Parsing processes.")
+    parser.add_argument("--extractor", help="Link-extraction backend.")
+    parser.add_argument("--results", default="bench_pipeline.json", help="JSON file to write the results to.")
+    parser.add_argument("--baseline", help="Results file of an earlier run to compare against.")
+    args = parser.parse_args()
+
+    overrides = {key: value for key, value in vars(args).items() if key in DEFAULTS and value is not None}
+    scenarios = SUITE if args.suite else {"custom": {}}
+    baseline = {}
+    baseline_startup = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline_report = json.load(f)
+        baseline = {scenario["name"]: scenario for scenario in baseline_report["scenarios"]}
+        baseline_startup = baseline_report.get("startup")
+
+    report = {
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scenarios": [],
+    }
+    for name, settings in scenarios.items():
+        scenario = run_scenario(name, {**DEFAULTS, **settings, **overrides})
+        print_scenario(scenario, baseline.get(name))
+        report["scenarios"].append(scenario)
+    if args.suite:
+        report["startup"] = bench_startup.measure()
+        bench_startup.report(report["startup"], baseline_startup)
+
+    with open(args.results, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Startup benchmark: how long importing the pipeline modules and starting the
+command line take, in fresh interpreters as when the extractor runs as many
+short jobs.
+
+Each module is imported under `python -X importtime` in an empty working
+directory. The report gives the cumulative import time of the module (the
+fastest of --runs), its slowest imports, and flags side effects: heavy
+dependencies that should only load once a run needs them, and files created
+by the import. The wall time of `main.py --help` covers interpreter start-up
+and argument parsing too. `bench_pipeline.py --suite` records these results
+as well.
+
+Exits with status 1 if an import has side effects, or with --baseline if an
+import got slower by more than --max-regression.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--results startup.json] [--baseline old.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SRC = os.path.join(ROOT, "src")
+
+MODULES = ("main", "producer", "consumer")
+# Dependencies imported only once a run needs them; importing the modules above must not load them.
+HEAVY_MODULES = ("requests", "urllib3", "bs4", "aiohttp", "sqlite3", "http.server")
+
+
+def parse_importtime(stderr):
+    """Returns {module: (self µs, cumulative µs)} from `python -X importtime` output."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if fields[0].strip().isdigit():
+            times[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return times
+
+
+def import_module(module):
+    """Imports the module in a fresh interpreter and returns (times, heavy modules loaded, files created)."""
+    code = f"import sys; import {module}; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    env = {**os.environ, "PYTHONPATH": SRC}
+    with tempfile.TemporaryDirectory() as cwd:
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd, env=env,
+                                 capture_output=True, text=True, check=True)
+        files = sorted(os.listdir(cwd))
+    return parse_importtime(process.stderr), process.stdout.split(), files
+
+
+def measure_import(module, runs):
+    """Returns the fastest cumulative import time of the module over several runs, and its side effects."""
+    best = None
+    for _ in range(runs):
+        times, heavy, files = import_module(module)
+        if best is None or times[module][1] < best[0][module][1]:
+            best = times, heavy, files
+    times, heavy, files = best
+    slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:5]
+    return {
+        "import_ms": times[module][1] / 1000,
+        "slowest": [[name, own / 1000] for name, (own, _) in slowest],
+        "heavy_modules": heavy,
+        "files_created": files,
+    }
+
+
+def measure_cli(runs):
+    """Returns the fastest wall time in ms of `main.py --help` over several runs."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(SRC, "main.py"), "--help"], capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def measure(runs=5):
+    """
+    Measures every module and the command line.
+
+    Returns:
+    - dict: {"modules": {module: results}, "cli_help_ms": float}.
+    """
+    return {"modules": {module: measure_import(module, runs) for module in MODULES}, "cli_help_ms": measure_cli(runs)}
+
+
+def report(results, baseline=None, max_regression=0.2):
+    """
+    Prints the results, compared with a baseline if given.
+
+    Returns:
+    - list: Problems found: side effects and regressions beyond `max_regression`.
+    """
+    problems = []
+    for module, result in results["modules"].items():
+        line = f"{'import ' + module:>16}: {result['import_ms']:7.1f} ms"
+        before = (baseline or {}).get("modules", {}).get(module)
+        if before:
+            change = result["import_ms"] / before["import_ms"] - 1
+            line += f" ({change:+.1%} vs baseline)"
+            if change > max_regression:
+                problems.append(f"importing {module} is {change:.0%} slower than the baseline")
+        print(line + "; slowest: " + ", ".join(f"{name} {ms:.1f}" for name, ms in result["slowest"]))
+        if result["heavy_modules"]:
+            problems.append(f"importing {module} loads {', '.join(result['heavy_modules'])}")
+        if result["files_created"]:
+            problems.append(f"importing {module} creates {', '.join(result['files_created'])}")
+    print(f"{'main.py --help':>16}: {results['cli_help_ms']:7.1f} ms")
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement; the fastest counts.")
+    parser.add_argument("--results", help="JSON file to write the results to.")
+    parser.add_argument("--baseline", help="Results file of an earlier run to compare against.")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Largest tolerated slowdown of an import against the baseline, as a fraction.")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        # Results of bench_pipeline.py --suite hold the startup results under "startup".
+        baseline = baseline.get("startup", baseline)
+    results = measure(args.runs)
+    problems = report(results, baseline, args.max_regression)
+    if args.results:
+        with open(args.results, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.results}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
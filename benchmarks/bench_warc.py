@@ -0,0 +1,89 @@
+"""
+Reports how fast pages are read back from WARC archives and re-extracted.
+
+A synthetic set of pages is recorded with `WarcWriter`, plain and gzipped, and
+then replayed: once only reading the pages with `WarcReader.pages`, which is
+the disk-bound floor, and once through `Consumer.run_replay`, which parses
+them too, on one process and on a pool whose workers read their own byte
+ranges of the archive.
+
+Usage:
+    python benchmarks/bench_warc.py [--pages 5000] [--links 100] [--processes N] [--dir DIR]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from consumer import Consumer  # noqa: E402
+from warc import WarcReader, WarcWriter  # noqa: E402
+
+HEADERS = {"Content-Type": "text/html; charset=utf-8", "Server": "bench"}
+
+
+def make_page(index, links):
+    anchors = "".join(f'<li><a href="/page/{(index * 31 + i) % 100000}">Link {i}</a></li>' for i in range(links))
+    return f"<html><head><title>Page {index}</title></head><body><ul>{anchors}</ul></body></html>".encode()
+
+
+def record(path, pages, links):
+    """Writes the synthetic pages to an archive and returns the seconds it took."""
+    start = time.perf_counter()
+    with WarcWriter(path) as writer:
+        for index in range(pages):
+            writer.write_response(f"https://example.com/page/{index}", make_page(index, links), HEADERS)
+    return time.perf_counter() - start
+
+
+def read(path):
+    """Reads every page of the archive and returns (pages, body bytes, seconds)."""
+    start = time.perf_counter()
+    pages = size = 0
+    with WarcReader(path) as reader:
+        for _, body, _, _ in reader.pages():
+            pages += 1
+            size += len(body)
+    return pages, size, time.perf_counter() - start
+
+
+def replay(path, processes):
+    """Extracts the links of every page of the archive and returns the seconds it took."""
+    consumer = Consumer(None, processes=processes, extractor="stream")
+    consumer.write_to_terminal = lambda *args: None
+    start = time.perf_counter()
+    consumer.run_replay([path])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=5000, help="Number of pages recorded.")
+    parser.add_argument("--links", type=int, default=100, help="Links per page.")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Parsing processes of the pool.")
+    parser.add_argument("--dir", help="Directory to keep the archives in; by default a temporary one is removed.")
+    args = parser.parse_args()
+
+    directory = args.dir or tempfile.mkdtemp(prefix="bench_warc_")
+    try:
+        for name in ("pages.warc", "pages.warc.gz"):
+            path = os.path.join(directory, name)
+            seconds = record(path, args.pages, args.links)
+            print(f"{name}: {os.path.getsize(path) / 1e6:.1f} MB, recorded at {args.pages / seconds:,.0f} pages/sec")
+            pages, size, seconds = read(path)
+            print(f"{'read only':>22}: {pages / seconds:10,.0f} pages/sec ({size / seconds / 1e6:7.1f} MB/s of HTML)")
+            for processes in sorted({1, args.processes}):
+                seconds = replay(path, processes)
+                print(f"{f'replay, {processes} process(es)':>22}: {pages / seconds:10,.0f} pages/sec")
+    finally:
+        if not args.dir:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+A local stand-in HTTP server for benchmarks.
+
+Every path returns a synthetic HTML page after an artificial delay, so that the
+pipeline can be measured without touching the network. Page size, link density,
+error rate and character encoding are configurable. Pages and failures are a
+deterministic function of the path and the seed, so repeated runs serve the
+same site.
+"""
+
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Mixes scripts so that every encoding has something outside ASCII to get right.
+FILLER = "Größe, café, naïve — “quoted” 日本語のテキスト. "
+
+# "undeclared" serves UTF-8 without a charset parameter, which leaves the client to guess.
+UNDECLARED = "undeclared"
+
+
+def synthetic_page(links=20, page_bytes=0, encoding="utf-8"):
+    """
+    Builds one synthetic HTML page.
+
+    Args:
+    - links (int): Number of <a href> tags on the page.
+    - page_bytes (int): Minimum size of the page; filler paragraphs are added to reach it.
+    - encoding (str): Encoding of the body. Characters it cannot represent become
+      character references, as a real server would have to emit them.
+
+    Returns:
+    - bytes: The encoded page.
+    """
+    codec = "utf-8" if encoding == UNDECLARED else encoding
+    head = f'<html><head><meta charset="{codec}"><title>Synthetic page</title></head><body>'
+    anchors = "".join(f'<a href="http://example.com/{i}">link {i}</a>' for i in range(links))
+    body = (head + anchors).encode(codec, errors="xmlcharrefreplace")
+    tail = b"</body></html>"
+    paragraph = f"<p>{FILLER * 4}</p>\n".encode(codec, errors="xmlcharrefreplace")
+    missing = page_bytes - len(body) - len(tail)
+    if missing > 0:
+        body += paragraph * (missing // len(paragraph) + 1)
+    return body + tail
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves the server's synthetic pages for every GET after sleeping for the server's latency."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle's algorithm the body would
+    # wait for the delayed ACK of the headers and add ~40 ms to every download.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        digest = zlib.crc32(f"{self.server.seed}:{self.path}".encode())
+        if digest / 2 ** 32 < self.server.error_rate:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        encoding = self.server.encodings[digest % len(self.server.encodings)]
+        page = self.server.pages[encoding]
+        content_type = "text/html" if encoding == UNDECLARED else f"text/html; charset={encoding}"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class StubServer:
+    """Runs a `ThreadingHTTPServer` with `StubHandler` on a background thread."""
+
+    def __init__(self, latency=0.05, host="127.0.0.1", port=0, links=20, page_bytes=0, error_rate=0.0,
+                 encodings=("utf-8",), seed=0):
+        """
+        Args:
+        - latency (float): Seconds to wait before answering each request.
+        - host (str): Interface to bind.
+        - port (int): Port to bind, 0 picks a free one.
+        - links (int): Number of links on every page.
+        - page_bytes (int): Minimum size of every page.
+        - error_rate (float): Fraction of paths that always answer 503.
+        - encodings (iterable): Encodings pages are served in, picked per path. Use
+          "undeclared" for UTF-8 without a charset in the Content-Type.
+        - seed (int): Changes which paths fail and which encoding each path gets.
+        """
+        self.httpd = _Server((host, port), StubHandler)
+        self.httpd.latency = latency
+        self.httpd.error_rate = error_rate
+        self.httpd.seed = seed
+        self.httpd.encodings = tuple(encodings)
+        self.httpd.pages = {encoding: synthetic_page(links, page_bytes, encoding) for encoding in self.httpd.encodings}
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="StubServer", daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import (CONCURRENCY_DECREASES_GLOBAL, CONCURRENCY_DECREASES_HOST, CONCURRENCY_INCREASES_GLOBAL,
+                     CONCURRENCY_INCREASES_HOST, CONCURRENCY_LIMIT)
+
+
+class AIMDLimit:
+    """
+    A concurrency limit adjusted by additive increase, multiplicative decrease
+    (AIMD), as in TCP congestion control: every request that completes without
+    a sign of overload raises the limit by 1/limit, so by about one per round of
+    requests, and an overloaded request cuts it by `backoff`. Requests started
+    before the last cut cannot cut it again, so that one burst of failures
+    counts once.
+
+    Latency counts as overload when its moving average exceeds `latency_tolerance`
+    times the lowest average seen, which is how a server sounds busy before it fails.
+    """
+
+    def __init__(self, maximum, minimum=1, backoff=0.5, latency_tolerance=2.0, smoothing=0.2, warmup=10):
+        """
+        Initializes the AIMDLimit at its maximum.
+
+        Args:
+        - maximum (int): Highest limit.
+        - minimum (int): Lowest limit.
+        - backoff (float): Factor the limit is multiplied by on overload.
+        - latency_tolerance (float): Ratio of the average latency to the lowest average that counts as
+          overload. None ignores latency.
+        - smoothing (float): Weight of the newest latency sample in the moving average.
+        - warmup (int): Number of samples before latency is taken into account.
+        """
+        self.maximum = maximum
+        self.minimum = minimum
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.warmup = warmup
+        self.limit = float(maximum)
+        self.samples = 0
+        self.average_latency = None
+        self.lowest_latency = None
+        self.last_decrease = 0.0
+
+    @property
+    def value(self):
+        """The current limit, as a whole number of requests."""
+        return max(self.minimum, int(self.limit))
+
+    def latency_overloaded(self, latency):
+        """
+        Adds a latency sample and returns whether latency signals overload.
+
+        Args:
+        - latency (float or None): Seconds until the response headers arrived.
+
+        Returns:
+        - bool: True if the moving average is too far above the lowest one.
+        """
+        if latency is None or self.latency_tolerance is None:
+            return False
+        self.samples += 1
+        if self.average_latency is None:
+            self.average_latency = latency
+        else:
+            self.average_latency += self.smoothing * (latency - self.average_latency)
+        if self.lowest_latency is None or self.average_latency < self.lowest_latency:
+            self.lowest_latency = self.average_latency
+        return self.samples > self.warmup and self.average_latency > self.latency_tolerance * self.lowest_latency
+
+    def update(self, started, overloaded):
+        """
+        Adjusts the limit after a request.
+
+        Args:
+        - started (float): `time.monotonic()` when the request was sent.
+        - overloaded (bool): Whether the request showed signs of overload.
+
+        Returns:
+        - int: 1 if the limit went up, -1 if it went down, otherwise 0.
+        """
+        before = self.value
+        if overloaded:
+            if started < self.last_decrease:
+                return 0
+            self.limit = max(self.minimum, self.limit * self.backoff)
+            self.last_decrease = time.monotonic()
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        return (self.value > before) - (self.value < before)
+
+
+class AdaptiveLimiter:
+    """
+    The AdaptiveLimiter class keeps one AIMD limit for all requests and one per
+    host. A host that answers 429 or 503, fails to respond or slows down only
+    lowers its own limit. The global limit reacts to timeouts and reset
+    connections, which point at the crawler's own network rather than at one
+    server; a host that does not resolve or refuses connections is simply dead.
+    Latency is not compared across hosts, as some are simply slower than others.
+    """
+
+    def __init__(self, max_total, max_per_host, backoff=0.5, latency_tolerance=2.0, max_hosts=10000):
+        """
+        Initializes the AdaptiveLimiter with every limit at its ceiling.
+
+        Args:
+        - max_total (int): Highest number of requests in flight.
+        - max_per_host (int): Highest number of requests in flight to one host.
+        - backoff (float): Factor a limit is multiplied by on overload.
+        - latency_tolerance (float or None): See `AIMDLimit`. Applies to the per-host limits.
+        - max_hosts (int): Number of hosts whose limits are kept; the least recently used are forgotten beyond it.
+        """
+        self.max_per_host = max_per_host
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.max_hosts = max_hosts
+        self.total = AIMDLimit(max_total, backoff=backoff, latency_tolerance=None)
+        self.hosts = OrderedDict()
+        self.lock = threading.Lock()
+        CONCURRENCY_LIMIT.set(self.total.value)
+
+    def total_limit(self):
+        """Returns how many requests may be in flight."""
+        return self.total.value
+
+    def host_limit(self, host):
+        """Returns how many requests may be in flight to the given host."""
+        limit = self.hosts.get(host)
+        return limit.value if limit is not None else self.max_per_host
+
+    def record(self, host, started, latency, overloaded=False, failed=False, network_failure=False):
+        """
+        Adjusts the limits after a request.
+
+        Args:
+        - host (str): Host the request went to, see `host_scheduler.host_of`.
+        - started (float): `time.monotonic()` when the request was sent.
+        - latency (float or None): Seconds until the response headers arrived, None without a response.
+        - overloaded (bool): Whether the host said it is overloaded (429 or 503) or the request timed out.
+        - failed (bool): Whether no response arrived at all.
+        - network_failure (bool): Whether the request timed out or its connection was reset.
+        """
+        with self.lock:
+            limit = self.hosts.get(host)
+            if limit is None:
+                self._prune()
+                limit = self.hosts[host] = AIMDLimit(self.max_per_host, backoff=self.backoff,
+                                                     latency_tolerance=self.latency_tolerance)
+            else:
+                self.hosts.move_to_end(host)
+            host_change = limit.update(started, limit.latency_overloaded(latency) or overloaded or failed)
+            total_change = self.total.update(started, network_failure)
+            CONCURRENCY_LIMIT.set(self.total.value)
+        if host_change:
+            (CONCURRENCY_INCREASES_HOST if host_change > 0 else CONCURRENCY_DECREASES_HOST).inc()
+        if total_change:
+            (CONCURRENCY_INCREASES_GLOBAL if total_change > 0 else CONCURRENCY_DECREASES_GLOBAL).inc()
+
+    def _prune(self):
+        """Forgets the least recently used hosts to make room for one more. Caller holds the lock."""
+        while len(self.hosts) >= self.max_hosts:
+            self.hosts.popitem(last=False)
+
+    def stats(self):
+        """
+        Returns the current limits.
+
+        Returns:
+        - dict: The global limit and the limits of the hosts below the per-host ceiling.
+        """
+        with self.lock:
+            return {
+                "total": self.total.value,
+                "hosts": {host: limit.value for host, limit in self.hosts.items() if limit.value < self.max_per_host},
+            }
@@ -0,0 +1,306 @@
+import asyncio
+import functools
+import logging
+import random
+import socket
+import threading
+import time
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+
+from content import HTML_ACCEPT, body_too_large, check_response, parse_retry_after
+from metrics import (BYTES_FETCHED, FETCH_RETRIES, FETCH_SECONDS, FETCHES_IN_FLIGHT, STAGE_CONNECT, STAGE_DOWNLOAD,
+                     STAGE_FIRST_BYTE)
+
+
+async def _on_connection_create_start(session, context, params):
+    context.connect_started = time.perf_counter()
+
+
+async def _on_connection_create_end(session, context, params):
+    STAGE_CONNECT.observe(time.perf_counter() - context.connect_started)
+
+
+def connect_trace_config():
+    """
+    Returns a trace config that records the time spent opening new connections.
+
+    Returns:
+    - aiohttp.TraceConfig: The trace config.
+    """
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_start.append(_on_connection_create_start)
+    trace_config.on_connection_create_end.append(_on_connection_create_end)
+    return trace_config
+
+
+class CachedResolver(AbstractResolver):
+    """aiohttp resolver that looks hosts up in a DNSCache, on a worker thread when they are not cached."""
+
+    def __init__(self, dns_cache):
+        self.dns_cache = dns_cache
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        addresses = await asyncio.get_running_loop().run_in_executor(None, self.dns_cache.resolve, host)
+        return [
+            {"hostname": host, "host": address, "port": port, "family": address_family, "proto": 0,
+             "flags": socket.AI_NUMERICHOST | socket.AI_NUMERICSERV}
+            for address_family, address in addresses
+            if family == socket.AF_UNSPEC or address_family == family
+        ]
+
+    async def close(self):
+        pass
+
+
+class AsyncFetcher:
+    """
+    The AsyncFetcher class fetches many URLs concurrently on a single asyncio
+    event loop, bounded by a semaphore rather than by a pool of threads. A
+    request waiting to be retried only parks its coroutine.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    # Seconds between two checks of the stop event, which cannot be awaited.
+    STOP_POLL_INTERVAL = 0.1
+
+    def __init__(self, max_concurrency=1000, total_retries=3, backoff_factor=0.1, timeout=10, cache=None,
+                 max_per_host=None, max_body_bytes=None, max_retry_after=60.0, archive=None, dns_cache=None,
+                 stop_event=None):
+        """
+        Initializes the AsyncFetcher with its concurrency and retry settings.
+
+        Args:
+        - max_concurrency (int): Maximum number of requests in flight at once.
+        - total_retries (int): Number of retries for retryable statuses and connection errors.
+        - backoff_factor (float): Base delay between retries, doubled on each attempt.
+        - timeout (int): Total timeout in seconds for each request.
+        - cache (HTTPCache or None): Response cache consulted before every request.
+        - max_per_host (int or None): Maximum number of connections to one host. None means no limit.
+        - max_body_bytes (int or None): Largest response body to download. None means no limit.
+        - max_retry_after (float): Longest `Retry-After` pause honoured; a server asking for more gets no retry.
+        - archive (WarcWriter or None): WARC archive every fetched page is recorded in, with its headers.
+        - dns_cache (DNSCache or None): Cache that host names are resolved through instead of aiohttp's resolver.
+        - stop_event (threading.Event or None): Event that, once set, stops retrying and cancels the fetches
+          in flight, leaving their URLs unfetched.
+        """
+        self.max_concurrency = max_concurrency
+        self.total_retries = total_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.cache = cache
+        self.max_per_host = max_per_host
+        self.max_body_bytes = max_body_bytes
+        self.max_retry_after = max_retry_after
+        self.archive = archive
+        self.dns_cache = dns_cache
+        self.stop_event = stop_event or threading.Event()
+
+    def backoff_delay(self, attempt):
+        """
+        Returns the number of seconds to sleep before the given retry attempt:
+        the base delay doubled on each attempt, of which the upper half is random
+        so that requests failing together do not retry together.
+
+        Args:
+        - attempt (int): The zero-based retry attempt.
+
+        Returns:
+        - float: Delay in seconds.
+        """
+        delay = self.backoff_factor * (2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def fetch(self, session, url):
+        """
+        Fetches the body of the given URL as bytes, retrying on server errors
+        and connection failures. Responses that are not HTML or exceed
+        `max_body_bytes` are dropped before their body is downloaded.
+
+        Args:
+        - session (aiohttp.ClientSession): Session used to make the request.
+        - url (str): The URL to be fetched.
+
+        Returns:
+        - tuple or None: (body, encoding from the Content-Type header or None, URL the page
+          came from after redirects), or None if the page was not fetched.
+        """
+        entry = None
+        if self.cache is not None:
+            # The cache may read from or write to disk, which must not stall the other fetches on the loop.
+            cached_body, entry = await asyncio.get_running_loop().run_in_executor(None, self.cache.lookup, url)
+            if cached_body is not None:
+                final_url = entry.final_url or url
+                await self.archive_response(final_url, cached_body, encoding=entry.encoding)
+                return cached_body, entry.encoding, final_url
+        headers = entry.conditional_headers() if entry else None
+
+        FETCHES_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            return await self._fetch_with_retries(session, url, entry, headers)
+        finally:
+            FETCHES_IN_FLIGHT.dec()
+            FETCH_SECONDS.observe(time.perf_counter() - start)
+
+    async def archive_response(self, url, body, headers=None, encoding=None, reason="OK"):
+        """
+        Records a page in the WARC archive, if any, on a worker thread: compressing and writing a
+        record would otherwise stall every fetch on the loop. See `WarcWriter.write_response`.
+        """
+        if self.archive is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(self.archive.write_response, url, body, headers, encoding, reason=reason))
+
+    async def _fetch_with_retries(self, session, url, entry, headers):
+        for attempt in range(self.total_retries + 1):
+            if attempt and self.stop_event.is_set():
+                return None
+            is_last_attempt = attempt == self.total_retries
+            delay = self.backoff_delay(attempt)
+            try:
+                start = time.perf_counter()
+                async with session.get(url, headers=headers) as response:
+                    headers_received = time.perf_counter()
+                    STAGE_FIRST_BYTE.observe(headers_received - start)
+                    final_url = str(response.url)
+                    if response.status == 304 and entry:
+                        body = await asyncio.get_running_loop().run_in_executor(
+                            None, self.cache.revalidated, url, entry, response.headers)
+                        await self.archive_response(final_url, body, encoding=entry.encoding)
+                        return body, entry.encoding, final_url
+                    if response.status == 200:
+                        wanted, encoding = check_response(url, response.headers, self.max_body_bytes)
+                        if not wanted:
+                            return None
+                        body = await self.read_body(url, response)
+                        if body is None:
+                            return None
+                        STAGE_DOWNLOAD.observe(time.perf_counter() - headers_received)
+                        BYTES_FETCHED.inc(len(body))
+                        if self.cache is not None:
+                            await asyncio.get_running_loop().run_in_executor(
+                                None, self.cache.store, url, body, response.headers, encoding, final_url)
+                        await self.archive_response(final_url, body, response.headers, reason=response.reason or "OK")
+                        return body, encoding, final_url
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    if (response.status not in self.RETRY_STATUSES or is_last_attempt
+                            or (retry_after or 0) > self.max_retry_after):
+                        logging.warning("Non-successful HTTP response for URL %s: %s", url, response.status)
+                        return None
+                    if retry_after is not None:
+                        delay = max(delay, retry_after)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as req_err:
+                if is_last_attempt:
+                    logging.error("Error fetching URL %s: %r", url, req_err)
+                    return None
+            except Exception as e:
+                logging.error("An unexpected error occurred while fetching URL %s: %s", url, e)
+                return None
+            if self.stop_event.is_set():
+                return None
+            FETCH_RETRIES.inc()
+            await asyncio.sleep(delay)
+        return None
+
+    async def read_body(self, url, response):
+        """
+        Reads a response body, giving up once it exceeds `max_body_bytes`.
+
+        Args:
+        - url (str): The fetched URL.
+        - response (aiohttp.ClientResponse): The response.
+
+        Returns:
+        - bytes or None: The decompressed body, or None if it was too large.
+        """
+        if not self.max_body_bytes:
+            return await response.read()
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                body_too_large(url, self.max_body_bytes)
+                return None
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def fetch_all(self, urls, on_result, blocking_urls=False):
+        """
+        Fetches every URL with at most `max_concurrency` requests in flight and
+        awaits `on_result(url, page)` as each fetch completes. Once the stop
+        event is set, no further URL is pulled and the fetches in flight,
+        including those waiting to be retried, are cancelled without a result.
+
+        Args:
+        - urls (iterable): URLs to be fetched.
+        - on_result (coroutine function): Called with the URL and its (body, encoding, final_url) tuple (or None).
+        - blocking_urls (bool): Whether iterating `urls` may block, as with a crawl
+          frontier. The URLs are then pulled on a worker thread to keep the loop running.
+        """
+        loop = asyncio.get_running_loop()
+        urls = iter(urls)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        if self.dns_cache is not None:
+            # The cache has its own TTLs; aiohttp's would only hide its hits from the metrics.
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.max_per_host or 0,
+                                             resolver=CachedResolver(self.dns_cache), use_dns_cache=False)
+        else:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.max_per_host or 0)
+
+        async def fetch_one(session, url):
+            try:
+                page = await self.fetch(session, url)
+                await on_result(url, page)
+            except asyncio.CancelledError:
+                if not self.stop_event.is_set():
+                    raise
+            finally:
+                semaphore.release()
+
+        # aiohttp advertises the compressions it can decode in Accept-Encoding on its own.
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector, headers={"Accept": HTML_ACCEPT},
+                                         trace_configs=[connect_trace_config()]) as session:
+            tasks = set()
+            watcher = asyncio.create_task(self._cancel_on_stop(tasks))
+            try:
+                while not self.stop_event.is_set():
+                    await semaphore.acquire()
+                    if self.stop_event.is_set():
+                        semaphore.release()
+                        break
+                    if blocking_urls:
+                        url = await loop.run_in_executor(None, next, urls, None)
+                    else:
+                        url = next(urls, None)
+                    if url is None:
+                        semaphore.release()
+                        break
+                    task = asyncio.create_task(fetch_one(session, url))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                if tasks:
+                    await asyncio.gather(*tasks)
+            finally:
+                watcher.cancel()
+
+    async def _cancel_on_stop(self, tasks):
+        """Cancels the fetch tasks in the given set once the stop event is set."""
+        while not self.stop_event.is_set():
+            await asyncio.sleep(self.STOP_POLL_INTERVAL)
+        for task in list(tasks):
+            task.cancel()
+
+    def run(self, urls, on_result, blocking_urls=False):
+        """
+        Runs `fetch_all` to completion on a fresh event loop.
+
+        Args:
+        - urls (iterable): URLs to be fetched.
+        - on_result (coroutine function): Called with the URL and its (body, encoding, final_url) tuple (or None).
+        - blocking_urls (bool): Whether iterating `urls` may block.
+        """
+        asyncio.run(self.fetch_all(urls, on_result, blocking_urls))
@@ -1,10 +1,81 @@
 import logging
+import multiprocessing
+import signal
+import threading
+import time
 from datetime import datetime
-from bs4 import BeautifulSoup
 import queue
-from log_config import setup_logging
+from content import decode_html
+from extraction_cache import ExtractionCache
+from extractors import get_extractor
+from links import resolve_links
+from metrics import (EXTRACTION_CACHE_HITS, EXTRACTION_CACHE_MISSES, LINKS_EXTRACTED, PAGES_PARSED, STAGE_OUTPUT,
+                     STAGE_PARSE)
+from log_config import setup_worker_logging, worker_logging_config
+
+# Consumer used by each worker process of the parsing pool, created by init_worker.
+_worker_consumer = None
+
+
+def init_worker(extractor, logging_config=None, cache_size=0, cache_dir=None):
+    """
+    Initializes a parsing pool worker. Workers ignore SIGINT so that the parent
+    process alone decides when to shut the pool down.
+
+    Args:
+    - extractor (str): Name of the link-extraction backend the worker should use.
+    - logging_config (tuple or None): From `log_config.worker_logging_config`, to log
+      through the parent's background writer.
+    - cache_size (int): Size of the worker's in-memory extraction cache in megabytes.
+    - cache_dir (str or None): Directory of the extraction cache shared by the workers.
+    """
+    global _worker_consumer
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if logging_config is not None:
+        setup_worker_logging(*logging_config)
+    _worker_consumer = Consumer(None, extractor=extractor, cache_size=cache_size, cache_dir=cache_dir)
+
+
+def extract_batch(batch):
+    """
+    Extracts hyperlinks for a batch of queue items inside a pool worker.
+
+    Args:
+    - batch (iterable): (source_url, body, encoding, final_url) queue items.
+
+    Returns:
+    - list: List of (source_url, hyperlinks, parse_seconds, cache_hit) tuples in the same order as the batch.
+      Parse times and extraction cache hits (None without a cache) are returned so that the parent
+      process can record them.
+    """
+    cache = _worker_consumer.extraction_cache
+    results = []
+    for source_url, body, encoding, final_url in batch:
+        start = time.perf_counter()
+        hits = cache and cache.hits
+        hyperlinks = _worker_consumer.extract_hyperlinks(body, source_url, record_metrics=False, encoding=encoding,
+                                                         final_url=final_url)
+        results.append((source_url, hyperlinks, time.perf_counter() - start, cache and cache.hits > hits))
+    return results
+
+
+def extract_warc_range(task):
+    """
+    Extracts hyperlinks for the pages archived in a byte range of a WARC archive
+    inside a pool worker, which reads the range itself rather than receiving the pages.
+
+    Args:
+    - task (tuple): (path, start, end) as returned by `warc.replay_ranges`.
+
+    Returns:
+    - list: List of (source_url, hyperlinks, parse_seconds, cache_hit) tuples in archive order.
+    """
+    from warc import WarcReader
+
+    path, start, end = task
+    with WarcReader(path) as reader:
+        return extract_batch(reader.pages(start, end))
 
-setup_logging(log_level=logging.INFO, log_filename="consumer.log")
 
 class Consumer:
     """
@@ -12,41 +83,89 @@ class Consumer:
     and extracting hyperlinks.
     """
 
-    def __init__(self, shared_queue):
+    def __init__(self, shared_queue, processes=1, batch_size=16, ordered=True, stop_event=None,
+                 extractor="soup", frontier=None, sink=None, journal=None, graph=None, cache_size=16,
+                 cache_dir=None):
         """
         Initializes the Consumer with a shared queue.
 
         Args:
-        - shared_queue (queue.Queue): A queue containing HTML content to be processed.
+        - shared_queue (queue.Queue): A queue of (source_url, body, encoding, final_url) items to be processed.
+        - processes (int): Number of worker processes used for parsing. 1 parses in the calling thread.
+        - batch_size (int): Maximum number of pages sent to a worker process at once.
+        - ordered (bool): Whether pool results are written in the order the pages were dequeued.
+        - stop_event (threading.Event): Event that, once set, makes `run` stop early.
+        - extractor (str): Name of the link-extraction backend, see `extractors.EXTRACTORS`.
+        - frontier (Frontier or None): Crawl frontier that extracted links are fed back to.
+        - sink (OutputSink or None): Buffered sink results are written to. None prints them to the terminal.
+        - journal (Journal or None): Job journal that pages are recorded in once their links are written.
+        - graph (LinkGraphWriter or None): Link graph every page and its links are added to.
+        - cache_size (int): Size of the in-memory extraction cache in megabytes, per parsing process.
+          With `cache_dir` unset, 0 disables the cache.
+        - cache_dir (str or None): Directory of the persistent extraction cache, shared by the parsing processes.
         """
         self.shared_queue = shared_queue
+        self.processes = processes
+        self.batch_size = batch_size
+        self.ordered = ordered
+        self.stop_event = stop_event or threading.Event()
+        self.extractor_name = extractor
+        self.extractor = get_extractor(extractor)
+        self.frontier = frontier
+        self.sink = sink
+        self.journal = journal
+        self.graph = graph
+        self.cache_size = cache_size
+        self.cache_dir = cache_dir
+        # With a pool, every worker process has a cache of its own.
+        self.extraction_cache = None
+        if processes <= 1 and (cache_size or cache_dir):
+            self.extraction_cache = ExtractionCache(f"{self.extractor.name}:{self.extractor.version}",
+                                                    max_bytes=cache_size * 1024 * 1024, directory=cache_dir)
+        self._timestamp_second = None
+        self._timestamp = None
 
-    def extract_hyperlinks(self, html_content, source_url="Unknown URL"):
+    def extract_hyperlinks(self, html_content, source_url="Unknown URL", record_metrics=True, encoding=None,
+                           final_url=None):
         """
-        Extracts and returns hyperlinks from the given HTML content.
+        Extracts and returns hyperlinks from the given HTML content. Raw bytes
+        are decoded first, and links are resolved against `final_url` or `source_url`
+        (or the page's `<base href>`), canonicalised and deduplicated; all of which counts
+        towards the parse time. A body extracted before is not decoded or parsed
+        again if it is still in the extraction cache.
 
         Args:
-        - html_content (str): HTML content from which hyperlinks need to be extracted.
-        - source_url (str): The source URL of the HTML content. Default is 'Unknown URL'.
+        - html_content (bytes or str): HTML content from which hyperlinks need to be extracted.
+        - source_url (str): The source URL of the HTML content. Default is 'Unknown URL', against which
+          only absolute links resolve.
+        - record_metrics (bool): Whether to record the parse time and extraction cache lookup in this process.
+        - encoding (str or None): Encoding hint for bytes, see `content.decode_html`.
+        - final_url (str or None): URL the page came from after redirects, which relative links resolve against.
 
         Returns:
-        - list: A list of hyperlinks extracted from the given HTML content.
+        - list: The canonical http(s) URLs linked from the given HTML content, in order of first appearance.
         """
-        hyperlinks = []
-
+        start = time.perf_counter()
+        cache = self.extraction_cache
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-
-            for link in soup.find_all('a'):
-                href = link.get('href')
-                if href and href.startswith(('http', 'https')):
-                    hyperlinks.append(href)
-
+            key = cache and cache.key(html_content, encoding)
+            extracted = cache and cache.get(key)
+            if record_metrics and cache:
+                (EXTRACTION_CACHE_HITS if extracted else EXTRACTION_CACHE_MISSES).inc()
+            if not extracted:
+                extracted = self.extractor.extract_with_base(decode_html(html_content, encoding))
+                if cache:
+                    cache.put(key, *extracted)
+            hrefs, base_href = extracted
+            hyperlinks = resolve_links(hrefs, final_url or source_url, base_href)
         except Exception as e:
-            logging.error(f"Error while parsing content from {source_url}: {e}")
+            logging.error("Error while parsing content from %s: %s", source_url, e)
             return []
+        finally:
+            if record_metrics:
+                STAGE_PARSE.observe(time.perf_counter() - start)
 
-        logging.info(f"Extracted {len(hyperlinks)} hyperlinks from {source_url}.")
+        logging.info("Extracted %d hyperlinks from %s.", len(hyperlinks), source_url)
         return hyperlinks
 
     def write_to_terminal(self, source_url, hyperlinks):
@@ -57,24 +176,195 @@ class Consumer:
         - source_url (str): The source URL of the HTML content.
         - hyperlinks (list): List of hyperlinks to be displayed.
         """
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        print(f"[{timestamp}] For {source_url}, extracted hyperlinks are: {', '.join(hyperlinks)}")
+        # Formatting the timestamp is comparatively slow, so do it at most once per second.
+        second = int(time.time())
+        if second != self._timestamp_second:
+            self._timestamp_second = second
+            self._timestamp = datetime.fromtimestamp(second).strftime('%Y-%m-%d %H:%M:%S')
+        print(f"[{self._timestamp}] For {source_url}, extracted hyperlinks are: {', '.join(hyperlinks)}")
+
+    def handle_result(self, source_url, hyperlinks):
+        """
+        Writes the hyperlinks extracted from a page to the sink (or the
+        terminal) and the link graph, records the page in the journal and,
+        when crawling, feeds the links back to the frontier.
+
+        Args:
+        - source_url (str): The source URL of the HTML content.
+        - hyperlinks (list): List of hyperlinks extracted from the page.
+        """
+        PAGES_PARSED.inc()
+        LINKS_EXTRACTED.inc(len(hyperlinks))
+        with STAGE_OUTPUT.time():
+            if self.sink is not None:
+                self.sink.write(source_url, hyperlinks)
+            else:
+                self.write_to_terminal(source_url, hyperlinks)
+            if self.graph is not None:
+                self.graph.add(source_url, hyperlinks)
+        if self.journal is not None:
+            self.journal.emitted(source_url)
+        if self.frontier is not None:
+            self.frontier.add_links(source_url, hyperlinks)
+
+    def record_parse(self, parse_seconds, cache_hit):
+        """
+        Records the parse time and extraction cache lookup of a page parsed by a pool worker.
+
+        Args:
+        - parse_seconds (float): Time the worker spent extracting the page's links.
+        - cache_hit (bool or None): Whether the extraction cache had the page's body, None without a cache.
+        """
+        STAGE_PARSE.observe(parse_seconds)
+        if cache_hit is not None:
+            (EXTRACTION_CACHE_HITS if cache_hit else EXTRACTION_CACHE_MISSES).inc()
+
+    def close(self):
+        """
+        Closes the extraction cache of this process, if there is one.
+        """
+        if self.extraction_cache is not None:
+            self.extraction_cache.close()
+
+    def stop(self):
+        """
+        Asks `run` to stop after the page or batch currently being handled.
+        """
+        self.stop_event.set()
 
     def run(self):
         """
         Continuously processes items (HTML content) from the shared queue,
         extracts hyperlinks, and writes them to the terminal.
         """
-        while True:
+        if self.processes > 1:
+            self.run_pool()
+            return
+
+        while not self.stop_event.is_set():
             try:
                 item = self.shared_queue.get(timeout=10)
                 if item is None:  # Sentinel value indicating the producer is done
                     break
-                source_url, html_content = item
-                logging.info(f"Processing content from {source_url}.")
-                hyperlinks = self.extract_hyperlinks(html_content, source_url)
-                self.write_to_terminal(source_url, hyperlinks)
+                source_url, body, encoding, final_url = item
+                logging.info("Processing content from %s.", source_url)
+                hyperlinks = self.extract_hyperlinks(body, source_url, encoding=encoding, final_url=final_url)
+                self.handle_result(source_url, hyperlinks)
 
             except queue.Empty:
                 logging.warning("Queue is empty. Waiting for more content.")
-                continue
\ No newline at end of file
+                continue
+
+    def iter_batches(self, in_flight):
+        """
+        Groups items from the shared queue into batches of at most `batch_size`.
+        A partial batch is emitted as soon as the queue runs dry, so that pages
+        are not held back waiting for more to arrive.
+
+        Args:
+        - in_flight (threading.Semaphore): Acquired for every batch handed to the
+          pool and released once its results have been written, bounding the
+          number of outstanding batches.
+
+        Yields:
+        - list: List of (source_url, body, encoding, final_url) queue items.
+        """
+        batch = []
+        while not self.stop_event.is_set():
+            try:
+                item = self.shared_queue.get(timeout=0.1 if batch else 10)
+            except queue.Empty:
+                if not batch:
+                    logging.warning("Queue is empty. Waiting for more content.")
+                    continue
+            else:
+                if item is None:  # Sentinel value indicating the producer is done
+                    break
+                batch.append(item)
+                if len(batch) < self.batch_size:
+                    continue
+            if not self.acquire_slot(in_flight):
+                return
+            yield batch
+            batch = []
+
+        if batch and self.acquire_slot(in_flight):
+            yield batch
+
+    def acquire_slot(self, in_flight):
+        """
+        Waits for a free in-flight batch slot, giving up if the consumer is stopped.
+
+        Args:
+        - in_flight (threading.Semaphore): Semaphore bounding outstanding batches.
+
+        Returns:
+        - bool: True if a slot was acquired, False if the consumer was stopped.
+        """
+        while not in_flight.acquire(timeout=0.1):
+            if self.stop_event.is_set():
+                return False
+        return not self.stop_event.is_set()
+
+    def run_pool(self):
+        """
+        Processes items from the shared queue on a pool of worker processes,
+        dispatching them in batches and writing results as batches complete.
+        """
+        in_flight = threading.Semaphore(self.processes * 2)
+        pool = multiprocessing.Pool(self.processes, initializer=init_worker,
+                                    initargs=(self.extractor_name, worker_logging_config(), self.cache_size,
+                                              self.cache_dir))
+        try:
+            imap = pool.imap if self.ordered else pool.imap_unordered
+            for results in imap(extract_batch, self.iter_batches(in_flight)):
+                in_flight.release()
+                for source_url, hyperlinks, parse_seconds, cache_hit in results:
+                    self.record_parse(parse_seconds, cache_hit)
+                    self.handle_result(source_url, hyperlinks)
+                if self.stop_event.is_set():
+                    break
+        finally:
+            if self.stop_event.is_set():
+                pool.terminate()
+            else:
+                pool.close()
+            pool.join()
+
+    def run_replay(self, paths):
+        """
+        Processes the pages archived in WARC files instead of the shared queue.
+        With several processes, every archive is split into byte ranges that the
+        pool workers read on their own.
+
+        Args:
+        - paths (list): Paths of the archives, written by `warc.WarcWriter` or any other WARC tool.
+        """
+        from warc import WarcReader, replay_ranges
+
+        if self.processes <= 1:
+            for path in paths:
+                with WarcReader(path) as reader:
+                    for source_url, body, encoding, _ in reader.pages():
+                        if self.stop_event.is_set():
+                            return
+                        self.handle_result(source_url, self.extract_hyperlinks(body, source_url, encoding=encoding))
+            return
+
+        pool = multiprocessing.Pool(self.processes, initializer=init_worker,
+                                    initargs=(self.extractor_name, worker_logging_config(), self.cache_size,
+                                              self.cache_dir))
+        try:
+            imap = pool.imap if self.ordered else pool.imap_unordered
+            for results in imap(extract_warc_range, replay_ranges(paths, self.processes)):
+                for source_url, hyperlinks, parse_seconds, cache_hit in results:
+                    self.record_parse(parse_seconds, cache_hit)
+                    self.handle_result(source_url, hyperlinks)
+                if self.stop_event.is_set():
+                    break
+        finally:
+            if self.stop_event.is_set():
+                pool.terminate()
+            else:
+                pool.close()
+            pool.join()
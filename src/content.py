@@ -0,0 +1,179 @@
+import codecs
+import logging
+import re
+import time
+
+from metrics import FETCHES_SKIPPED_SIZE, FETCHES_SKIPPED_TYPE
+
+# Content types handed to the parser. Responses without a Content-Type are parsed too.
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+# Accept header sent with every request, so that servers offering several representations pick HTML.
+HTML_ACCEPT = "text/html,application/xhtml+xml;q=0.9,*/*;q=0.1"
+
+_BOMS = ((codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16-le"), (codecs.BOM_UTF16_BE, "utf-16-be"))
+# Labels that browsers read as windows-1252, which is a superset of them.
+_WINDOWS_1252_ALIASES = ("ascii", "iso8859-1")
+_META_CHARSET = re.compile(rb"""<meta[^>]*?charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.IGNORECASE)
+
+
+def parse_content_type(value):
+    """
+    Splits a Content-Type header into its media type and charset.
+
+    Args:
+    - value (str or None): The header value.
+
+    Returns:
+    - tuple: (media type or None, charset or None), the media type lower-cased.
+    """
+    if not value:
+        return None, None
+    media_type, _, params = value.partition(";")
+    charset = None
+    for param in params.split(";"):
+        name, _, param_value = param.partition("=")
+        if name.strip().lower() == "charset":
+            charset = normalize_encoding(param_value.strip().strip('"\''))
+    return media_type.strip().lower() or None, charset
+
+
+def is_html(media_type):
+    """
+    Checks if a response with the given media type should be parsed.
+
+    Args:
+    - media_type (str or None): Media type returned by `parse_content_type`.
+
+    Returns:
+    - bool: True for HTML and XHTML, and when the server did not say.
+    """
+    return media_type is None or media_type in HTML_CONTENT_TYPES
+
+
+def check_response(url, headers, max_body_bytes=None):
+    """
+    Decides from its headers whether a response body is worth downloading.
+
+    Args:
+    - url (str): The fetched URL.
+    - headers (Mapping): The response headers, looked up case-insensitively.
+    - max_body_bytes (int or None): Largest body to download. None means no limit.
+
+    Returns:
+    - tuple: (whether to read the body, encoding from the Content-Type header or None).
+    """
+    media_type, encoding = parse_content_type(headers.get("Content-Type"))
+    if not is_html(media_type):
+        logging.info("Skipping %s: %s is not HTML.", url, media_type)
+        FETCHES_SKIPPED_TYPE.inc()
+        return False, None
+    length = headers.get("Content-Length")
+    if max_body_bytes and length and length.isdigit() and int(length) > max_body_bytes:
+        body_too_large(url, max_body_bytes)
+        return False, None
+    return True, encoding
+
+
+def body_too_large(url, max_body_bytes):
+    """
+    Records a response dropped for exceeding the body size limit.
+
+    Args:
+    - url (str): The fetched URL.
+    - max_body_bytes (int): The limit.
+    """
+    logging.warning("Skipping %s: body is larger than %d bytes.", url, max_body_bytes)
+    FETCHES_SKIPPED_SIZE.inc()
+
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header, given either in seconds or as an HTTP date.
+
+    Args:
+    - value (str or None): The header value.
+
+    Returns:
+    - float or None: Seconds to wait, never negative, or None if the header is missing or malformed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    import email.utils
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def normalize_encoding(name):
+    """
+    Returns the canonical Python codec name for an encoding label.
+
+    Args:
+    - name (str or None): Encoding label, such as "UTF-8" or "latin1".
+
+    Returns:
+    - str or None: The codec name, or None if Python does not know the label.
+    """
+    if not name:
+        return None
+    try:
+        name = codecs.lookup(name).name
+    except LookupError:
+        return None
+    return "cp1252" if name in _WINDOWS_1252_ALIASES else name
+
+
+def sniff_meta_charset(body, limit=1024):
+    """
+    Looks for a `<meta charset>` or `<meta http-equiv="Content-Type">` declaration
+    at the start of a document, where HTML requires it to be.
+
+    Args:
+    - body (bytes): The document.
+    - limit (int): Number of leading bytes to scan.
+
+    Returns:
+    - str or None: The declared encoding, or None if there is none Python knows.
+    """
+    match = _META_CHARSET.search(body, 0, limit)
+    if match is None:
+        return None
+    encoding = normalize_encoding(match.group(1).decode('ascii'))
+    # A document that could be read as ASCII to find the declaration is not UTF-16.
+    if encoding is not None and encoding.startswith("utf-16"):
+        return "utf-8"
+    return encoding
+
+
+def decode_html(body, encoding=None):
+    """
+    Decodes a response body without statistical charset detection. A byte order
+    mark wins, then the encoding from the HTTP header, then `<meta charset>`.
+    Undeclared documents are read as UTF-8, falling back to windows-1252 as browsers do.
+
+    Args:
+    - body (bytes or str): The response body. Text is returned unchanged.
+    - encoding (str or None): Encoding from the Content-Type header.
+
+    Returns:
+    - str: The decoded document. Invalid bytes are replaced rather than raising.
+    """
+    if isinstance(body, str):
+        return body
+    for bom, bom_encoding in _BOMS:
+        if body.startswith(bom):
+            return body[len(bom):].decode(bom_encoding, errors='replace')
+    encoding = encoding or sniff_meta_charset(body)
+    if encoding is not None:
+        return body.decode(encoding, errors='replace')
+    try:
+        return body.decode('utf-8')
+    except UnicodeDecodeError:
+        return body.decode('cp1252', errors='replace')
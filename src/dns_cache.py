@@ -0,0 +1,220 @@
+import logging
+import socket
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from metrics import DNS_CACHE_HITS, DNS_CACHE_MISSES, DNS_CACHE_NEGATIVE_HITS, DNS_PREFETCHES, DNS_RESOLVE_SECONDS
+
+
+class _Entry:
+    """A cached resolution: addresses, or the arguments of the `gaierror` raised."""
+
+    __slots__ = ("expires_at", "addresses", "error")
+
+    def __init__(self, expires_at, addresses=None, error=None):
+        self.expires_at = expires_at
+        self.addresses = addresses
+        self.error = error
+
+
+class DNSCache:
+    """
+    The DNSCache class resolves host names for all fetch workers and remembers
+    the answers: addresses for `ttl` seconds and failures for `negative_ttl`
+    seconds. Concurrent lookups of the same host wait for a single resolution,
+    and `prefetch` resolves hosts in the background before they are fetched.
+
+    `getaddrinfo` does not report record TTLs, so every answer is kept for the
+    same configured time.
+    """
+
+    def __init__(self, ttl=300.0, negative_ttl=30.0, max_hosts=100000, prefetch_threads=4,
+                 resolver=socket.getaddrinfo):
+        """
+        Initializes the DNSCache.
+
+        Args:
+        - ttl (float): Seconds a resolved address list is reused.
+        - negative_ttl (float): Seconds a failed resolution is remembered and raised again without a lookup.
+        - max_hosts (int): Maximum number of hosts remembered; the least recently used are dropped.
+        - prefetch_threads (int): Threads resolving prefetched hosts.
+        - resolver (callable): Resolver with the signature of `socket.getaddrinfo`, replaceable in tests.
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_hosts = max_hosts
+        self.prefetch_threads = prefetch_threads
+        self.resolver = resolver
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.executor = None
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.prefetches = 0
+        self.failures = 0
+
+    def resolve(self, host):
+        """
+        Returns the addresses of a host, from the cache if they are fresh.
+
+        Args:
+        - host (str): The host name or IP address.
+
+        Returns:
+        - list: (family, address) tuples, in the order of the resolver.
+
+        Raises:
+        - socket.gaierror: If the host does not resolve, now or within the last `negative_ttl` seconds.
+        """
+        return self._resolve(host, prefetch=False)
+
+    def _resolve(self, host, prefetch):
+        while True:
+            with self.lock:
+                entry = self.entries.get(host)
+                if entry is not None and entry.expires_at > time.monotonic():
+                    self.entries.move_to_end(host)
+                    if not prefetch:
+                        self._count_hit(entry)
+                    break
+                event = self.pending.get(host)
+                if event is None:
+                    event = self.pending[host] = threading.Event()
+                    if not prefetch:
+                        self.misses += 1
+                        DNS_CACHE_MISSES.inc()
+                    break
+            # Another thread is resolving the host; its answer counts as a hit.
+            event.wait()
+        if entry is None or entry.expires_at <= time.monotonic():
+            try:
+                entry = self._lookup(host)
+            finally:
+                with self.lock:
+                    del self.pending[host]
+                event.set()
+        if entry.error is not None:
+            raise socket.gaierror(*entry.error)
+        return entry.addresses
+
+    def _count_hit(self, entry):
+        """Records a lookup answered from the cache. Caller holds the lock."""
+        self.hits += 1
+        if entry.error is not None:
+            self.negative_hits += 1
+            DNS_CACHE_NEGATIVE_HITS.inc()
+        else:
+            DNS_CACHE_HITS.inc()
+
+    def _lookup(self, host):
+        start = time.perf_counter()
+        try:
+            infos = self.resolver(host, None, socket.AF_UNSPEC, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            entry = _Entry(time.monotonic() + self.negative_ttl, error=e.args)
+            with self.lock:
+                self.failures += 1
+        else:
+            addresses = []
+            for family, _, _, _, sockaddr in infos:
+                if (family, sockaddr[0]) not in addresses:
+                    addresses.append((family, sockaddr[0]))
+            entry = _Entry(time.monotonic() + self.ttl, addresses)
+        finally:
+            DNS_RESOLVE_SECONDS.observe(time.perf_counter() - start)
+        with self.lock:
+            self.entries[host] = entry
+            self.entries.move_to_end(host)
+            while len(self.entries) > self.max_hosts:
+                self.entries.popitem(last=False)
+        return entry
+
+    def prefetch(self, host):
+        """
+        Resolves a host in the background, unless its addresses are cached or being resolved.
+
+        Args:
+        - host (str or None): The host name. None and IP addresses are ignored.
+        """
+        if not host or _is_ip_address(host):
+            return
+        with self.lock:
+            entry = self.entries.get(host)
+            if (entry is not None and entry.expires_at > time.monotonic()) or host in self.pending:
+                return
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(self.prefetch_threads, thread_name_prefix="DNSPrefetch")
+            self.prefetches += 1
+        DNS_PREFETCHES.inc()
+        self.executor.submit(self._prefetch, host)
+
+    def _prefetch(self, host):
+        try:
+            self._resolve(host, prefetch=True)
+        except OSError:
+            pass
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns:
+        - dict: Hits (negative ones included), negative hits, misses, prefetches, failed resolutions and hosts held.
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "prefetches": self.prefetches,
+                "failures": self.failures,
+                "hosts": len(self.entries),
+            }
+
+    def close(self):
+        """Stops prefetching, dropping the hosts not resolved yet."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        logging.info("DNS cache stats: %s", self.stats())
+
+
+def _is_ip_address(host):
+    try:
+        socket.inet_pton(socket.AF_INET6 if ":" in host else socket.AF_INET, host.strip("[]"))
+    except OSError:
+        return False
+    return True
+
+
+def prefetching(urls, dns_cache, ahead=100, stop_event=None):
+    """
+    Yields the given URLs unchanged while the hosts of the next `ahead` URLs
+    are resolved in the background. URLs are pulled that far ahead of the
+    consumer of the generator, so `ahead` should be 0 when pulling a URL may
+    wait for earlier ones to be fetched, as with a crawl frontier: each host
+    is then prefetched as its URL is pulled.
+
+    Args:
+    - urls (iterable): The URLs to be fetched.
+    - dns_cache (DNSCache): Cache the hosts are resolved into.
+    - ahead (int): Number of URLs pulled and prefetched ahead.
+    - stop_event (threading.Event or None): Event that, once set, stops yielding, dropping the URLs pulled ahead.
+
+    Yields:
+    - str: The URLs, in order.
+    """
+    window = deque()
+    for url in urls:
+        dns_cache.prefetch(urlsplit(url).hostname)
+        window.append(url)
+        if len(window) > ahead:
+            if stop_event is not None and stop_event.is_set():
+                return
+            yield window.popleft()
+    while window and not (stop_event is not None and stop_event.is_set()):
+        yield window.popleft()
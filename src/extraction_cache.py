@@ -0,0 +1,153 @@
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+
+# Estimated bytes of bookkeeping per cached href on top of its characters.
+HREF_OVERHEAD = 64
+
+
+class ExtractionCache:
+    """
+    The ExtractionCache class remembers the raw hrefs and `<base href>` that a
+    link-extraction backend found in a page body, keyed by a BLAKE2 hash of the
+    body, its declared encoding and the backend's name and version. Pages with
+    byte-identical bodies are then parsed once, whatever their URL and whether
+    or not the server supports conditional requests: links are still resolved
+    against each page's own URL.
+
+    Entries are kept in an in-memory LRU bounded by their estimated size,
+    optionally backed by a SQLite file that survives restarts and is shared by
+    the processes of a parsing pool. Each process has its own instance.
+    """
+
+    def __init__(self, namespace, max_bytes=16 * 1024 * 1024, directory=None):
+        """
+        Initializes the ExtractionCache.
+
+        Args:
+        - namespace (str): Name and version of the backend, so that its results are never
+          served for another backend or after its output changed.
+        - max_bytes (int): Maximum estimated size of the entries kept in memory. 0 disables the memory tier.
+        - directory (str or None): Directory of the on-disk store. None keeps the cache in memory only.
+        """
+        self.namespace = namespace.encode("utf-8") + b"\0"
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.db = None
+        if directory:
+            import sqlite3
+            os.makedirs(directory, exist_ok=True)
+            self.db = sqlite3.connect(os.path.join(directory, "extraction_cache.sqlite3"), timeout=30)
+            # Without a sync on every commit, a crash loses at most the last entries, which are only a cache.
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS extractions (key BLOB PRIMARY KEY, hrefs TEXT, base_href TEXT)"
+            )
+            self.db.commit()
+
+    def key(self, body, encoding=None):
+        """
+        Returns the cache key of a page body.
+
+        Args:
+        - body (bytes or str): The page body.
+        - encoding (str or None): Encoding from the Content-Type header, which can change how the body decodes.
+
+        Returns:
+        - bytes: A 16-byte digest.
+        """
+        if isinstance(body, str):
+            body, encoding = body.encode("utf-8"), "str"
+        digest = hashlib.blake2b(self.namespace + (encoding or "").encode("ascii", "replace") + b"\0",
+                                 digest_size=16)
+        digest.update(body)
+        return digest.digest()
+
+    def get(self, key):
+        """
+        Returns the cached extraction for the given key, and records a hit or miss.
+
+        Args:
+        - key (bytes): Key returned by `key`.
+
+        Returns:
+        - tuple or None: (raw hrefs, `<base href>` or None), or None if the body was not seen.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        elif self.db is not None:
+            row = self.db.execute("SELECT hrefs, base_href FROM extractions WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                entry = self._remember(key, (tuple(json.loads(row[0])), row[1]))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0], entry[1]
+
+    def put(self, key, hrefs, base_href):
+        """
+        Caches the extraction of a page body.
+
+        Args:
+        - key (bytes): Key returned by `key`.
+        - hrefs (list): The raw hrefs found in the body.
+        - base_href (str or None): The first `<base href>`.
+        """
+        entry = tuple(hrefs), base_href
+        self._remember(key, entry)
+        if self.db is not None:
+            self.db.execute("INSERT OR REPLACE INTO extractions (key, hrefs, base_href) VALUES (?, ?, ?)",
+                            (key, json.dumps(entry[0]), base_href))
+            self.db.commit()
+
+    def _remember(self, key, entry):
+        """
+        Adds an entry to the memory tier, evicting least recently used entries.
+
+        Returns:
+        - tuple: (hrefs, base href, estimated size), as held in memory.
+        """
+        entry += (sum(len(href) for href in entry[0]) + HREF_OVERHEAD * (len(entry[0]) + 1),)
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.current_bytes -= old[2]
+        if entry[2] > self.max_bytes:
+            return entry
+        self.entries[key] = entry
+        self.current_bytes += entry[2]
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.current_bytes -= evicted[2]
+            self.evictions += 1
+        return entry
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns:
+        - dict: Hits, misses, evictions, entries and estimated bytes held in memory.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.current_bytes,
+        }
+
+    def close(self):
+        """Closes the on-disk store."""
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+        logging.info("Extraction cache stats: %s", self.stats())
@@ -0,0 +1,119 @@
+from html.parser import HTMLParser
+
+
+class LinkExtractor:
+    """
+    Base class for link-extraction backends. Backends return the raw, non-empty
+    hrefs of all `<a>` tags in document order, together with the first `<base href>`.
+    Resolving and canonicalising them is left to `links.resolve_links`.
+    """
+
+    name = None
+    # Bump when the output of a backend changes, so that cached extractions are not reused.
+    version = 1
+
+    def extract(self, html_content):
+        """
+        Extracts hyperlinks from the given HTML content.
+
+        Args:
+        - html_content (str): HTML content from which hyperlinks need to be extracted.
+
+        Returns:
+        - list: A list of raw hrefs.
+        """
+        return self.extract_with_base(html_content)[0]
+
+    def extract_with_base(self, html_content):
+        """
+        Extracts hyperlinks and the base URL from the given HTML content.
+
+        Args:
+        - html_content (str): HTML content from which hyperlinks need to be extracted.
+
+        Returns:
+        - tuple: (list of raw hrefs, the first `<base href>` or None).
+        """
+        raise NotImplementedError
+
+
+class SoupExtractor(LinkExtractor):
+    """Builds a full BeautifulSoup tree and walks every `<a>` tag."""
+
+    name = "soup"
+
+    def __init__(self):
+        # BeautifulSoup takes a noticeable share of startup, so it is imported once a backend needs it.
+        from bs4 import BeautifulSoup
+        self.BeautifulSoup = BeautifulSoup
+
+    def extract_with_base(self, html_content):
+        soup = self.BeautifulSoup(html_content, 'html.parser')
+        base = soup.find('base', href=True)
+        return [link['href'] for link in soup.find_all('a', href=True) if link['href']], base and base['href']
+
+
+class StrainedSoupExtractor(LinkExtractor):
+    """Builds a BeautifulSoup tree restricted to `<a href>` tags with a SoupStrainer."""
+
+    name = "strainer"
+
+    def __init__(self):
+        from bs4 import BeautifulSoup, SoupStrainer
+        self.BeautifulSoup = BeautifulSoup
+        self.strainer = SoupStrainer(('a', 'base'), href=True)
+
+    def extract_with_base(self, html_content):
+        soup = self.BeautifulSoup(html_content, 'html.parser', parse_only=self.strainer)
+        base = soup.find('base')
+        return [link['href'] for link in soup.find_all('a') if link['href']], base and base['href']
+
+
+class _HrefScanner(HTMLParser):
+    """HTMLParser that records `<a href>` and the first `<base href>` values as start tags stream past."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.hyperlinks = []
+        self.base_href = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.hyperlinks.append(href)
+        elif tag == 'base' and self.base_href is None:
+            self.base_href = dict(attrs).get('href')
+
+    handle_startendtag = handle_starttag
+
+
+class StreamingExtractor(LinkExtractor):
+    """Scans start-tag events with the stdlib HTMLParser without building a tree."""
+
+    name = "stream"
+
+    def extract_with_base(self, html_content):
+        scanner = _HrefScanner()
+        scanner.feed(html_content)
+        scanner.close()
+        return scanner.hyperlinks, scanner.base_href
+
+
+EXTRACTORS = {cls.name: cls for cls in (SoupExtractor, StrainedSoupExtractor, StreamingExtractor)}
+
+
+def get_extractor(name):
+    """
+    Returns an instance of the link-extraction backend with the given name.
+
+    Args:
+    - name (str): One of the keys of `EXTRACTORS`.
+
+    Returns:
+    - LinkExtractor: The requested backend.
+    """
+    try:
+        return EXTRACTORS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown extractor {name!r}; expected one of {sorted(EXTRACTORS)}") from None
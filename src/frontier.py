@@ -0,0 +1,186 @@
+import threading
+from collections import deque
+
+from host_scheduler import host_of
+from links import canonicalize_url
+from url_stream import BloomFilter, ScalableBloomFilter
+
+
+def domain_of(host):
+    """
+    Returns the domain used for same-domain scoping: the host without its port
+    and without a leading "www.".
+
+    Args:
+    - host (str): A lower-cased host, possibly with a port.
+
+    Returns:
+    - str: The domain.
+    """
+    host = host.rsplit('@', 1)[-1]
+    if host.startswith('['):
+        host = host.split(']', 1)[0] + ']'
+    else:
+        host = host.split(':', 1)[0]
+    return host[4:] if host.startswith('www.') else host
+
+
+class Frontier:
+    """
+    The Frontier class holds the URLs still to be fetched during a recursive
+    crawl. It is iterated by the Producer, and the Consumer feeds the links it
+    extracts back through `add_links`. Iteration ends once there is nothing left
+    to fetch and every URL handed out has been reported back, so the usual
+    sentinel ends the pipeline once the crawl is complete.
+    """
+
+    def __init__(self, seeds, max_depth=1, max_pages=None, same_domain=True, allowed_domains=None,
+                 seen=None, stop_event=None, expected_urls=None):
+        """
+        Initializes the Frontier.
+
+        Args:
+        - seeds (iterable): Seed URLs, crawled at depth 0. Consumed lazily.
+        - max_depth (int): Maximum number of links followed from a seed. 0 fetches the seeds only.
+        - max_pages (int or None): Maximum number of URLs admitted to the crawl, seeds included.
+        - same_domain (bool): Only follow links to the domains (or subdomains) of the seeds.
+        - allowed_domains (iterable or None): Extra domains (and their subdomains) links may point to.
+        - seen (BloomFilter or None): Seen-set of canonical URLs. Defaults to a BloomFilter sized for
+          `max_pages`, which it can never exceed, or without a budget to a ScalableBloomFilter that
+          grows past `expected_urls`.
+        - stop_event (threading.Event): Event that, once set, ends iteration early.
+        - expected_urls (int or None): Number of URLs the default seen-set of an unbudgeted crawl is
+          first sized for. None uses the ScalableBloomFilter default.
+        """
+        self.seeds = iter(seeds)
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.same_domain = same_domain
+        self.allowed_domains = set(allowed_domains or ())
+        if seen is None:
+            # Only admitted URLs are added, so a budgeted crawl knows its exact capacity.
+            if max_pages is not None:
+                seen = BloomFilter(capacity=max(1, max_pages))
+            elif expected_urls:
+                seen = ScalableBloomFilter(capacity=expected_urls)
+            else:
+                seen = ScalableBloomFilter()
+        self.seen = seen
+        self.stop_event = stop_event or threading.Event()
+        self.condition = threading.Condition()
+        self.pending = deque()
+        self.depths = {}
+        self.in_flight = 0
+        self.admitted = 0
+        self.discovered = 0
+        self.seeds_exhausted = False
+
+    def in_scope(self, url):
+        """
+        Checks if a discovered link may be followed.
+
+        Args:
+        - url (str): A canonical URL.
+
+        Returns:
+        - bool: True if the domain of the URL is allowed.
+        """
+        if not self.same_domain and not self.allowed_domains:
+            return True
+        domain = domain_of(host_of(url))
+        while domain:
+            if domain in self.allowed_domains:
+                return True
+            domain = domain.partition('.')[2]
+        return False
+
+    def _admit(self, url, depth):
+        """Queues a canonical URL if it is new and within budget. Caller holds the lock."""
+        if self.max_pages is not None and self.admitted >= self.max_pages:
+            return False
+        if not self.seen.add(url):
+            return False
+        self.admitted += 1
+        self.pending.append((url, depth))
+        return True
+
+    def _next_seed(self):
+        """Admits the next valid seed URL, if any. Caller holds the lock."""
+        for seed in self.seeds:
+            url = canonicalize_url(seed)
+            if url is None:
+                continue
+            if self.same_domain:
+                self.allowed_domains.add(domain_of(host_of(url)))
+            if self._admit(url, 0):
+                return True
+        self.seeds_exhausted = True
+        return False
+
+    def __iter__(self):
+        """
+        Yields URLs to fetch, blocking while pages are still being processed
+        and may yet add more links.
+
+        Yields:
+        - str: The next URL to fetch.
+        """
+        while True:
+            with self.condition:
+                while True:
+                    if self.stop_event.is_set():
+                        return
+                    if self.pending or (not self.seeds_exhausted and self._next_seed()):
+                        url, depth = self.pending.popleft()
+                        self.depths[url] = depth
+                        self.in_flight += 1
+                        break
+                    if self.in_flight == 0:
+                        return
+                    self.condition.wait(0.5)
+            yield url
+
+    def add_links(self, source_url, hyperlinks):
+        """
+        Reports the links extracted from a fetched page and marks it as done.
+
+        Args:
+        - source_url (str): The URL of the page, as yielded by the frontier.
+        - hyperlinks (list): Links extracted from the page.
+        """
+        with self.condition:
+            depth = self.depths.pop(source_url, None)
+            if depth is None:
+                return
+            self.in_flight -= 1
+            if depth < self.max_depth:
+                for link in hyperlinks:
+                    url = canonicalize_url(link)
+                    if url is not None and self.in_scope(url) and self._admit(url, depth + 1):
+                        self.discovered += 1
+            self.condition.notify_all()
+
+    def mark_done(self, url):
+        """
+        Marks a URL yielded by the frontier as finished without links, for
+        example because fetching it failed.
+
+        Args:
+        - url (str): The URL.
+        """
+        self.add_links(url, ())
+
+    def stats(self):
+        """
+        Returns the frontier counters.
+
+        Returns:
+        - dict: URLs admitted and discovered, pending and in flight.
+        """
+        with self.condition:
+            return {
+                "admitted": self.admitted,
+                "discovered": self.discovered,
+                "pending": len(self.pending),
+                "in_flight": self.in_flight,
+            }
@@ -0,0 +1,149 @@
+import queue
+import threading
+import time
+from collections import deque
+
+from metrics import QUEUE_ITEMS, STAGE_QUEUE_WAIT
+
+
+def item_size(item):
+    """
+    Returns the number of buffered bytes an item accounts for.
+
+    Args:
+    - item (tuple or None): A queue item, usually (source_url, html_content), or the None sentinel.
+
+    Returns:
+    - int: Total length of the str and bytes parts of the item.
+    """
+    if item is None:
+        return 0
+    return sum(len(part) for part in item if isinstance(part, (str, bytes)))
+
+
+class HandoffQueue:
+    """
+    The HandoffQueue class passes fetched pages from the Producer to the Consumer.
+    It is bounded both by item count and by the total size of the buffered HTML,
+    and `put` blocks until there is room instead of discarding pages.
+
+    It implements the parts of the `queue.Queue` interface used by the
+    Producer and Consumer (`put`, `get`, `qsize`, `empty`), so either can be used.
+    """
+
+    def __init__(self, max_items=1000, max_bytes=64 * 1024 * 1024, sizeof=item_size):
+        """
+        Initializes the HandoffQueue.
+
+        Args:
+        - max_items (int): Maximum number of buffered items.
+        - max_bytes (int): Maximum total size of the buffered items. A single item
+          larger than this is still accepted when the queue is empty.
+        - sizeof (callable): Returns the size of an item in bytes.
+        """
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.items = deque()
+        self.current_bytes = 0
+        self.mutex = threading.Lock()
+        self.not_empty = threading.Condition(self.mutex)
+        self.not_full = threading.Condition(self.mutex)
+        self.high_water_items = 0
+        self.high_water_bytes = 0
+        self.blocked_puts = 0
+        self.blocked_seconds = 0.0
+
+    def _has_room(self, size):
+        if not self.items:
+            return True
+        return len(self.items) < self.max_items and self.current_bytes + size <= self.max_bytes
+
+    def put(self, item, block=True, timeout=None):
+        """
+        Adds an item, waiting until the item and byte budgets allow it.
+
+        Args:
+        - item (tuple or None): The item to add.
+        - block (bool): Whether to wait for room. If False, raise `queue.Full` straight away.
+        - timeout (float or None): Maximum number of seconds to wait for room.
+
+        Raises:
+        - queue.Full: If there was no room within the timeout.
+        """
+        size = self.sizeof(item)
+        with self.not_full:
+            if not self._has_room(size):
+                if not block:
+                    raise queue.Full
+                self.blocked_puts += 1
+                started = time.monotonic()
+                try:
+                    if not self.not_full.wait_for(lambda: self._has_room(size), timeout):
+                        raise queue.Full
+                finally:
+                    self.blocked_seconds += time.monotonic() - started
+            self.items.append((item, size, time.monotonic()))
+            self.current_bytes += size
+            QUEUE_ITEMS.set(len(self.items))
+            self.high_water_items = max(self.high_water_items, len(self.items))
+            self.high_water_bytes = max(self.high_water_bytes, self.current_bytes)
+            self.not_empty.notify()
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def get(self, block=True, timeout=None):
+        """
+        Removes and returns the oldest item.
+
+        Args:
+        - block (bool): Whether to wait for an item. If False, raise `queue.Empty` straight away.
+        - timeout (float or None): Maximum number of seconds to wait for an item.
+
+        Returns:
+        - tuple or None: The oldest item.
+
+        Raises:
+        - queue.Empty: If no item arrived within the timeout.
+        """
+        with self.not_empty:
+            if not block:
+                if not self.items:
+                    raise queue.Empty
+            elif not self.not_empty.wait_for(lambda: self.items, timeout):
+                raise queue.Empty
+            item, size, queued_at = self.items.popleft()
+            self.current_bytes -= size
+            QUEUE_ITEMS.set(len(self.items))
+            STAGE_QUEUE_WAIT.observe(time.monotonic() - queued_at)
+            self.not_full.notify_all()
+            return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self):
+        with self.mutex:
+            return len(self.items)
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def stats(self):
+        """
+        Returns the buffer usage counters, for sizing memory on a given box.
+
+        Returns:
+        - dict: Current and high-water items and bytes, and how often and for
+          how long producers were blocked by a full queue.
+        """
+        with self.mutex:
+            return {
+                "items": len(self.items),
+                "bytes": self.current_bytes,
+                "high_water_items": self.high_water_items,
+                "high_water_bytes": self.high_water_bytes,
+                "blocked_puts": self.blocked_puts,
+                "blocked_seconds": round(self.blocked_seconds, 3),
+            }
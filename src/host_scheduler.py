@@ -0,0 +1,249 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import Counter, deque
+from urllib.parse import urlsplit
+
+
+def host_of(url):
+    """
+    Returns the host (including any port) a URL is fetched from.
+
+    Args:
+    - url (str): The URL.
+
+    Returns:
+    - str: The lower-cased network location of the URL.
+    """
+    return urlsplit(url).netloc.lower()
+
+
+class HostScheduler:
+    """
+    The HostScheduler class hands out URLs to fetch workers so that no host has
+    more than `max_per_host` requests in flight or is hit more often than once
+    every `min_delay` seconds. URLs are kept in one queue per host and hosts are
+    served round-robin, so a list dominated by one domain does not starve the others.
+
+    Failed URLs can be handed back with `retry`, to be handed out again after a
+    delay; no worker waits in the meantime. With an `AdaptiveLimiter`, the
+    number of requests in flight, in total and per host, follows its limits.
+    """
+
+    # Hosts whose dispatch counts are tracked, of which the busiest are reported by `stats`.
+    TRACKED_HOSTS = 100
+    TOP_HOSTS = 10
+
+    def __init__(self, max_per_host=2, min_delay=0.0, max_pending=10000, limiter=None):
+        """
+        Initializes the HostScheduler.
+
+        Args:
+        - max_per_host (int): Maximum number of concurrent requests to one host.
+        - min_delay (float): Minimum number of seconds between two requests to one host.
+        - max_pending (int): Maximum number of URLs buffered across all hosts. `add` blocks beyond it.
+        - limiter (AdaptiveLimiter or None): Adaptive limits on the requests in flight, below `max_per_host`.
+        """
+        self.max_per_host = max_per_host
+        self.min_delay = min_delay
+        self.max_pending = max_pending
+        self.limiter = limiter
+        self.in_flight = 0
+        self.delayed = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.queues = {}
+        self.ring = deque()
+        self.active = Counter()
+        self.next_allowed = {}
+        self.pending = 0
+        self.closed = False
+        self.dispatched = 0
+        self.host_dispatches = Counter()
+
+    def add(self, url, timeout=None):
+        """
+        Queues a URL behind the other URLs of its host.
+
+        Args:
+        - url (str): The URL to be fetched.
+        - timeout (float or None): Maximum number of seconds to wait while the scheduler is full.
+
+        Returns:
+        - bool: True if the URL was queued, False if the scheduler stayed full.
+        """
+        host = host_of(url)
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.pending < self.max_pending, timeout):
+                return False
+            self._enqueue(host, url)
+            self.condition.notify_all()
+            return True
+
+    def _enqueue(self, host, url):
+        """Queues a URL behind the other URLs of its host. Caller holds the lock."""
+        if host not in self.queues:
+            self.queues[host] = deque()
+            self.ring.append(host)
+        self.queues[host].append(url)
+        self.pending += 1
+
+    def retry(self, url, delay, pause_host=False):
+        """
+        Queues a URL handed out by `acquire` again once `delay` seconds have
+        passed. Call it before releasing the URL, so that the scheduler does not
+        report itself drained in between.
+
+        Args:
+        - url (str): The URL to fetch again.
+        - delay (float): Seconds to wait before the URL may be handed out.
+        - pause_host (bool): Also hold back the other URLs of the host until then,
+          as when the server asked for a pause with `Retry-After`.
+        """
+        due = time.monotonic() + delay
+        with self.condition:
+            heapq.heappush(self.delayed, (due, next(self.sequence), url))
+            if pause_host:
+                host = host_of(url)
+                self.next_allowed[host] = max(self.next_allowed.get(host, 0.0), due)
+            self.condition.notify_all()
+
+    def _promote_due(self, now):
+        """Moves the retries whose delay has passed to their host queues. Caller holds the lock."""
+        while self.delayed and self.delayed[0][0] <= now:
+            _, _, url = heapq.heappop(self.delayed)
+            self._enqueue(host_of(url), url)
+
+    def _host_limit(self, host):
+        if self.limiter is None:
+            return self.max_per_host
+        return min(self.max_per_host, self.limiter.host_limit(host))
+
+    def close(self):
+        """Signals that no more URLs will be added; `acquire` returns None once all are handed out."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def discard(self):
+        """
+        Drops every URL still waiting to be handed out, retries included. Requests already
+        handed out are unaffected.
+
+        Returns:
+        - int: The number of URLs dropped.
+        """
+        with self.condition:
+            dropped = self.pending + len(self.delayed)
+            self.queues.clear()
+            self.ring.clear()
+            self.delayed.clear()
+            self.pending = 0
+            self.condition.notify_all()
+            return dropped
+
+    def acquire(self, timeout=None):
+        """
+        Waits for and returns the next URL whose host may be contacted now.
+        The caller must call `release` with the URL once the request is done.
+
+        Args:
+        - timeout (float or None): Maximum number of seconds to wait.
+
+        Returns:
+        - str or None: The next URL, or None if the timeout expired or the scheduler is closed
+          and drained: nothing queued, waiting for a retry or in flight (which could still be retried).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                self._promote_due(now)
+                earliest = self.delayed[0][0] if self.delayed else None
+                at_limit = self.limiter is not None and self.in_flight >= self.limiter.total_limit()
+                for _ in range(0 if at_limit else len(self.ring)):
+                    host = self.ring[0]
+                    self.ring.rotate(-1)
+                    if self.active[host] >= self._host_limit(host):
+                        continue
+                    allowed_at = self.next_allowed.get(host, 0.0)
+                    if allowed_at > now:
+                        earliest = allowed_at if earliest is None else min(earliest, allowed_at)
+                        continue
+                    url = self.queues[host].popleft()
+                    if not self.queues[host]:
+                        del self.queues[host]
+                        self.ring.pop()
+                    self.active[host] += 1
+                    self.in_flight += 1
+                    self._count_dispatch(host)
+                    if self.min_delay:
+                        self.next_allowed[host] = now + self.min_delay
+                        if len(self.next_allowed) > 2 * len(self.queues) + 1024:
+                            self._prune_delays(now)
+                    self.pending -= 1
+                    self.condition.notify_all()
+                    return url
+
+                if self.closed and not self.pending and not self.delayed and not self.in_flight:
+                    return None
+                wait = None if earliest is None else earliest - now
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        return None
+                    wait = remaining if wait is None else min(wait, remaining)
+                self.condition.wait(wait)
+
+    def release(self, url):
+        """
+        Marks the request for a URL handed out by `acquire` as finished.
+
+        Args:
+        - url (str): The URL that was fetched.
+        """
+        host = host_of(url)
+        with self.condition:
+            self.active[host] -= 1
+            self.in_flight -= 1
+            if self.active[host] <= 0:
+                del self.active[host]
+                if host not in self.queues and self.next_allowed.get(host, 0.0) <= time.monotonic():
+                    self.next_allowed.pop(host, None)
+            self.condition.notify_all()
+
+    def _count_dispatch(self, host):
+        """
+        Counts a request to a host. Only `TRACKED_HOSTS` hosts are counted, with the Space-Saving
+        algorithm: a new host replaces the least busy one and inherits its count, so the busiest
+        hosts are kept, and their counts overestimated by at most the count they inherited. Caller
+        holds the lock.
+        """
+        self.dispatched += 1
+        counts = self.host_dispatches
+        if host not in counts and len(counts) >= self.TRACKED_HOSTS:
+            least = min(counts, key=counts.get)
+            counts[host] = counts.pop(least)
+        counts[host] += 1
+
+    def _prune_delays(self, now):
+        """Forgets the delays of hosts that may be contacted again. Caller holds the lock."""
+        self.next_allowed = {host: allowed_at for host, allowed_at in self.next_allowed.items() if allowed_at > now}
+
+    def stats(self):
+        """
+        Returns the scheduler counters.
+
+        Returns:
+        - dict: Pending URLs, hosts with pending URLs, URLs waiting to be retried, requests
+          dispatched, and the requests dispatched to the `TOP_HOSTS` busiest hosts.
+        """
+        with self.condition:
+            return {
+                "pending": self.pending,
+                "retrying": len(self.delayed),
+                "hosts_pending": len(self.queues),
+                "dispatched": self.dispatched,
+                "top_hosts": dict(self.host_dispatches.most_common(self.TOP_HOSTS)),
+            }
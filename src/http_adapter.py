@@ -0,0 +1,127 @@
+import socket
+import threading
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from metrics import STAGE_CONNECT
+
+
+class CachedResolutionMixin:
+    """
+    Connection mixin that resolves the host through a DNSCache, when the class
+    has one, and connects to its addresses in turn. The host name itself is
+    still sent in the Host header and used for TLS SNI and certificate checks.
+    Resolution failures raise NewConnectionError, as urllib3 1.26 does for them
+    (2.x's NameResolutionError subclasses it).
+    """
+
+    dns_cache = None
+
+    def _new_conn(self):
+        if self.dns_cache is None:
+            return super()._new_conn()
+        try:
+            addresses = self.dns_cache.resolve(self._dns_host)
+        except socket.gaierror as e:
+            raise NewConnectionError(self, f"Failed to resolve {self.host!r}: {e}") from e
+        host = self._dns_host
+        try:
+            for i, (_, address) in enumerate(addresses):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except (ConnectTimeoutError, NewConnectionError):
+                    if i == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = host
+        raise NewConnectionError(self, f"Failed to resolve {self.host!r}: no addresses")
+
+
+class TimedHTTPConnection(CachedResolutionMixin, HTTPConnection):
+    """HTTPConnection that records DNS resolution and connection setup time."""
+
+    def connect(self):
+        with STAGE_CONNECT.time():
+            super().connect()
+
+
+class TimedHTTPSConnection(CachedResolutionMixin, HTTPSConnection):
+    """HTTPSConnection that records DNS resolution, connection setup and TLS handshake time."""
+
+    def connect(self):
+        with STAGE_CONNECT.time():
+            super().connect()
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+def _resolving_pool(pool_class, dns_cache):
+    """Returns a subclass of a timed pool class whose connections resolve hosts through the given DNSCache."""
+    connection_class = type(pool_class.ConnectionCls.__name__, (pool_class.ConnectionCls,), {"dns_cache": dns_cache})
+    return type(pool_class.__name__, (pool_class,), {"ConnectionCls": connection_class})
+
+
+def _pool_host(pool):
+    """Returns the "host:port" a connection pool connects to."""
+    return f"{pool.host}:{pool.port}" if pool.port else pool.host
+
+
+class InstrumentedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connection pools time every new connection and optionally
+    share a DNS cache. It keeps the request and connection counts of the pools
+    the PoolManager evicts, so `connection_counts` covers every host.
+    """
+
+    def __init__(self, *args, dns_cache=None, **kwargs):
+        # HTTPAdapter.__init__ calls init_poolmanager, which needs the cache and the counts.
+        self.dns_cache = dns_cache
+        self.retired_counts = {}
+        self.retired_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        pool_classes = {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+        if self.dns_cache is not None:
+            pool_classes = {scheme: _resolving_pool(pool_class, self.dns_cache)
+                            for scheme, pool_class in pool_classes.items()}
+        self.poolmanager.pool_classes_by_scheme = pool_classes
+        self.poolmanager.pools.dispose_func = self._retire_pool
+
+    def _retire_pool(self, pool):
+        """Adds the counts of a pool the PoolManager dropped to the totals of its host, then closes it."""
+        with self.retired_lock:
+            counts = self.retired_counts.setdefault(_pool_host(pool), [0, 0])
+            counts[0] += pool.num_requests
+            counts[1] += pool.num_connections
+        pool.close()
+
+    def connection_counts(self):
+        """
+        Returns the number of requests and new connections per host since the adapter was created.
+
+        Returns:
+        - dict: Maps "host:port" to a [requests, connections] list.
+        """
+        with self.retired_lock:
+            counts = {host: list(host_counts) for host, host_counts in self.retired_counts.items()}
+        pools = self.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host_counts = counts.setdefault(_pool_host(pool), [0, 0])
+            host_counts[0] += pool.num_requests
+            host_counts[1] += pool.num_connections
+        return counts
@@ -0,0 +1,315 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class CachedResponse:
+    """
+    A cached HTTP response body together with its validators and freshness.
+    """
+
+    __slots__ = ("body", "etag", "last_modified", "expires_at", "encoding", "final_url")
+
+    def __init__(self, body, etag=None, last_modified=None, expires_at=0.0, encoding=None, final_url=None):
+        """
+        Args:
+        - body (bytes or str): The response body. Caches written by earlier versions hold text.
+        - etag (str or None): Value of the `ETag` response header.
+        - last_modified (str or None): Value of the `Last-Modified` response header.
+        - expires_at (float): Unix time after which the entry must be revalidated.
+        - encoding (str or None): Encoding of the body declared in the `Content-Type` header.
+        - final_url (str or None): URL the response came from after redirects, None if it is the cached URL.
+        """
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+        self.encoding = encoding
+        self.final_url = final_url
+
+    @property
+    def size(self):
+        return len(self.body)
+
+    def is_fresh(self, now=None):
+        return (now or time.time()) < self.expires_at
+
+    def conditional_headers(self):
+        """
+        Returns the request headers needed to revalidate this entry.
+
+        Returns:
+        - dict: `If-None-Match` and/or `If-Modified-Since` headers.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HTTPCache:
+    """
+    The HTTPCache class keeps fetched responses in an in-memory LRU bounded by
+    total body size, optionally backed by a SQLite file that survives restarts.
+    Entries past their TTL are revalidated with conditional requests rather
+    than downloaded again.
+
+    Writes to the SQLite file are buffered and committed in batches, outside
+    the lock guarding the memory tier, so that fetch workers do not queue
+    behind the disk. Entries stale for longer than `max_stale` are pruned from
+    the file, and the oldest ones too while it holds more than `max_disk_bytes`.
+    """
+
+    # Buffered writes that trigger a commit, and the longest a write stays buffered.
+    WRITE_BATCH = 64
+    WRITE_INTERVAL = 1.0
+    # Commits between two prunings of the on-disk store.
+    PRUNE_EVERY = 100
+
+    def __init__(self, max_bytes=50 * 1024 * 1024, ttl=3600, directory=None, max_disk_bytes=1024 * 1024 * 1024,
+                 max_stale=7 * 24 * 3600):
+        """
+        Initializes the HTTPCache.
+
+        Args:
+        - max_bytes (int): Maximum total size of the bodies kept in memory. 0 disables the memory tier.
+        - ttl (float): Seconds during which an entry is served without contacting the server.
+        - directory (str or None): Directory of the on-disk store. None keeps the cache in memory only.
+        - max_disk_bytes (int): Total size of the bodies the on-disk store is pruned down to.
+        - max_stale (float): Seconds past its TTL an entry is kept on disk for revalidation.
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.max_disk_bytes = max_disk_bytes
+        self.max_stale = max_stale
+        self.pruned = 0
+        # Entries waiting to be written to disk, guarded by `lock` like the memory tier.
+        self.unsaved = {}
+        self.last_write = time.monotonic()
+        self.commits = 0
+        self.db = None
+        # Serialises use of the SQLite connection; never taken while holding `lock`.
+        self.db_lock = threading.Lock()
+        if directory:
+            import sqlite3
+            os.makedirs(directory, exist_ok=True)
+            self.db = sqlite3.connect(os.path.join(directory, "http_cache.sqlite3"), check_same_thread=False,
+                                      timeout=30)
+            # Without a sync on every commit, a crash loses at most the last entries, which are only a cache.
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "url TEXT PRIMARY KEY, body BLOB, etag TEXT, last_modified TEXT, expires_at REAL, encoding TEXT)"
+            )
+            columns = [row[1] for row in self.db.execute("PRAGMA table_info(responses)")]
+            if "encoding" not in columns:
+                self.db.execute("ALTER TABLE responses ADD COLUMN encoding TEXT")
+            if "final_url" not in columns:
+                self.db.execute("ALTER TABLE responses ADD COLUMN final_url TEXT")
+            self.db.execute("CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at)")
+            self.db.commit()
+            self.prune()
+
+    def get(self, url):
+        """
+        Returns the cached response for the given URL, fresh or stale.
+
+        Args:
+        - url (str): The URL to look up.
+
+        Returns:
+        - CachedResponse or None: The cached response, or None if the URL is not cached.
+        """
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is not None:
+                self.entries.move_to_end(url)
+                return entry
+            entry = self.unsaved.get(url)
+            if entry is not None or self.db is None:
+                return entry
+        with self.db_lock:
+            if self.db is None:
+                return None
+            row = self.db.execute(
+                "SELECT body, etag, last_modified, expires_at, encoding, final_url FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = CachedResponse(*row)
+        with self.lock:
+            # A newer entry may have been saved while the disk was read.
+            if url in self.entries or url in self.unsaved:
+                return self.entries.get(url) or self.unsaved[url]
+            self._remember(url, entry)
+        return entry
+
+    def lookup(self, url):
+        """
+        Returns the cached body if it can be served without a request, and
+        records a hit or miss.
+
+        Args:
+        - url (str): The URL to look up.
+
+        Returns:
+        - tuple: (body or None, entry or None). The body is set only for fresh
+          entries; a stale entry is returned so that it can be revalidated.
+        """
+        entry = self.get(url)
+        with self.lock:
+            if entry is not None and entry.is_fresh():
+                self.hits += 1
+                return entry.body, entry
+            self.misses += 1
+        return None, entry
+
+    def store(self, url, body, headers, encoding=None, final_url=None):
+        """
+        Caches a full response.
+
+        Args:
+        - url (str): The fetched URL.
+        - body (bytes or str): The response body.
+        - headers (Mapping): The response headers.
+        - encoding (str or None): Encoding of the body declared in the `Content-Type` header.
+        - final_url (str or None): URL the response came from after redirects.
+
+        Returns:
+        - CachedResponse: The stored entry.
+        """
+        entry = CachedResponse(body, headers.get("ETag"), headers.get("Last-Modified"), time.time() + self.ttl,
+                               encoding, final_url if final_url != url else None)
+        self._save(url, entry)
+        return entry
+
+    def revalidated(self, url, entry, headers):
+        """
+        Refreshes a stale entry after the server answered 304 Not Modified.
+
+        Args:
+        - url (str): The fetched URL.
+        - entry (CachedResponse): The entry that was revalidated.
+        - headers (Mapping): The headers of the 304 response.
+
+        Returns:
+        - bytes or str: The cached body.
+        """
+        entry = CachedResponse(entry.body, headers.get("ETag") or entry.etag,
+                               headers.get("Last-Modified") or entry.last_modified, time.time() + self.ttl,
+                               entry.encoding, entry.final_url)
+        self._save(url, entry)
+        with self.lock:
+            self.revalidations += 1
+        return entry.body
+
+    def _save(self, url, entry):
+        with self.lock:
+            self._remember(url, entry)
+            if self.db is None:
+                return
+            self.unsaved[url] = entry
+            if len(self.unsaved) < self.WRITE_BATCH and time.monotonic() - self.last_write < self.WRITE_INTERVAL:
+                return
+        self.flush()
+
+    def flush(self):
+        """Writes the buffered entries to the on-disk store in one transaction."""
+        with self.db_lock:
+            with self.lock:
+                unsaved, self.unsaved = self.unsaved, {}
+                self.last_write = time.monotonic()
+            if self.db is None or not unsaved:
+                return
+            self.db.executemany(
+                "INSERT OR REPLACE INTO responses (url, body, etag, last_modified, expires_at, encoding, final_url) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(url, entry.body, entry.etag, entry.last_modified, entry.expires_at, entry.encoding, entry.final_url)
+                 for url, entry in unsaved.items()],
+            )
+            self.db.commit()
+            self.commits += 1
+            prune = self.commits % self.PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """
+        Deletes the entries stale for longer than `max_stale` from the on-disk
+        store, then the entries expiring first while the bodies it holds
+        exceed `max_disk_bytes`.
+        """
+        with self.db_lock:
+            if self.db is None:
+                return
+            pruned = self.db.execute("DELETE FROM responses WHERE expires_at < ?",
+                                     (time.time() - self.max_stale,)).rowcount
+            total = self.db.execute("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM responses").fetchone()[0]
+            if total > self.max_disk_bytes:
+                excess = total - self.max_disk_bytes
+                doomed = []
+                for url, size in self.db.execute("SELECT url, LENGTH(body) FROM responses ORDER BY expires_at"):
+                    doomed.append((url,))
+                    excess -= size or 0
+                    if excess <= 0:
+                        break
+                self.db.executemany("DELETE FROM responses WHERE url = ?", doomed)
+                pruned += len(doomed)
+            self.db.commit()
+        if pruned:
+            with self.lock:
+                self.pruned += pruned
+            logging.info("Pruned %d entries from the on-disk HTTP cache", pruned)
+
+    def _remember(self, url, entry):
+        """Adds an entry to the memory tier, evicting least recently used entries. Caller holds the lock."""
+        old = self.entries.pop(url, None)
+        if old is not None:
+            self.current_bytes -= old.size
+        if entry.size > self.max_bytes:
+            return
+        self.entries[url] = entry
+        self.current_bytes += entry.size
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.current_bytes -= evicted.size
+            self.evictions += 1
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns:
+        - dict: Hits, misses, revalidations, evictions, entries pruned from disk, entries and bytes held in memory.
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+                "pruned": self.pruned,
+                "entries": len(self.entries),
+                "bytes": self.current_bytes,
+            }
+
+    def close(self):
+        """Writes the buffered entries and closes the on-disk store."""
+        self.flush()
+        with self.db_lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+        logging.info("HTTP cache stats: %s", self.stats())
@@ -0,0 +1,146 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+FETCHED, FAILED, EMITTED = "F", "X", "E"
+
+
+class Journal:
+    """
+    The Journal class keeps an append-only record of the progress of a run, one
+    `<state>\\t<url>` line per event: F when a page was fetched, X when fetching
+    it failed and E when its links were emitted. Lines are buffered and appended
+    in batches, so that journaling costs a list append per page.
+
+    When results go to an output sink, E lines are held back until the sink has
+    flushed the results they refer to (see `release_emitted`), so the journal
+    never claims a page whose results were lost in a crash.
+    """
+
+    def __init__(self, path, resume=False, flush_records=1000, flush_interval=1.0, hold_emitted=False):
+        """
+        Initializes the Journal.
+
+        Args:
+        - path (str): Path of the journal file.
+        - resume (bool): Append to an existing journal instead of starting a new one.
+        - flush_records (int): Number of buffered lines that triggers a write.
+        - flush_interval (float): Maximum number of seconds between writes while events arrive.
+        - hold_emitted (bool): Hold E lines until `release_emitted` is called.
+        """
+        self.path = path
+        if resume:
+            _truncate_torn_line(path)
+        self.file = open(path, 'a' if resume else 'w', encoding='utf-8')
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.hold_emitted = hold_emitted
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.held = []
+        self.last_flush = time.monotonic()
+        self.counts = Counter()
+
+    def record(self, state, url):
+        """
+        Buffers one event, writing the buffer out if it is due.
+
+        Args:
+        - state (str): FETCHED, FAILED or EMITTED.
+        - url (str): The URL.
+        """
+        with self.lock:
+            self.buffer.append(f"{state}\t{url}\n")
+            self.counts[state] += 1
+            due = len(self.buffer) >= self.flush_records or time.monotonic() - self.last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def fetched(self, url):
+        self.record(FETCHED, url)
+
+    def failed(self, url):
+        self.record(FAILED, url)
+
+    def emitted(self, url):
+        if not self.hold_emitted:
+            self.record(EMITTED, url)
+            return
+        with self.lock:
+            self.held.append(url)
+
+    def release_emitted(self):
+        """
+        Journals the held E lines and writes them out. Called once the results
+        they refer to have been written out.
+        """
+        with self.lock:
+            self.buffer.extend(f"{EMITTED}\t{url}\n" for url in self.held)
+            self.counts[EMITTED] += len(self.held)
+            self.held.clear()
+        self.flush()
+
+    def flush(self):
+        """Appends the buffered lines to the journal file."""
+        with self.lock:
+            if self.buffer:
+                self.file.write("".join(self.buffer))
+                self.buffer.clear()
+                self.file.flush()
+            self.last_flush = time.monotonic()
+
+    def close(self):
+        """Writes the remaining lines, syncs the file to disk and closes it."""
+        self.flush()
+        with self.lock:
+            os.fsync(self.file.fileno())
+            self.file.close()
+        logging.info("Journal %s: %d fetched, %d failed, %d emitted", self.path, self.counts[FETCHED],
+                     self.counts[FAILED], self.counts[EMITTED])
+
+
+def _truncate_torn_line(path, chunk_size=4096):
+    """Cuts off a last line left without its newline by a crash, so that appended lines start on their own."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - chunk_size)
+            f.seek(start)
+            chunk = f.read(position - start)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position != end:
+            f.truncate(position)
+
+
+def load_journal(path):
+    """
+    Reads a journal back.
+
+    Args:
+    - path (str): Path of the journal file.
+
+    Returns:
+    - dict: The latest state of every URL in the journal. EMITTED is final, and
+      a line cut short by a crash is ignored.
+
+    Raises:
+    - FileNotFoundError: If the journal does not exist.
+    """
+    states = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            state, _, url = line[:-1].partition("\t")
+            if states.get(url) != EMITTED:
+                states[url] = state
+    return states
@@ -0,0 +1,519 @@
+import bisect
+import heapq
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from collections import Counter
+from itertools import accumulate, islice
+from operator import itemgetter
+
+from frontier import domain_of
+
+# Files of a graph directory. All integers are little-endian.
+MANIFEST = "graph.json"      # URL, byte and edge counts, the segment files, and whether the graph was closed
+URLS = "urls.dat"            # UTF-8 URLs, concatenated in ID order
+URL_INDEX = "urls.idx"       # uint64[URL count]: offset of each URL in urls.dat
+URL_HASH = "urls.hash"       # uint32[power of two]: open-addressing table of URL ID + 1, 0 for empty slots
+IN_DEGREES = "indegree.bin"  # uint32[URL count]: number of links to each URL
+TOP_LINKED = "top.bin"       # uint32[up to TOP_KEPT]: IDs of the most-linked URLs, most-linked first
+DOMAINS = "domains.tsv"      # domain, URL count and links in, one domain per line, most-linked first
+
+TOP_KEPT = 1000
+SEGMENT_MAGIC = b"WLXG"
+# magic, edge count, number of URLs with out-links, number of URLs with in-links
+_SEGMENT_HEADER = struct.Struct('<4sIII')
+
+
+def _little_endian(values):
+    """Returns the bytes of an array in little-endian order."""
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _uint_array(buffer, typecode):
+    """
+    Returns an array-like view of little-endian integers in a buffer. On
+    little-endian machines this is a zero-copy cast of the buffer.
+    """
+    if sys.byteorder == 'little':
+        return memoryview(buffer).cast(typecode)
+    values = array(typecode, bytes(buffer))
+    values.byteswap()
+    return values
+
+
+def _domain_of_url(url):
+    """Returns the domain of a canonical URL, see `frontier.domain_of`."""
+    parts = url.split('/', 3)
+    return domain_of(parts[2]) if len(parts) > 2 else ''
+
+
+def _replace_file(path, *chunks):
+    """Writes a file under a temporary name and moves it into place, so readers never see it half-written."""
+    with open(path + ".tmp", 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(path + ".tmp", path)
+
+
+class LinkGraphWriter:
+    """
+    The LinkGraphWriter class builds a link graph on disk as pages are parsed.
+    URLs are interned to consecutive integer IDs, and the links of every
+    `segment_edges` links are written out as a segment holding two compressed
+    sparse row (CSR) structures: one from source to target URLs and one from
+    target to source URLs. Closing the writer adds the URL lookup table,
+    in-degrees and per-domain counts that `LinkGraph` queries through memory maps.
+
+    The map from URL to ID is kept in memory while writing. Segments are not
+    merged, so a query looks up a URL once per segment.
+    """
+
+    def __init__(self, directory, segment_edges=1 << 21, append=False):
+        """
+        Initializes the LinkGraphWriter.
+
+        Args:
+        - directory (str): Directory to write the graph to. Created if needed.
+        - segment_edges (int): Number of links buffered before a segment is written.
+        - append (bool): Add to the graph already in the directory instead of replacing it. URLs and
+          segments written after its last flush, as by a crashed run, are dropped.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_edges = segment_edges
+        self.ids = {}
+        self.in_degrees = array('I')
+        self.node_domains = array('I')
+        self.domain_ids = {}
+        self.domain_urls = array('I')
+        self.domain_links = array('I')
+        self.segments = []
+        self.edges = 0
+        self.url_bytes = 0
+        self.pages = []
+        self.pending_edges = 0
+        self.url_buffer = bytearray()
+        self.url_offsets = array('Q')
+
+        manifest = self._read_manifest() if append else None
+        if manifest is not None:
+            self._load(manifest)
+        self._remove_stale_segments()
+        mode = 'ab' if manifest is not None else 'wb'
+        self.url_file = open(self.path(URLS), mode)
+        self.index_file = open(self.path(URL_INDEX), mode)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_manifest(self):
+        try:
+            with open(self.path(MANIFEST), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _load(self, manifest):
+        """Reads back the URLs and in-degrees of an existing graph to add to it."""
+        with open(self.path(URLS), 'r+b') as f:
+            f.truncate(manifest["url_bytes"])
+            data = f.read()
+        with open(self.path(URL_INDEX), 'r+b') as f:
+            f.truncate(8 * manifest["urls"])
+            offsets = _uint_array(f.read(), 'Q')
+        for node, start in enumerate(offsets):
+            end = offsets[node + 1] if node + 1 < len(offsets) else len(data)
+            url = data[start:end].decode('utf-8')
+            self.ids[url] = node
+            self._register(url)
+        self.url_bytes = len(data)
+        self.segments = manifest["segments"]
+        self.edges = manifest["edges"]
+        for name in self.segments:
+            with open(self.path(name), 'rb') as f:
+                segment = _Segment(f.read())
+            for node, count in segment.in_degrees():
+                self.in_degrees[node] += count
+                self.domain_links[self.node_domains[node]] += count
+
+    def _remove_stale_segments(self):
+        kept = set(self.segments)
+        for name in os.listdir(self.directory):
+            if name.startswith("edges-") and name.endswith(".seg") and name not in kept:
+                os.remove(self.path(name))
+
+    def _register(self, url):
+        """Adds the in-memory counters of a newly interned URL."""
+        self.in_degrees.append(0)
+        domain = _domain_of_url(url)
+        domain_id = self.domain_ids.get(domain)
+        if domain_id is None:
+            domain_id = self.domain_ids[domain] = len(self.domain_ids)
+            self.domain_urls.append(0)
+            self.domain_links.append(0)
+        self.node_domains.append(domain_id)
+        self.domain_urls[domain_id] += 1
+
+    def intern(self, url):
+        """
+        Returns the ID of a URL, assigning the next free one to a new URL.
+
+        Args:
+        - url (str): The URL.
+
+        Returns:
+        - int: Its ID.
+        """
+        node = self.ids.get(url)
+        if node is None:
+            node = self.ids[url] = len(self.ids)
+            self._register(url)
+            data = url.encode('utf-8')
+            self.url_offsets.append(self.url_bytes)
+            self.url_bytes += len(data)
+            self.url_buffer += data
+        return node
+
+    def add(self, source_url, hyperlinks):
+        """
+        Adds the links of one page, writing a segment once enough links are buffered.
+
+        Args:
+        - source_url (str): The URL of the page.
+        - hyperlinks (list): The URLs it links to, without duplicates.
+        """
+        source = self.intern(source_url)
+        targets = array('I', map(self.intern, hyperlinks))
+        if not targets:
+            return
+        self.pages.append((source, targets))
+        in_degrees, domain_links, node_domains = self.in_degrees, self.domain_links, self.node_domains
+        for target in targets:
+            in_degrees[target] += 1
+            domain_links[node_domains[target]] += 1
+        self.pending_edges += len(targets)
+        if self.pending_edges >= self.segment_edges:
+            self.flush()
+
+    def flush(self):
+        """Writes out the new URLs and the buffered links as a segment."""
+        self.url_file.write(self.url_buffer)
+        self.index_file.write(_little_endian(self.url_offsets))
+        self.url_file.flush()
+        self.index_file.flush()
+        self.url_buffer.clear()
+        self.url_offsets = array('Q')
+        if self.pages:
+            self._write_segment()
+        self._write_manifest(complete=False)
+
+    def _write_segment(self):
+        pages = sorted(self.pages, key=itemgetter(0))
+        out_nodes, out_offsets, out_targets = array('I'), array('I', [0]), array('I')
+        for source, targets in pages:
+            if out_nodes and out_nodes[-1] == source:
+                out_offsets[-1] += len(targets)
+            else:
+                out_nodes.append(source)
+                out_offsets.append(out_offsets[-1] + len(targets))
+            out_targets.extend(targets)
+
+        # Transpose by sorting (target, source) pairs packed into one integer each.
+        keys = sorted(target << 32 | source for source, targets in pages for target in targets)
+        in_sources = array('I', [key & 0xFFFFFFFF for key in keys])
+        counts = Counter(key >> 32 for key in keys)
+        in_nodes = array('I', sorted(counts))
+        in_offsets = array('I', [0])
+        in_offsets.extend(accumulate(map(counts.__getitem__, in_nodes)))
+
+        name = f"edges-{len(self.segments):05d}.seg"
+        _replace_file(self.path(name), _SEGMENT_HEADER.pack(SEGMENT_MAGIC, len(keys), len(out_nodes), len(in_nodes)),
+                      *map(_little_endian, (out_nodes, out_offsets, out_targets, in_nodes, in_offsets, in_sources)))
+        self.segments.append(name)
+        self.edges += len(keys)
+        self.pages = []
+        self.pending_edges = 0
+
+    def _write_manifest(self, complete):
+        manifest = {
+            "version": 1,
+            "urls": len(self.ids),
+            "url_bytes": self.url_bytes,
+            "edges": self.edges,
+            "segments": self.segments,
+            "complete": complete,
+        }
+        _replace_file(self.path(MANIFEST), json.dumps(manifest, indent=1).encode('utf-8'))
+
+    def _write_url_hash(self):
+        size = 1
+        while size < 2 * len(self.ids):
+            size *= 2
+        mask = size - 1
+        table = array('I', bytes(4 * size))
+        for url, node in self.ids.items():
+            slot = zlib.crc32(url.encode('utf-8')) & mask
+            while table[slot]:
+                slot = (slot + 1) & mask
+            table[slot] = node + 1
+        _replace_file(self.path(URL_HASH), _little_endian(table))
+
+    def _write_counts(self):
+        in_degrees = self.in_degrees
+        _replace_file(self.path(IN_DEGREES), _little_endian(in_degrees))
+        top = heapq.nlargest(TOP_KEPT, range(len(in_degrees)), key=in_degrees.__getitem__)
+        _replace_file(self.path(TOP_LINKED), _little_endian(array('I', top)))
+
+        domains = sorted(self.domain_ids.items(), key=lambda item: (-self.domain_links[item[1]], item[0]))
+        lines = (f"{domain}\t{self.domain_urls[d]}\t{self.domain_links[d]}\n" for domain, d in domains)
+        _replace_file(self.path(DOMAINS), "".join(lines).encode('utf-8'))
+
+    def close(self):
+        """Writes the remaining links and the lookup tables, and marks the graph complete."""
+        self.flush()
+        self.url_file.close()
+        self.index_file.close()
+        self._write_url_hash()
+        self._write_counts()
+        self._write_manifest(complete=True)
+        logging.info("Link graph written to %s: %d URLs, %d links in %d segments.", self.directory, len(self.ids),
+                     self.edges, len(self.segments))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _Segment:
+    """One segment of links, viewed in place in a buffer such as a memory map."""
+
+    def __init__(self, buffer):
+        magic, edges, out_count, in_count = _SEGMENT_HEADER.unpack_from(buffer, 0)
+        if magic != SEGMENT_MAGIC:
+            raise ValueError("Corrupt link graph segment")
+        view = memoryview(buffer)
+        offset = _SEGMENT_HEADER.size
+        arrays = []
+        for length in (out_count, out_count + 1, edges, in_count, in_count + 1, edges):
+            arrays.append(_uint_array(view[offset:offset + 4 * length], 'I'))
+            offset += 4 * length
+        self.views = arrays + [view]
+        self.out_nodes, self.out_offsets, self.out_targets, self.in_nodes, self.in_offsets, self.in_sources = arrays
+
+    @staticmethod
+    def _row(nodes, offsets, values, node):
+        i = bisect.bisect_left(nodes, node)
+        if i < len(nodes) and nodes[i] == node:
+            return values[offsets[i]:offsets[i + 1]].tolist()
+        return []
+
+    def out_links(self, node):
+        return self._row(self.out_nodes, self.out_offsets, self.out_targets, node)
+
+    def in_links(self, node):
+        return self._row(self.in_nodes, self.in_offsets, self.in_sources, node)
+
+    def in_degrees(self):
+        """Yields (URL ID, number of links to it in this segment)."""
+        offsets = self.in_offsets
+        for i, node in enumerate(self.in_nodes):
+            yield node, offsets[i + 1] - offsets[i]
+
+    def release(self):
+        for view in reversed(self.views):
+            if isinstance(view, memoryview):
+                view.release()
+
+
+class LinkGraph:
+    """
+    The LinkGraph class answers queries on a graph written by `LinkGraphWriter`.
+    Every file is memory-mapped and read in place: a query touches only the
+    pages of the files it needs, and no per-URL or per-link Python objects are
+    created beyond those returned.
+    """
+
+    def __init__(self, directory):
+        """
+        Opens a link graph.
+
+        Args:
+        - directory (str): The graph directory.
+
+        Raises:
+        - ValueError: If the graph is corrupt or was not closed by its writer.
+        """
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if not manifest.get("complete"):
+            raise ValueError(f"Link graph {directory} is incomplete; its writer was not closed.")
+        self.edges = manifest["edges"]
+        self.maps = []
+        self.views = []
+        self.urls = self._map(URLS)
+        self.url_offsets = self._map_array(URL_INDEX, 'Q')
+        self.url_hash = self._map_array(URL_HASH, 'I')
+        self.in_degrees = self._map_array(IN_DEGREES, 'I')
+        self.top = self._map_array(TOP_LINKED, 'I')
+        self.segments = [_Segment(self._map(name)) for name in manifest["segments"]]
+
+    def _map(self, name):
+        with open(os.path.join(self.directory, name), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.maps.append(mapped)
+        return mapped
+
+    def _map_array(self, name, typecode):
+        values = _uint_array(self._map(name), typecode)
+        self.views.append(values)
+        return values
+
+    def __len__(self):
+        """Returns the number of URLs."""
+        return len(self.url_offsets)
+
+    def url(self, node):
+        """
+        Returns the URL with the given ID.
+
+        Args:
+        - node (int): The URL ID.
+
+        Returns:
+        - str: The URL.
+        """
+        return self._url_bytes(node).decode('utf-8')
+
+    def _url_bytes(self, node):
+        start = self.url_offsets[node]
+        end = self.url_offsets[node + 1] if node + 1 < len(self.url_offsets) else len(self.urls)
+        return self.urls[start:end]
+
+    def node(self, url):
+        """
+        Returns the ID of a URL.
+
+        Args:
+        - url (str): The URL, in the canonical form it was written in.
+
+        Returns:
+        - int or None: Its ID, or None if the URL is not in the graph.
+        """
+        if not len(self.url_hash):
+            return None
+        data = url.encode('utf-8')
+        mask = len(self.url_hash) - 1
+        slot = zlib.crc32(data) & mask
+        while True:
+            value = self.url_hash[slot]
+            if not value:
+                return None
+            if self._url_bytes(value - 1) == data:
+                return value - 1
+            slot = (slot + 1) & mask
+
+    def out_links(self, url):
+        """
+        Returns the URLs a page links to.
+
+        Args:
+        - url (str): The URL of the page.
+
+        Returns:
+        - list: The linked URLs, in the order they appeared on the page.
+        """
+        node = self.node(url)
+        if node is None:
+            return []
+        return [self.url(target) for segment in self.segments for target in segment.out_links(node)]
+
+    def in_links(self, url, limit=None):
+        """
+        Returns the pages linking to a URL.
+
+        Args:
+        - url (str): The linked URL.
+        - limit (int or None): Maximum number of pages to return, as a popular URL may have millions.
+
+        Returns:
+        - list: The URLs of the pages linking to it.
+        """
+        node = self.node(url)
+        if node is None:
+            return []
+        sources = (source for segment in self.segments for source in segment.in_links(node))
+        return [self.url(source) for source in islice(sources, limit)]
+
+    def in_degree(self, url):
+        """
+        Returns the number of pages linking to a URL.
+
+        Args:
+        - url (str): The linked URL.
+
+        Returns:
+        - int: The number of links to it, 0 if the URL is not in the graph.
+        """
+        node = self.node(url)
+        return 0 if node is None else self.in_degrees[node]
+
+    def top_linked(self, n=10):
+        """
+        Returns the most-linked URLs. Up to `TOP_KEPT` of them are read from a
+        precomputed list; more require a scan over the in-degree of every URL.
+
+        Args:
+        - n (int): Number of URLs to return.
+
+        Returns:
+        - list: (url, number of links to it) tuples, most-linked first.
+        """
+        in_degrees = self.in_degrees
+        if n <= len(self.top):
+            nodes = self.top[:n].tolist()
+        else:
+            nodes = heapq.nlargest(n, range(len(in_degrees)), key=in_degrees.__getitem__)
+        return [(self.url(node), in_degrees[node]) for node in nodes if in_degrees[node]]
+
+    def domain_counts(self, n=None):
+        """
+        Returns the number of URLs and links to them per domain, see `frontier.domain_of`.
+
+        Args:
+        - n (int or None): Number of domains to return. None returns all.
+
+        Returns:
+        - list: (domain, URLs, links in) tuples, most-linked domain first.
+        """
+        with open(os.path.join(self.directory, DOMAINS), encoding='utf-8') as f:
+            rows = (line.rstrip('\n').split('\t') for line in f)
+            return [(domain, int(urls), int(links)) for domain, urls, links in islice(rows, n)]
+
+    def close(self):
+        """Releases the memory maps."""
+        for segment in self.segments:
+            segment.release()
+        for view in self.views:
+            if isinstance(view, memoryview):
+                view.release()
+        for mapped in self.maps:
+            mapped.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,240 @@
+import re
+import sys
+from collections import namedtuple
+from functools import lru_cache
+from urllib.parse import quote
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Query parameters that only identify the campaign or click a link came from. Any parameter starting
+# with "utm_" is stripped as well.
+TRACKING_PARAMS = frozenset((
+    'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'twclid', 'igshid',
+    'mc_cid', 'mc_eid', '_hsenc', '_hsmi', 'mkt_tok', 'oly_anon_id', 'oly_enc_id', 'vero_id',
+))
+
+# Number of entries kept by the memoised steps of canonicalisation. Pages of one site repeat the same
+# navigation links, hosts and directories, so most links after the first few pages are cache hits.
+URL_CACHE_SIZE = 1 << 16
+
+_UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+_PATH_SAFE = "/:@!$&'()*+,;="
+_QUERY_SAFE = _PATH_SAFE + "?"
+# Characters that may appear as they are in a canonical path or query; anything else needs a closer look.
+_CLEAN_PATH = re.compile(r"[A-Za-z0-9\-._~/:@!$&'()*+,;=]*\Z")
+_CLEAN_QUERY = re.compile(r"[A-Za-z0-9\-._~/:@!$&'()*+,;=?]*\Z")
+_ESCAPE = re.compile(r"%([0-9A-Fa-f]{2})")
+_BARE_PERCENT = re.compile(r"%(?![0-9A-Fa-f]{2})")
+_SCHEME = re.compile(r"[A-Za-z][A-Za-z0-9+.\-]*:")
+_AUTHORITY_END = re.compile(r"[/?#]")
+
+
+class BaseURL(namedtuple("BaseURL", "origin path directory")):
+    """
+    A page URL split for resolving relative links against it, see `parse_base`.
+
+    Fields:
+    - origin (str): Canonical "scheme://host[:port]".
+    - path (str): Canonical path.
+    - directory (str): The path up to and including its last "/".
+    """
+
+    __slots__ = ()
+
+    @property
+    def scheme(self):
+        return self.origin.partition(':')[0]
+
+
+def _unescape_unreserved(match):
+    char = chr(int(match.group(1), 16))
+    return char if char in _UNRESERVED else '%' + match.group(1).upper()
+
+
+def _normalize_escapes(value, clean, safe):
+    """
+    Returns a path or query with its percent-encoding normalised: escaped unreserved
+    characters are decoded, other escapes upper-cased, and characters that may not
+    appear in a URL, non-ASCII ones included, are UTF-8 percent-encoded.
+    """
+    if clean.match(value):
+        return value
+    value = _ESCAPE.sub(_unescape_unreserved, value)
+    value = _BARE_PERCENT.sub('%25', value)
+    return quote(value, safe=safe + '%')
+
+
+def _remove_dot_segments(path):
+    """Removes "." and ".." segments from an absolute path, as in RFC 3986 section 5.2.4."""
+    if '.' not in path:
+        return path
+    segments = []
+    for segment in path.split('/')[1:]:
+        if segment == '..':
+            if segments:
+                segments.pop()
+        elif segment != '.':
+            segments.append(segment)
+    if path.endswith(('/.', '/..')):
+        segments.append('')
+    return '/' + '/'.join(segments)
+
+
+def _strip_tracking(query):
+    """Drops empty and tracking parameters from a query string, keeping the order of the rest."""
+    return '&'.join(param for param in query.split('&')
+                    if param and not (param[:4].lower() == 'utm_' or param.partition('=')[0].lower() in TRACKING_PARAMS))
+
+
+@lru_cache(maxsize=4096)
+def _canonical_netloc(scheme, netloc):
+    """
+    Returns the canonical, interned form of an authority: the host lower-cased and
+    IDNA-encoded, the default port dropped. Returns None if the host is missing or
+    the port invalid.
+    """
+    userinfo, at, hostport = netloc.rpartition('@')
+    if hostport.startswith('['):
+        host, _, rest = hostport.partition(']')
+        host = host.lower() + ']'
+        port = rest[1:] if rest.startswith(':') else ''
+    else:
+        host, _, port = hostport.partition(':')
+        host = host.lower()
+        if not host.isascii():
+            try:
+                host = host.encode('idna').decode('ascii')
+            except UnicodeError:
+                return None
+    if not host or host == '[]':
+        return None
+    if port:
+        if not port.isdigit() or int(port) > 65535:
+            return None
+        port = '' if int(port) == DEFAULT_PORTS[scheme] else ':%d' % int(port)
+    return sys.intern(userinfo + at + host + port)
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def _join(origin, reference):
+    """
+    Builds a canonical URL from a canonical origin and an absolute-path reference:
+    the fragment is dropped, dot segments removed, percent-encoding normalised and
+    tracking parameters stripped from the query.
+    """
+    reference = reference.partition('#')[0]
+    path, question, query = reference.partition('?')
+    path = _normalize_escapes(_remove_dot_segments(path or '/'), _CLEAN_PATH, _PATH_SAFE)
+    if question:
+        query = _strip_tracking(_normalize_escapes(query, _CLEAN_QUERY, _QUERY_SAFE))
+    return origin + path + ('?' + query if query else '')
+
+
+def _clean_href(href):
+    """Strips an href the way browsers do: surrounding whitespace, tabs and newlines, and backslashes."""
+    href = href.strip()
+    if '\t' in href or '\n' in href or '\r' in href:
+        href = href.replace('\t', '').replace('\n', '').replace('\r', '')
+    if '\\' in href:
+        href = href.replace('\\', '/')
+    return href
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def canonicalize_url(url):
+    """
+    Returns the canonical form of an absolute http(s) URL, so that equivalent
+    spellings of a URL share one entry in a seen-set. The scheme and host are
+    lower-cased (the host IDNA-encoded), default ports, fragments and tracking
+    parameters are dropped, dot segments are removed, percent-encoding is
+    normalised and an empty path becomes "/". Canonical URLs are left unchanged.
+
+    Args:
+    - url (str): The URL to be canonicalised.
+
+    Returns:
+    - str or None: The canonical URL, or None if it is not a valid http(s) URL.
+    """
+    scheme, _, rest = _clean_href(url).partition(':')
+    scheme = scheme.lower()
+    if scheme not in DEFAULT_PORTS or not rest.startswith('//'):
+        return None
+    rest = rest[2:]
+    end = _AUTHORITY_END.search(rest)
+    end = end.start() if end else len(rest)
+    netloc = _canonical_netloc(scheme, rest[:end])
+    if netloc is None:
+        return None
+    return _join(f"{scheme}://{netloc}", rest[end:])
+
+
+@lru_cache(maxsize=1024)
+def parse_base(url):
+    """
+    Splits a page URL for resolving relative links against it.
+
+    Args:
+    - url (str): The URL of the page or of its `<base href>`.
+
+    Returns:
+    - BaseURL or None: The parsed URL, or None if it is not a valid http(s) URL.
+    """
+    url = canonicalize_url(url)
+    if url is None:
+        return None
+    path_start = url.index('/', url.index('://') + 3)
+    path = url[path_start:].partition('?')[0]
+    return BaseURL(url[:path_start], path, path[:path.rfind('/') + 1])
+
+
+def resolve_link(href, base=None):
+    """
+    Resolves an href against the URL of its page and canonicalises it.
+
+    Args:
+    - href (str): The value of an `<a href>` attribute.
+    - base (BaseURL or None): The base URL from `parse_base`. Without one, only absolute links resolve.
+
+    Returns:
+    - str or None: The canonical http(s) URL, or None for links within the page (fragments), other
+      schemes such as mailto: and javascript:, and links that cannot be resolved.
+    """
+    href = _clean_href(href)
+    if not href or href[0] == '#':
+        return None
+    if href[0] == '/':
+        if href[1:2] == '/':
+            return canonicalize_url(base.scheme + ':' + href) if base else None
+        return _join(base.origin, href) if base else None
+    if _SCHEME.match(href):
+        return canonicalize_url(href)
+    if base is None:
+        return None
+    if href[0] == '?':
+        return _join(base.origin, base.path + href)
+    return _join(base.origin, base.directory + href)
+
+
+def resolve_links(hrefs, page_url, base_href=None):
+    """
+    Resolves the hrefs of a page into canonical, absolute http(s) URLs, without duplicates.
+
+    Args:
+    - hrefs (iterable): Raw `<a href>` values, in document order.
+    - page_url (str): The URL the page was fetched from.
+    - base_href (str or None): The page's `<base href>`, which overrides the page URL as the base.
+
+    Returns:
+    - list: The resolved links in order of first appearance.
+    """
+    base = parse_base(page_url)
+    if base_href:
+        base = parse_base(resolve_link(base_href, base) or '') or base
+    seen = set()
+    links = []
+    for href in hrefs:
+        url = resolve_link(href, base)
+        if url is not None and url not in seen:
+            seen.add(url)
+            links.append(url)
+    return links
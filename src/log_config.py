@@ -1,7 +1,144 @@
+import json
 import logging
+import multiprocessing
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 
+TEXT_FORMAT = '%(asctime)s [%(levelname)s]: %(message)s'
 
-def setup_logging(log_level=logging.INFO, log_filename="app.log"):
+# Background writer started by setup_logging(use_queue=True), stopped by stop_logging.
+_listener = None
+_log_queue = None
+_handlers = []
+_rate_limit = None
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.processName,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limits how often each logging call site may emit, with a token bucket per
+    call site. Repetitive messages such as "Queue is empty" are then dropped
+    instead of flooding the output, and the next record let through from that
+    call site says how many were suppressed. Records above `max_level` always pass.
+
+    The filter belongs on handlers rather than on a logger: a logger's filters
+    never see the records propagated from its children, such as urllib3's. A
+    record reaching several handlers that share the filter is judged once.
+    """
+
+    def __init__(self, rate=10.0, burst=20, max_level=logging.WARNING):
+        """
+        Initializes the RateLimitFilter.
+
+        Args:
+        - rate (float): Records per second each call site may emit on average.
+        - burst (int): Records a call site may emit at once after being quiet.
+        - max_level (int): Highest level that is rate limited.
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_level = max_level
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.suppressed = 0
+
+    def filter(self, record):
+        if record.levelno > self.max_level:
+            return True
+        verdict = record.__dict__.get("_rate_limit_verdict")
+        if verdict is None or verdict[0] != id(self):
+            verdict = record._rate_limit_verdict = (id(self), self._admit(record))
+        return verdict[1]
+
+    def _admit(self, record):
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated, dropped = self.buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self.buckets[key] = (tokens, now, dropped + 1)
+                self.suppressed += 1
+                return False
+            self.buckets[key] = (tokens - 1, now, 0)
+        if dropped:
+            record.msg = f"{record.msg} ({dropped} similar messages suppressed)"
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    A QueueHandler that never waits: when the queue is full the record is
+    dropped and counted, so a slow console or disk cannot stall the caller.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _rate_limit_filter(rate_limit):
+    """Returns a RateLimitFilter for `rate_limit` records per second, or None if it is not set."""
+    if not rate_limit:
+        return None
+    return RateLimitFilter(rate=rate_limit, burst=max(1, int(2 * rate_limit)))
+
+
+def _queue_handler(log_queue, rate_limit):
+    """Returns a NonBlockingQueueHandler for the given queue, rate limited if `rate_limit` is set."""
+    handler = NonBlockingQueueHandler(log_queue)
+    rate_filter = _rate_limit_filter(rate_limit)
+    if rate_filter is not None:
+        handler.addFilter(rate_filter)
+    return handler
+
+
+def _add_handlers():
+    """Attaches the file and console handlers to the root logger, sharing one rate limit filter."""
+    rate_filter = _rate_limit_filter(_rate_limit)
+    for handler in _handlers:
+        if rate_filter is not None:
+            handler.addFilter(rate_filter)
+        logging.root.addHandler(handler)
+
+
+def _reset_root():
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+    for log_filter in logging.root.filters[:]:
+        logging.root.removeFilter(log_filter)
+
+
+def setup_logging(log_level=logging.INFO, log_filename="app.log", use_queue=False, json_format=False,
+                  rate_limit=None, queue_size=10000):
     """
     Configures the logging module with custom settings.
 
@@ -9,19 +146,84 @@ def setup_logging(log_level=logging.INFO, log_filename="app.log"):
     - log_level (int): The logging level threshold. By default, it is set to logging.INFO.
     - log_filename (str): The name of the log file where logs should be written.
       Default is "app.log".
+    - use_queue (bool): Hand records to a background writer thread through a queue
+      instead of writing them in the logging thread. Call `stop_logging` to flush it.
+    - json_format (bool): Write one JSON object per record instead of plain text.
+    - rate_limit (float or None): Records per second each call site may emit at
+      WARNING level and below, see `RateLimitFilter`. None disables rate limiting.
+    - queue_size (int): Maximum number of records waiting for the writer; further records are dropped.
 
     This function sets up the logging to write logs both to the specified file
     and to the console. Before setting up, it resets any existing logging configuration.
+    It is meant to be called once, by the entry point.
     """
-    # Reset logging configuration
-    for handler in logging.root.handlers[:]:
+    global _listener, _log_queue, _handlers, _rate_limit
+    stop_logging()
+    _reset_root()
+
+    formatter = JSONFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    _handlers = [logging.FileHandler(log_filename), logging.StreamHandler()]
+    for handler in _handlers:
+        handler.setFormatter(formatter)
+    logging.root.setLevel(log_level)
+
+    _rate_limit = rate_limit
+    if not use_queue:
+        _add_handlers()
+        return
+
+    # A multiprocessing queue, so that parsing processes can log through the same writer.
+    _log_queue = multiprocessing.Queue(queue_size)
+    logging.root.addHandler(_queue_handler(_log_queue, rate_limit))
+    _listener = QueueListener(_log_queue, *_handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """
+    Stops the background writer after it has written every queued record, and
+    sends further records straight to the handlers. Does nothing if logging
+    does not go through a queue.
+    """
+    global _listener, _log_queue
+    if _listener is None:
+        return
+    queue_handlers = [handler for handler in logging.root.handlers if isinstance(handler, NonBlockingQueueHandler)]
+    for handler in queue_handlers:
         logging.root.removeHandler(handler)
+    _listener.stop()
+    _log_queue.close()
+    _log_queue.join_thread()
+    _listener = None
+    _log_queue = None
+    _add_handlers()
+    dropped = sum(handler.dropped for handler in queue_handlers)
+    if dropped:
+        logging.warning("Dropped %s log records because the log queue was full.", dropped)
+
+
+def worker_logging_config():
+    """
+    Returns what a worker process needs to log through the background writer.
+
+    Returns:
+    - tuple or None: Arguments for `setup_worker_logging`, or None if logging does not go through a queue.
+    """
+    if _log_queue is None:
+        return None
+    return _log_queue, logging.root.level, _rate_limit
+
+
+def setup_worker_logging(log_queue, log_level, rate_limit=None):
+    """
+    Configures logging in a worker process to send records to the parent's writer.
+
+    Args:
+    - log_queue (multiprocessing.Queue): The queue returned in `worker_logging_config`.
+    - log_level (int): The logging level threshold.
+    - rate_limit (float or None): See `setup_logging`.
+    """
+    _reset_root()
+    logging.root.setLevel(log_level)
+    logging.root.addHandler(_queue_handler(log_queue, rate_limit))
 
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s [%(levelname)s]: %(message)s',
-        handlers=[
-            logging.FileHandler(log_filename),
-            logging.StreamHandler()
-        ]
-    )
\ No newline at end of file
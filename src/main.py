@@ -6,138 +6,566 @@ and manages the shared queue between them. It also provides an indication of pro
 to the user and gracefully shuts down upon receiving a termination signal.
 """
 
+import argparse
+import itertools
 import logging
-import queue
+import multiprocessing
+import os
 import signal
 import threading
 import time
 
 from consumer import Consumer
+from extractors import EXTRACTORS
+from frontier import Frontier
+from handoff_queue import HandoffQueue
+from journal import EMITTED, FAILED, FETCHED, Journal, load_journal
+from metrics import PAGES_FETCHED, PAGES_PARSED, MetricsFileWriter, MetricsServer
 from producer import Producer
-from log_config import setup_logging
+from log_config import setup_logging, stop_logging
+from sinks import COMPRESSORS, SINKS, open_sink
+from url_stream import ScalableBloomFilter, expected_url_count, open_lines, stream_urls
 
 
 def signal_handler(_, __):
-    """Handles the termination signals (like SIGINT) to allow for graceful shutdown."""
-    global shutdown_flag
-    shutdown_flag = True
-    logging.info("Received shutdown signal. Attempting graceful shutdown...")
+    """Handles the termination signals (like SIGINT) to allow for graceful shutdown.
 
+    The first signal stops handing out new URLs and lets the fetches in flight finish and
+    their results be written for up to `drain_seconds`; a second signal stops immediately.
+    """
+    global shutdown_flag, drain_timer
+    if shutdown_flag:
+        shutdown_event.set()
+        logging.info("Received second shutdown signal. Stopping now...")
+        return
+    shutdown_flag = True
+    drain_event.set()
+    drain_timer = threading.Timer(drain_seconds, shutdown_event.set)
+    drain_timer.daemon = True
+    drain_timer.start()
+    logging.info("Received shutdown signal. Finishing the pages in flight for up to %g seconds...", drain_seconds)
 
-# Register the signal handler
-signal.signal(signal.SIGINT, signal_handler)
-signal.signal(signal.SIGTERM, signal_handler)
 
 shutdown_flag = False
+# Set on the first shutdown signal: no new URLs are handed out, but work in flight carries on.
+drain_event = threading.Event()
+# Set once the drain deadline has passed, or on a second signal, so that blocking loops
+# (like the consumer pool) stop early.
+shutdown_event = threading.Event()
+drain_seconds = 30.0
+drain_timer = None
 
 
 def progress_indicator():
     """Indicates progress to the user until a shutdown flag is received."""
     while not shutdown_flag:
-        print("Still processing...")
+        print(f"Still processing... {PAGES_FETCHED.value} pages fetched, {PAGES_PARSED.value} parsed")
         time.sleep(5)
 
 
-def read_urls_from_file(filename):
-    """Reads and returns a list of URLs from the specified file.
+def read_urls(source, dedupe=True, expected_urls=None):
+    """Returns a lazy stream of normalised, deduplicated URLs from the specified source.
+
+    Lines are read, validated and deduplicated one at a time as the producer consumes
+    them. Only the seen-set grows with the input, by a few bytes per unique URL once
+    there are more than expected.
 
     Args:
-        filename (str): Path to the file containing URLs.
+        source (str): Path to the file containing URLs, or "-" to read from stdin.
+        dedupe (bool): Whether to drop repeated URLs. A crawl frontier deduplicates on its own.
+        expected_urls (int or None): Number of URLs the seen-set is sized for. None estimates it
+            from the file size.
 
     Returns:
-        list[str]: List of URLs.
+        Iterator[str]: Stream of URLs.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
     """
-    with open(filename, 'r') as f:
-        return [line.strip() for line in f.readlines() if line.strip()]
+    lines = open_lines(source)
+    if not dedupe:
+        return stream_urls(lines)
+    return stream_urls(lines, seen=ScalableBloomFilter(capacity=expected_urls or expected_url_count(source)))
+
+
+BANNER = """
 
+    ░██╗░░░░░░░██╗███████╗██████╗░  ██╗░░░░░██╗███╗░░██╗██╗░░██╗
+    ░██║░░██╗░░██║██╔════╝██╔══██╗  ██║░░░░░██║████╗░██║██║░██╔╝
+    ░╚██╗████╗██╔╝█████╗░░██████╦╝  ██║░░░░░██║██╔██╗██║█████═╝░
+    ░░████╔═████║░██╔══╝░░██╔══██╗  ██║░░░░░██║██║╚████║██╔═██╗░
+    ░░╚██╔╝░╚██╔╝░███████╗██████╦╝  ███████╗██║██║░╚███║██║░╚██╗
+    ░░░╚═╝░░░╚═╝░░╚══════╝╚═════╝░  ╚══════╝╚═╝╚═╝░░╚══╝╚═╝░░╚═╝
 
-def run_producer(shared_queue, url_list):
+    ███████╗██╗░░██╗████████╗██████╗░░█████╗░░█████╗░████████╗░█████╗░██████╗░
+    ██╔════╝╚██╗██╔╝╚══██╔══╝██╔══██╗██╔══██╗██╔══██╗╚══██╔══╝██╔══██╗██╔══██╗
+    █████╗░░░╚███╔╝░░░░██║░░░██████╔╝███████║██║░░╚═╝░░░██║░░░██║░░██║██████╔╝
+    ██╔══╝░░░██╔██╗░░░░██║░░░██╔══██╗██╔══██║██║░░██╗░░░██║░░░██║░░██║██╔══██╗
+    ███████╗██╔╝╚██╗░░░██║░░░██║░░██║██║░░██║╚█████╔╝░░░██║░░░╚█████╔╝██║░░██║
+    ╚══════╝╚═╝░░╚═╝░░░╚═╝░░░╚═╝░░╚═╝╚═╝░░╚═╝░╚════╝░░░░╚═╝░░░░╚════╝░╚═╝░░╚═╝
+        """
+
+
+def run_producer(shared_queue, url_list, frontier=None, **producer_options):
     """Initializes and runs the producer.
 
     Args:
-        shared_queue (queue.Queue): Shared queue for the producer and consumer.
-        url_list (list[str]): List of URLs to be processed by the producer.
+        shared_queue (HandoffQueue): Shared queue for the producer and consumer.
+        url_list (Iterable[str]): URLs to be processed by the producer.
+        frontier (Frontier, optional): Crawl frontier to take URLs from instead of url_list.
+        **producer_options: Further keyword arguments for the Producer.
     """
     try:
         logging.info("Producer started.")
-        producer = Producer(shared_queue=shared_queue, url_list=url_list)
+        producer = Producer(shared_queue=shared_queue, url_list=url_list, stop_event=shutdown_event,
+                            drain_event=drain_event, frontier=frontier, **producer_options)
         if not shutdown_flag:
             producer.run()
         logging.info("Producer finished.")
     except Exception as e:
-        logging.error(f"Exception occurred in the producer thread: {e}")
+        logging.error("Exception occurred in the producer thread: %s", e)
 
 
-def run_consumer(shared_queue):
+def run_consumer(shared_queue, processes=1, frontier=None, **consumer_options):
     """Initializes and runs the consumer.
 
     Args:
-        shared_queue (queue.Queue): Shared queue for the producer and consumer.
+        shared_queue (HandoffQueue): Shared queue for the producer and consumer.
+        processes (int): Number of worker processes used to parse pages.
+        frontier (Frontier, optional): Crawl frontier that extracted links are fed back to.
+        **consumer_options: Further keyword arguments for the Consumer.
     """
     try:
-        logging.info("Consumer started.")
-        consumer = Consumer(shared_queue)
+        logging.info("Consumer started with %s parsing process(es).", processes)
+        consumer = Consumer(shared_queue, processes=processes, stop_event=shutdown_event, frontier=frontier,
+                            **consumer_options)
         if not shutdown_flag:
             consumer.run()
+        consumer.close()
         logging.info("Consumer finished.")
     except Exception as e:
-        logging.error(f"Exception occurred in the consumer thread: {e}")
+        logging.error("Exception occurred in the consumer thread: %s", e)
 
 
-def main():
-    print("""
+def run_replay(paths, processes=1, **consumer_options):
+    """Initializes a consumer and runs it over the pages archived in WARC files.
 
-    ░██╗░░░░░░░██╗███████╗██████╗░  ██╗░░░░░██╗███╗░░██╗██╗░░██╗
-    ░██║░░██╗░░██║██╔════╝██╔══██╗  ██║░░░░░██║████╗░██║██║░██╔╝
-    ░╚██╗████╗██╔╝█████╗░░██████╦╝  ██║░░░░░██║██╔██╗██║█████═╝░
-    ░░████╔═████║░██╔══╝░░██╔══██╗  ██║░░░░░██║██║╚████║██╔═██╗░
-    ░░╚██╔╝░╚██╔╝░███████╗██████╦╝  ███████╗██║██║░╚███║██║░╚██╗
-    ░░░╚═╝░░░╚═╝░░╚══════╝╚═════╝░  ╚══════╝╚═╝╚═╝░░╚══╝╚═╝░░╚═╝
+    Args:
+        paths (list[str]): Paths of the WARC archives.
+        processes (int): Number of worker processes used to parse pages.
+        **consumer_options: Further keyword arguments for the Consumer.
+    """
+    try:
+        logging.info("Replaying %s WARC archive(s) with %s parsing process(es).", len(paths), processes)
+        # Replaying needs no draining: the first shutdown signal stops it.
+        consumer = Consumer(None, processes=processes, stop_event=drain_event, **consumer_options)
+        if not shutdown_flag:
+            consumer.run_replay(paths)
+        consumer.close()
+        logging.info("Replay finished.")
+    except Exception as e:
+        logging.error("Exception occurred in the consumer thread: %s", e)
 
-    ███████╗██╗░░██╗████████╗██████╗░░█████╗░░█████╗░████████╗░█████╗░██████╗░
-    ██╔════╝╚██╗██╔╝╚══██╔══╝██╔══██╗██╔══██╗██╔══██╗╚══██╔══╝██╔══██╗██╔══██╗
-    █████╗░░░╚███╔╝░░░░██║░░░██████╔╝███████║██║░░╚═╝░░░██║░░░██║░░██║██████╔╝
-    ██╔══╝░░░██╔██╗░░░░██║░░░██╔══██╗██╔══██║██║░░██╗░░░██║░░░██║░░██║██╔══██╗
-    ███████╗██╔╝╚██╗░░░██║░░░██║░░██║██║░░██║╚█████╔╝░░░██║░░░╚█████╔╝██║░░██║
-    ╚══════╝╚═╝░░╚═╝░░░╚═╝░░░╚═╝░░╚═╝╚═╝░░╚═╝░╚════╝░░░░╚═╝░░░░╚════╝░╚═╝░░╚═╝
-        """)
-    setup_logging(log_level=logging.INFO, log_filename="main.log")
 
-    filepath = input("Enter the path to your file containing URLs: ")
+def parse_args(argv=None):
+    """Parses the command-line arguments.
 
+    Args:
+        argv (list[str], optional): Arguments to parse. Defaults to sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Extracts hyperlinks from the pages at the given URLs. "
+                    "Without an input file, the tool asks for one interactively.")
+    parser.add_argument("input", nargs="?", help='file containing one URL per line, or "-" to read from stdin')
+    parser.add_argument("-o", "--output",
+                        help='file to write results to, or "-" for stdout; without it results are printed as text')
+    parser.add_argument("-f", "--format", choices=sorted(SINKS),
+                        help="output format; defaults to the output file extension (.csv, .wlx), else jsonl")
+    parser.add_argument("--compress", choices=sorted(COMPRESSORS), help="compress the output stream")
+    parser.add_argument("--flush-bytes", type=int, default=1024 * 1024,
+                        help="output buffer size that triggers a write (default: %(default)s)")
+    parser.add_argument("--flush-interval", type=float, default=1.0,
+                        help="maximum seconds between output writes (default: %(default)s)")
+    parser.add_argument("--record-warc", metavar="PATH",
+                        help="record every fetched page, with its headers, in a WARC archive (gzipped if PATH ends "
+                             "in .gz)")
+    parser.add_argument("--replay-warc", metavar="PATH", nargs="+",
+                        help="extract links from the pages in these WARC archives instead of fetching any URLs")
+    parser.add_argument("--expected-urls", type=int,
+                        help="number of unique URLs the filter dropping repeated ones is sized for, in the input or, "
+                             "without --max-pages, in a crawl; it grows beyond that (default: estimated from the input "
+                             "file size)")
+    parser.add_argument("--graph", help="directory to build a link graph in, queryable with link_graph.LinkGraph")
+    parser.add_argument("--depth", type=int, help="crawl depth; 0 fetches only the listed URLs (default: 0)")
+    parser.add_argument("--max-pages", type=int, help="maximum number of pages to crawl")
+    parser.add_argument("--engine", choices=Producer.ENGINES, default="thread",
+                        help="fetch engine (default: %(default)s)")
+    parser.add_argument("--threads", type=int, default=10,
+                        help="fetch threads of the thread engine (default: %(default)s)")
+    parser.add_argument("--max-concurrency", type=int, default=1000,
+                        help="requests in flight for the async engine (default: %(default)s)")
+    parser.add_argument("--max-per-host", type=int, default=2,
+                        help="maximum concurrent requests per host (default: %(default)s)")
+    parser.add_argument("--min-host-delay", type=float, default=0.0,
+                        help="minimum seconds between requests to one host (default: %(default)s)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="adjust the requests in flight, in total and per host, to latency, errors and 429s; "
+                             "--threads and --max-per-host become ceilings")
+    parser.add_argument("--retries", type=int, default=3,
+                        help="retries for server errors, 429s and connection errors (default: %(default)s)")
+    parser.add_argument("--retry-backoff", type=float, default=0.25,
+                        help="base seconds before a retry, doubled on each attempt (default: %(default)s)")
+    parser.add_argument("--dns-ttl", type=float, default=300.0,
+                        help="seconds a resolved host name is reused by all fetch workers; 0 resolves on every new "
+                             "connection (default: %(default)s)")
+    parser.add_argument("--dns-negative-ttl", type=float, default=30.0,
+                        help="seconds a host name that failed to resolve fails again without a lookup "
+                             "(default: %(default)s)")
+    parser.add_argument("--dns-prefetch", type=int, default=100,
+                        help="URLs ahead of the fetchers whose host names are resolved in the background "
+                             "(default: %(default)s)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1,
+                        help="parsing processes (default: CPU count, %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=16,
+                        help="pages sent to a parsing process at once (default: %(default)s)")
+    parser.add_argument("--extractor", choices=sorted(EXTRACTORS), default="soup",
+                        help="link-extraction backend (default: %(default)s)")
+    parser.add_argument("--max-body-bytes", type=int, default=10 * 1024 * 1024,
+                        help="largest response body to download; larger pages are skipped, 0 disables the limit "
+                             "(default: %(default)s)")
+    parser.add_argument("--cache-dir", help="directory of the persistent HTTP cache")
+    parser.add_argument("--cache-disk-size", type=int, default=1024,
+                        help="megabytes of response bodies the persistent HTTP cache is pruned down to "
+                             "(default: %(default)s)")
+    parser.add_argument("--extraction-cache-size", type=int, default=16,
+                        help="megabytes of links per parsing process kept for pages whose body was parsed before; "
+                             "0 disables the cache (default: %(default)s)")
+    parser.add_argument("--extraction-cache-dir",
+                        help="directory of a persistent extraction cache shared by the parsing processes")
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-file", help="periodically write Prometheus metrics to this file")
+    parser.add_argument("--metrics-interval", type=float, default=10.0,
+                        help="seconds between writes of --metrics-file (default: %(default)s)")
+    parser.add_argument("--log-level", choices=("DEBUG", "INFO", "WARNING", "ERROR"), default="INFO",
+                        help="logging threshold (default: %(default)s)")
+    parser.add_argument("--log-file", default="main.log", help="file to write the log to (default: %(default)s)")
+    parser.add_argument("--log-format", choices=("text", "json"), default="text",
+                        help="log record format (default: %(default)s)")
+    parser.add_argument("--log-rate", type=float, default=10.0,
+                        help="log records per second each message may emit at WARNING and below; "
+                             "0 disables rate limiting (default: %(default)s)")
+    parser.add_argument("--journal", help="append-only journal of the URLs fetched, failed and written out")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the run recorded in --journal, skipping URLs whose results were written")
+    parser.add_argument("--drain-seconds", type=float, default=30.0,
+                        help="seconds to finish the pages in flight after Ctrl+C before stopping "
+                             "(default: %(default)s)")
+    distributed = parser.add_argument_group(
+        "distributed mode",
+        "With --work-store and an input file, the URLs are loaded into the store and --workers local worker "
+        "processes are started. With --work-store and no input, the process joins a run as a worker.")
+    distributed.add_argument("--work-store", help="SQLite work store shared by the coordinator and the workers")
+    distributed.add_argument("--workers", type=int, default=0,
+                             help="worker processes the coordinator starts on this machine (default: %(default)s)")
+    distributed.add_argument("--worker-id", help="worker id (default: hostname and process id)")
+    distributed.add_argument("--lease-batch", type=int, default=100,
+                             help="URLs a worker leases at once (default: %(default)s)")
+    distributed.add_argument("--lease-seconds", type=float, default=60.0,
+                             help="seconds before the work of an unresponsive worker is reassigned "
+                                  "(default: %(default)s)")
+    return parser.parse_args(argv)
+
+
+def worker_path(path, index):
+    """Returns the path a local worker uses instead of `path`, e.g. links.jsonl.gz -> links-1.jsonl.gz.
+
+    Args:
+        path (str): The path given to the coordinator.
+        index (int): Index of the worker.
+
+    Returns:
+        str: The path for the worker.
+    """
+    directory, filename = os.path.split(path)
+    name, dot, extensions = filename.partition(".")
+    return os.path.join(directory, f"{name}-{index}{dot}{extensions}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.input is None and args.work_store is None and not args.replay_warc:
+        print(BANNER)
+    execute(args)
+
+
+def execute(args):
+    """Configures logging and signal handling and runs the extractor, the coordinator of a distributed run or
+    one of its workers.
+
+    Args:
+        args (argparse.Namespace): Arguments returned by parse_args.
+    """
+    # Handlers are installed here rather than at import, so that importing this module has no side effects.
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+    # Logging is configured here only: records go through a queue to a background writer,
+    # so that fetch and parse workers never wait on the console or the log file.
+    setup_logging(log_level=getattr(logging, args.log_level), log_filename=args.log_file, use_queue=True,
+                  json_format=args.log_format == "json", rate_limit=args.log_rate or None)
     try:
-        url_list = read_urls_from_file(filepath)
-        if not url_list:
-            logging.warning("URL list is empty. Exiting...")
-            return
+        if args.work_store and args.input is not None:
+            run_coordinator(args)
+        else:
+            run(args)
+    finally:
+        stop_logging()
+
+
+def run_coordinator(args):
+    """Loads the input URLs into the work store, then runs local workers until the work is done.
+
+    Args:
+        args (argparse.Namespace): Arguments returned by parse_args.
+    """
+    from work_store import WorkStore, default_worker_id
+
+    store = WorkStore(args.work_store, lease_seconds=args.lease_seconds)
+    try:
+        added = store.add_urls(read_urls(args.input, expected_urls=args.expected_urls))
     except FileNotFoundError:
-        logging.error(f"File {filepath} not found. Please check the path and try again.")
+        logging.error("File %s not found. Please check the path and try again.", args.input)
         return
-    except Exception as e:
-        logging.error(f"An error occurred while reading the file: {e}")
+    logging.info("Added %s URLs to the work store %s: %s", added, args.work_store, store.stats())
+
+    # Workers are separate processes, each with its own fetch threads, parsing pool and output file.
+    context = multiprocessing.get_context("spawn")
+    worker_ids = [f"{args.worker_id or default_worker_id()}-{index}" for index in range(args.workers)]
+    # Put every local worker on the ring before any of them starts, so that the first one
+    # up does not lease URLs of hosts that belong to the others.
+    for worker_id in worker_ids:
+        store.heartbeat(worker_id)
+    workers = []
+    for index, worker_id in enumerate(worker_ids):
+        worker_args = argparse.Namespace(**vars(args))
+        worker_args.input = None
+        worker_args.worker_id = worker_id
+        worker_args.log_file = worker_path(args.log_file, index)
+        if args.output and args.output != "-":
+            worker_args.output = worker_path(args.output, index)
+        if args.graph:
+            worker_args.graph = worker_path(args.graph, index)
+        if args.record_warc:
+            worker_args.record_warc = worker_path(args.record_warc, index)
+        if args.metrics_port is not None:
+            worker_args.metrics_port = args.metrics_port + index
+        if args.metrics_file:
+            worker_args.metrics_file = worker_path(args.metrics_file, index)
+        process = context.Process(target=execute, args=(worker_args,), name=f"Worker-{index}")
+        process.start()
+        workers.append(process)
+    for process in workers:
+        process.join()
+
+    logging.info("Work store stats: %s", store.stats())
+    store.close()
+
+
+def run(args):
+    """Runs the extractor with the parsed command-line arguments.
+
+    Args:
+        args (argparse.Namespace): Arguments returned by parse_args.
+    """
+    global shutdown_flag, drain_seconds
+    shutdown_flag = False
+    drain_event.clear()
+    shutdown_event.clear()
+    drain_seconds = args.drain_seconds
+
+    interactive = args.input is None and args.work_store is None and not args.replay_warc
+    filepath = args.input
+    crawl_depth = args.depth
+    if interactive:
+        filepath = input("Enter the path to your file containing URLs: ")
+        if crawl_depth is None:
+            crawl_depth = input("Enter the crawl depth (press Enter to fetch only the listed URLs): ").strip() or "0"
+            try:
+                crawl_depth = int(crawl_depth)
+            except ValueError:
+                logging.error("Invalid crawl depth %r. Please enter a whole number.", crawl_depth)
+                return
+    crawl_depth = crawl_depth or 0
+
+    # The async engine applies --max-per-host as a connection limit only and has no scheduler to adapt.
+    if args.adaptive and (args.engine != "thread" or not args.max_per_host):
+        logging.error("--adaptive needs the thread engine and --max-per-host.")
         return
 
-    shared_queue = queue.Queue(maxsize=1000)
+    if args.resume:
+        # A crawl discovers its URLs as it goes, and a work store already keeps track of its own progress.
+        if not args.journal or crawl_depth > 0 or args.work_store:
+            logging.error("--resume needs --journal, and cannot be used with --depth or --work-store.")
+            return
+        try:
+            states = load_journal(args.journal)
+        except FileNotFoundError:
+            logging.error("Journal %s not found. Please check the path and try again.", args.journal)
+            return
+        counts = {state: sum(1 for value in states.values() if value == state) for state in (FETCHED, FAILED, EMITTED)}
+        logging.info("Resuming from %s: skipping %d completed URLs, retrying %d failed and %d unfinished ones.",
+                     args.journal, counts[EMITTED], counts[FAILED], counts[FETCHED])
+
+    frontier = None
+    if args.replay_warc:
+        # Re-extraction from archives reads no URLs and fetches nothing.
+        if crawl_depth > 0 or args.work_store or args.resume or args.record_warc:
+            logging.error("--replay-warc cannot be used with --depth, --work-store, --resume or --record-warc.")
+            return
+        missing = [path for path in args.replay_warc if not os.path.isfile(path)]
+        if missing:
+            logging.error("WARC archive %s not found. Please check the path and try again.", missing[0])
+            return
+    elif args.work_store:
+        # A worker of a distributed run takes its URLs from the work store and reports every page back to it.
+        from work_store import LeaseFrontier, WorkStore
+
+        store = WorkStore(args.work_store, lease_seconds=args.lease_seconds)
+        frontier = LeaseFrontier(store, worker=args.worker_id, batch_size=args.lease_batch, stop_event=drain_event)
+        url_list = frontier
+    else:
+        try:
+            url_stream = read_urls(filepath, dedupe=crawl_depth == 0, expected_urls=args.expected_urls)
+            first_url = next(url_stream, None)
+            if first_url is None:
+                logging.warning("URL list is empty. Exiting...")
+                return
+            url_list = itertools.chain([first_url], url_stream)
+            if args.resume:
+                url_list = (url for url in url_list if states.get(url) != EMITTED)
+            # Stop handing out URLs once a shutdown signal asks to drain.
+            url_list = itertools.takewhile(lambda _: not drain_event.is_set(), url_list)
+        except FileNotFoundError:
+            logging.error("File %s not found. Please check the path and try again.", filepath)
+            return
+        except Exception as e:
+            logging.error("An error occurred while reading the file: %s", e)
+            return
+
+    sink = None
+    if args.output or args.format:
+        sink = open_sink(args.output or "-", args.format, compression=args.compress,
+                         flush_bytes=args.flush_bytes, flush_interval=args.flush_interval, append=args.resume)
+
+    # Modules only some runs need are imported when they are used, to keep startup short for small jobs.
+    graph = archive = None
+    if args.graph:
+        from link_graph import LinkGraphWriter
+        graph = LinkGraphWriter(args.graph, append=args.resume)
+    if args.record_warc:
+        from warc import WarcWriter
+        archive = WarcWriter(args.record_warc, append=args.resume)
+    dns_cache = None
+    if args.dns_ttl > 0 and not args.replay_warc:
+        from dns_cache import DNSCache
+        dns_cache = DNSCache(ttl=args.dns_ttl, negative_ttl=args.dns_negative_ttl)
+
+    journal = None
+    if args.journal:
+        # With a sink, a URL is journaled as written out only once its results have been flushed.
+        journal = Journal(args.journal, resume=args.resume, hold_emitted=sink is not None)
+        if sink is not None:
+            sink.on_flush = journal.release_emitted
+
+    # In crawl mode, links found by the consumer flow back to the producer through the frontier,
+    # and the pipeline ends once the frontier has nothing left to hand out.
+    if crawl_depth > 0 and frontier is None:
+        frontier = Frontier(url_list, max_depth=crawl_depth, max_pages=args.max_pages, stop_event=drain_event,
+                            expected_urls=args.expected_urls)
+
+    shared_queue = HandoffQueue(max_items=1000, max_bytes=256 * 1024 * 1024)
+
+    metrics_server = MetricsServer(args.metrics_port) if args.metrics_port is not None else None
+    metrics_writer = MetricsFileWriter(args.metrics_file, args.metrics_interval) if args.metrics_file else None
+    for exporter in (metrics_server, metrics_writer):
+        if exporter is not None:
+            exporter.start()
 
     progress_thread = threading.Thread(target=progress_indicator, name="ProgressIndicator")
-    progress_thread.start()
+    if interactive:
+        progress_thread.start()
 
     logging.info("Starting producer and consumer threads...")
-    print("Press Ctrl+C at any time to gracefully shut down the program.")
-
-    producer_thread = threading.Thread(target=run_producer, args=(shared_queue, url_list), name="ProducerThread")
-    consumer_thread = threading.Thread(target=run_consumer, args=(shared_queue,), name="ConsumerThread")
-
-    producer_thread.start()
-    consumer_thread.start()
-
-    producer_thread.join()
-    consumer_thread.join()
+    if interactive:
+        print("Press Ctrl+C at any time to gracefully shut down the program.")
+
+    producer_options = {
+        "max_threads": args.threads,
+        "engine": args.engine,
+        "max_concurrency": args.max_concurrency,
+        "max_per_host": args.max_per_host,
+        "min_host_delay": args.min_host_delay,
+        "adaptive": args.adaptive,
+        "max_retries": args.retries,
+        "retry_backoff": args.retry_backoff,
+        "cache_dir": args.cache_dir,
+        "cache_disk_size": args.cache_disk_size,
+        "max_body_bytes": args.max_body_bytes or None,
+        "journal": journal,
+        "archive": archive,
+        "dns_cache": dns_cache,
+        "dns_prefetch": args.dns_prefetch,
+    }
+    consumer_options = {
+        "batch_size": args.batch_size,
+        "extractor": args.extractor,
+        "sink": sink,
+        "journal": journal,
+        "graph": graph,
+        "cache_size": args.extraction_cache_size,
+        "cache_dir": args.extraction_cache_dir,
+    }
+    if args.replay_warc:
+        threads = [threading.Thread(target=run_replay, args=(args.replay_warc, args.processes),
+                                    kwargs=consumer_options, name="ConsumerThread")]
+    else:
+        threads = [threading.Thread(target=run_producer, args=(shared_queue, url_list, frontier),
+                                    kwargs=producer_options, name="ProducerThread"),
+                   threading.Thread(target=run_consumer, args=(shared_queue, args.processes, frontier),
+                                    kwargs=consumer_options, name="ConsumerThread")]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if archive is not None:
+        archive.close()
+    if dns_cache is not None:
+        dns_cache.close()
+    if sink is not None:
+        sink.close()
+    if graph is not None:
+        graph.close()
+    if journal is not None:
+        journal.close()
+    if drain_timer is not None:
+        drain_timer.cancel()
+    if args.work_store:
+        frontier.close()
+        store.close()
+    for exporter in (metrics_server, metrics_writer):
+        if exporter is not None:
+            exporter.stop()
 
-    global shutdown_flag
     shutdown_flag = True
-    progress_thread.join()
+    if interactive:
+        progress_thread.join()
 
+    logging.info("Queue stats: %s", shared_queue.stats())
     logging.info("Processing complete!")
 
 
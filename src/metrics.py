@@ -0,0 +1,334 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels.items()) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+
+class Metric:
+    """Base class for metrics. Metrics sharing a name form one family and differ by labels."""
+
+    type = None
+
+    def __init__(self, name, documentation, labels=None, registry=None):
+        """
+        Args:
+        - name (str): Prometheus metric name.
+        - documentation (str): HELP text.
+        - labels (dict or None): Constant labels identifying this series in its family.
+        - registry (MetricsRegistry or None): Registry to add the metric to. Defaults to `REGISTRY`.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels or {}
+        self.lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def samples(self):
+        """Returns the (suffix, extra labels, value) samples of the metric."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def samples(self):
+        return [("", None, self.value)]
+
+
+class Gauge(Metric):
+    """A value that goes up and down."""
+
+    type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        return [("", None, self.value)]
+
+
+class Histogram(Metric):
+    """
+    Counts observations in fixed buckets. Observing is a bisect and two
+    additions, so it is cheap enough for per-page use.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labels=None, registry=None, buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels, registry)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        """Returns a context manager that observes the duration of its block."""
+        return _Timer(self)
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def quantile(self, q):
+        """
+        Estimates a quantile from the bucket counts by linear interpolation
+        within the bucket it falls in, as Prometheus' histogram_quantile does.
+
+        Args:
+        - q (float): The quantile, between 0 and 1.
+
+        Returns:
+        - float or None: The estimate, or None if nothing was observed. Values in
+          the overflow bucket are reported as the largest bucket bound.
+        """
+        with self.lock:
+            counts = list(self.counts)
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, counts):
+            if count and cumulative + count >= rank:
+                return lower + (bound - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = bound
+        return self.buckets[-1]
+
+    def samples(self):
+        with self.lock:
+            counts = list(self.counts)
+            total = self.sum
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            samples.append(("_bucket", {"le": "+Inf" if bound == float("inf") else repr(bound)}, cumulative))
+        samples.append(("_sum", None, total))
+        samples.append(("_count", None, cumulative))
+        return samples
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self.metrics = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+
+    def render(self):
+        """
+        Returns all metrics in the Prometheus text exposition format.
+
+        Returns:
+        - str: The exposition text.
+        """
+        with self.lock:
+            metrics = list(self.metrics)
+        families = {}
+        for metric in metrics:
+            families.setdefault(metric.name, []).append(metric)
+        lines = []
+        for name, family in families.items():
+            lines.append(f"# HELP {name} {family[0].documentation}")
+            lines.append(f"# TYPE {name} {family[0].type}")
+            for metric in family:
+                for suffix, extra, value in metric.samples():
+                    lines.append(f"{name}{suffix}{_format_labels(metric.labels, extra)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+_STAGE_HELP = "Time spent in each pipeline stage, in seconds."
+STAGE_CONNECT = Histogram("webextractor_stage_seconds", _STAGE_HELP, {"stage": "connect"})
+STAGE_FIRST_BYTE = Histogram("webextractor_stage_seconds", _STAGE_HELP, {"stage": "first_byte"})
+STAGE_DOWNLOAD = Histogram("webextractor_stage_seconds", _STAGE_HELP, {"stage": "download"})
+STAGE_QUEUE_WAIT = Histogram("webextractor_stage_seconds", _STAGE_HELP, {"stage": "queue_wait"})
+STAGE_PARSE = Histogram("webextractor_stage_seconds", _STAGE_HELP, {"stage": "parse"})
+STAGE_OUTPUT = Histogram("webextractor_stage_seconds", _STAGE_HELP, {"stage": "output"})
+
+FETCH_SECONDS = Histogram("webextractor_fetch_seconds", "Time to fetch a page from request to body, retries included.")
+
+PAGES_FETCHED = Counter("webextractor_pages_fetched_total", "Pages fetched successfully.")
+FETCH_ERRORS = Counter("webextractor_fetch_errors_total", "Fetches that failed.")
+_SKIPPED_HELP = "Responses dropped without parsing them."
+FETCHES_SKIPPED_TYPE = Counter("webextractor_fetches_skipped_total", _SKIPPED_HELP, {"reason": "content_type"})
+FETCHES_SKIPPED_SIZE = Counter("webextractor_fetches_skipped_total", _SKIPPED_HELP, {"reason": "too_large"})
+BYTES_FETCHED = Counter("webextractor_bytes_fetched_total", "Response body bytes downloaded.")
+FETCH_RETRIES = Counter("webextractor_fetch_retries_total", "Failed fetches scheduled for another attempt.")
+_ADJUST_HELP = "Changes of the adaptive concurrency limits."
+CONCURRENCY_INCREASES_GLOBAL = Counter("webextractor_concurrency_adjustments_total", _ADJUST_HELP,
+                                       {"scope": "global", "direction": "increase"})
+CONCURRENCY_DECREASES_GLOBAL = Counter("webextractor_concurrency_adjustments_total", _ADJUST_HELP,
+                                       {"scope": "global", "direction": "decrease"})
+CONCURRENCY_INCREASES_HOST = Counter("webextractor_concurrency_adjustments_total", _ADJUST_HELP,
+                                     {"scope": "host", "direction": "increase"})
+CONCURRENCY_DECREASES_HOST = Counter("webextractor_concurrency_adjustments_total", _ADJUST_HELP,
+                                     {"scope": "host", "direction": "decrease"})
+_EXTRACTION_CACHE_HELP = "Pages looked up in the extraction cache, by whether their body had been parsed before."
+EXTRACTION_CACHE_HITS = Counter("webextractor_extraction_cache_total", _EXTRACTION_CACHE_HELP, {"result": "hit"})
+EXTRACTION_CACHE_MISSES = Counter("webextractor_extraction_cache_total", _EXTRACTION_CACHE_HELP, {"result": "miss"})
+_DNS_CACHE_HELP = "Host name lookups by the fetchers, by whether the DNS cache answered them."
+DNS_CACHE_HITS = Counter("webextractor_dns_cache_total", _DNS_CACHE_HELP, {"result": "hit"})
+DNS_CACHE_NEGATIVE_HITS = Counter("webextractor_dns_cache_total", _DNS_CACHE_HELP, {"result": "negative_hit"})
+DNS_CACHE_MISSES = Counter("webextractor_dns_cache_total", _DNS_CACHE_HELP, {"result": "miss"})
+DNS_PREFETCHES = Counter("webextractor_dns_prefetches_total", "Host names resolved ahead of their fetches.")
+DNS_RESOLVE_SECONDS = Histogram("webextractor_dns_resolve_seconds", "Time to resolve a host name not in the cache.")
+PAGES_PARSED = Counter("webextractor_pages_parsed_total", "Pages parsed by the consumer.")
+LINKS_EXTRACTED = Counter("webextractor_links_extracted_total", "Hyperlinks extracted from pages.")
+FETCHES_IN_FLIGHT = Gauge("webextractor_fetches_in_flight", "Fetches currently in progress.")
+CONCURRENCY_LIMIT = Gauge("webextractor_concurrency_limit", "Requests the adaptive limiter lets be in flight.")
+QUEUE_ITEMS = Gauge("webextractor_queue_items", "Pages buffered between the producer and the consumer.")
+
+
+def _metrics_handler():
+    """
+    Returns the request handler class of `MetricsServer`. http.server is
+    imported here, as most runs never serve metrics.
+
+    Returns:
+    - type: A `BaseHTTPRequestHandler` subclass serving the server's registry.
+    """
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = self.server.registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+
+class MetricsServer:
+    """Serves the registry at http://host:port/metrics from a background thread."""
+
+    def __init__(self, port, host="127.0.0.1", registry=REGISTRY):
+        """
+        Args:
+        - port (int): Port to listen on, 0 picks a free one.
+        - host (str): Interface to bind. Defaults to localhost only.
+        - registry (MetricsRegistry): Registry to expose.
+        """
+        from http.server import ThreadingHTTPServer
+        self.httpd = ThreadingHTTPServer((host, port), _metrics_handler())
+        self.httpd.daemon_threads = True
+        self.httpd.registry = registry
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="MetricsServer", daemon=True)
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        logging.info("Serving metrics on http://%s:%s/metrics", self.httpd.server_address[0], self.port)
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class MetricsFileWriter:
+    """
+    Periodically rewrites a file with the registry contents, for example for
+    the node_exporter textfile collector. Each write replaces the file
+    atomically, so readers never see a partial file.
+    """
+
+    def __init__(self, path, interval=10.0, registry=REGISTRY):
+        """
+        Args:
+        - path (str): File to write.
+        - interval (float): Seconds between writes.
+        - registry (MetricsRegistry): Registry to write.
+        """
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="MetricsFileWriter", daemon=True)
+
+    def write(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.registry.render())
+        os.replace(tmp_path, self.path)
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.write()
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        """Stops the writer after writing the final values."""
+        self.stop_event.set()
+        self.thread.join()
+        self.write()
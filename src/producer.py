@@ -1,14 +1,83 @@
+from collections import namedtuple
 from urllib.parse import urlparse, urlunparse
-import requests
+import queue
+import random
 import threading
+import time
 import logging
 from concurrent.futures import ThreadPoolExecutor
-from functools import lru_cache
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from log_config import setup_logging
+from adaptive import AdaptiveLimiter
+from content import HTML_ACCEPT, body_too_large, check_response, parse_retry_after
+from host_scheduler import HostScheduler, host_of
+from http_cache import HTTPCache
+from metrics import (BYTES_FETCHED, FETCH_ERRORS, FETCH_RETRIES, FETCH_SECONDS, FETCHES_IN_FLIGHT, PAGES_FETCHED,
+                     STAGE_DOWNLOAD, STAGE_FIRST_BYTE)
+from url_stream import normalize_url
 
-setup_logging(log_level=logging.DEBUG, log_filename="producer.log")
+# Statuses worth another attempt, and those of them that mean the server is overloaded.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+OVERLOAD_STATUSES = (429, 503)
+# Connection errors that point at the network rather than at the host; RemoteDisconnected is a ConnectionResetError.
+NETWORK_ERRORS = (ConnectionResetError, ConnectionAbortedError, TimeoutError)
+
+
+class FetchResult(namedtuple("FetchResult", "page status error retry_after started latency")):
+    """
+    The outcome of one request, see `Producer.fetch`.
+
+    Fields:
+    - page (tuple or None): (body, encoding, final URL after redirects), or None if the page was not fetched.
+    - status (int or None): HTTP status, or None if no response arrived.
+    - error (Exception or None): The exception raised by the request, if any.
+    - retry_after (float or None): Seconds the server asked to wait in `Retry-After`.
+    - started (float or None): `time.monotonic()` when the request was sent; None for cache hits.
+    - latency (float or None): Seconds until the response headers arrived.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, page=None, status=None, error=None, retry_after=None, started=None, latency=None):
+        return super().__new__(cls, page, status, error, retry_after, started, latency)
+
+    @property
+    def retryable(self):
+        import requests
+        if isinstance(self.error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return True
+        return self.status in RETRY_STATUSES
+
+    @property
+    def overloaded(self):
+        import requests
+        return self.status in OVERLOAD_STATUSES or isinstance(self.error, requests.exceptions.Timeout)
+
+    @property
+    def network_failure(self):
+        """
+        Whether the request timed out or its connection was reset, which may point at the crawler's own
+        network. Hosts that do not resolve or refuse connections fail on their own.
+        """
+        import requests
+        if isinstance(self.error, requests.exceptions.Timeout):
+            return True
+        return isinstance(self.error, requests.exceptions.ConnectionError) and _caused_by(self.error, NETWORK_ERRORS)
+
+
+def _caused_by(error, types):
+    """Returns whether an exception, or one it wraps, is an instance of the given types."""
+    seen = set()
+    pending = [error]
+    while pending:
+        error = pending.pop()
+        if not isinstance(error, BaseException) or id(error) in seen:
+            continue
+        seen.add(id(error))
+        if isinstance(error, types):
+            return True
+        # requests and urllib3 wrap the underlying error in args or in `reason`, besides chaining it.
+        pending.extend(arg for arg in error.args if isinstance(arg, BaseException))
+        pending.extend((getattr(error, "reason", None), error.__cause__, error.__context__))
+    return False
 
 
 class Producer:
@@ -17,26 +86,82 @@ class Producer:
     and then placing the fetched HTML content in a shared queue for consumption.
     """
 
-    def __init__(self, shared_queue, url_list, max_threads=10, max_queue_size=100, cache_size=50):
+    ENGINES = ("thread", "async")
+
+    def __init__(self, shared_queue, url_list, max_threads=10, cache_size=50,
+                 engine="thread", max_concurrency=1000, cache_dir=None, cache_ttl=3600, stop_event=None,
+                 max_per_host=None, min_host_delay=0.0, frontier=None, journal=None, drain_event=None,
+                 max_body_bytes=10 * 1024 * 1024, adaptive=False, max_retries=3, retry_backoff=0.25,
+                 max_retry_after=60.0, archive=None, dns_cache=None, dns_prefetch=100, cache_disk_size=1024):
         """
-        Initializes the Producer with a list of URLs and configurations.
+        Initializes the Producer with the URLs to fetch and configurations.
 
         Args:
-        - shared_queue (queue.Queue): A shared queue where fetched content is placed.
-        - url_list (list): List of URLs to be fetched.
+        - shared_queue (HandoffQueue or queue.Queue): A shared queue where fetched content is placed.
+          Its bounds apply backpressure: workers wait while it is full.
+        - url_list (list or iterable): URLs to be fetched. A list is sanitized and validated up front.
+          Any other iterable is consumed lazily and must yield normalised URLs, like `url_stream.stream_urls`.
         - max_threads (int): Maximum number of threads for concurrent fetch operations.
-        - max_queue_size (int): Maximum size of the shared queue.
-        - cache_size (int): Size of the cache for fetched URLs.
+        - cache_size (int): Size of the in-memory response cache in megabytes. 0 disables it.
+        - engine (str): Fetch engine to use, either "thread" or "async".
+        - max_concurrency (int): Maximum number of requests in flight for the async engine.
+        - cache_dir (str or None): Directory of the persistent response cache. None keeps it in memory only.
+        - cache_ttl (float): Seconds a cached response is reused before it is revalidated with the server.
+        - cache_disk_size (int): Size in megabytes the persistent response cache is pruned down to.
+        - stop_event (threading.Event): Event that, once set, stops fetching and releases blocked puts.
+        - max_per_host (int or None): Maximum number of concurrent requests to one host. When set, the
+          thread engine dispatches URLs through a `HostScheduler`, interleaving hosts round-robin.
+        - min_host_delay (float): Minimum number of seconds between two requests to the same host.
+          Only applies when `max_per_host` is set.
+        - frontier (Frontier or None): Crawl frontier to take URLs from instead of `url_list`. Failed
+          fetches are reported back to it so that the crawl can terminate.
+        - journal (Journal or None): Job journal that fetched and failed URLs are recorded in.
+        - drain_event (threading.Event): Event that, once set, drops the URLs waiting in the host
+          scheduler while letting the fetches in flight finish. `url_list` should stop yielding
+          URLs at the same time.
+        - max_body_bytes (int or None): Largest response body to download. Larger pages are dropped.
+        - adaptive (bool): Adjust the number of requests in flight, in total (up to `max_threads`) and
+          per host (up to `max_per_host`), with an `AdaptiveLimiter`. Only applies when `max_per_host` is set.
+        - max_retries (int): Attempts after the first for server errors, 429s, timeouts and connection errors.
+          With `max_per_host` set, retries wait in the host scheduler instead of in a worker thread.
+        - retry_backoff (float): Base delay before a retry, doubled on each attempt and jittered.
+        - max_retry_after (float): Longest `Retry-After` pause honoured; a server asking for more gets no retry.
+        - archive (WarcWriter or None): WARC archive every fetched page is recorded in, with its headers.
+        - dns_cache (DNSCache or None): Cache that host names are resolved through, shared by all workers.
+          None leaves resolution to the system on every new connection.
+        - dns_prefetch (int): Number of URLs whose hosts are resolved ahead of their fetch when `dns_cache`
+          is set. With a frontier, hosts are resolved as URLs leave it instead.
         """
-        self.url_list = url_list
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}; expected one of {self.ENGINES}")
+        self.frontier = frontier
+        self.journal = journal
+        self.url_list = frontier if frontier is not None else url_list
         self.prepare_urls()
         self.shared_queue = shared_queue
         self.successful_fetches = 0
         self.errors = 0
         self.lock = threading.Lock()
         self.max_threads = max_threads
-        self.max_queue_size = max_queue_size
         self.cache_size = cache_size
+        self.cache = HTTPCache(max_bytes=cache_size * 1024 * 1024, ttl=cache_ttl, directory=cache_dir,
+                               max_disk_bytes=cache_disk_size * 1024 * 1024)
+        self.engine = engine
+        self.max_concurrency = max_concurrency
+        self.max_body_bytes = max_body_bytes
+        self.stop_event = stop_event or threading.Event()
+        self.drain_event = drain_event or threading.Event()
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_retry_after = max_retry_after
+        self.archive = archive
+        self.dns_cache = dns_cache
+        self.dns_prefetch = dns_prefetch
+        self.attempts = {}
+        self.limiter = AdaptiveLimiter(max_threads, max_per_host) if adaptive and max_per_host else None
+        self.scheduler = HostScheduler(max_per_host, min_host_delay, limiter=self.limiter) if max_per_host else None
+        self.connection_reuse = {}
         self.session = self.setup_session()
 
     def sanitize_url(self, url):
@@ -51,7 +176,7 @@ class Producer:
         """
         parsed = urlparse(url)
         if parsed.scheme not in ['http', 'https']:
-            logging.warning(f"Disallowed URL scheme in {url}")
+            logging.warning("Disallowed URL scheme in %s", url)
             return None
         return urlunparse(parsed)
 
@@ -67,80 +192,373 @@ class Producer:
         """
         parsed = urlparse(url)
         if not parsed.scheme or not parsed.netloc:
-            logging.error(f"Invalid URL: {url}")
+            logging.error("Invalid URL: %s", url)
             return False
         return True
 
     def prepare_urls(self):
         """
-        Sanitizes and validates the list of URLs.
+        Sanitizes and validates the list of URLs, parsing each one once.
+        Iterables other than lists are left untouched so that they stay lazy.
         """
-        sanitized_urls = [self.sanitize_url(url) for url in self.url_list if
-                          self.sanitize_url(url) and self.is_valid_url(self.sanitize_url(url))]
-        self.url_list = sanitized_urls
+        if isinstance(self.url_list, list):
+            self.url_list = [url for url in map(normalize_url, self.url_list) if url is not None]
 
     def setup_session(self):
         """
         Sets up and returns a requests Session with appropriate retry settings.
+        Connection pools are sized so that every concurrently fetched host keeps
+        its pool, with as many connections per host as it may have requests in flight.
+        With a host scheduler, failed requests are retried through it, so the session does not retry.
 
         Returns:
         - requests.Session: Configured session for making requests.
         """
+        # requests and urllib3 take a noticeable share of startup, so they are imported once a producer is made.
+        import requests
+        from urllib3.util.retry import Retry
+        from http_adapter import InstrumentedHTTPAdapter
+
         session = requests.Session()
-        retries = Retry(total=3, backoff_factor=0.1, status_forcelist=[500, 502, 503, 504])
-        session.mount('http://', HTTPAdapter(max_retries=retries))
-        session.mount('https://', HTTPAdapter(max_retries=retries))
+        # Ask for compressed HTML; bodies are decompressed as they are read.
+        session.headers.update({"Accept": HTML_ACCEPT, "Accept-Encoding": requests.utils.DEFAULT_ACCEPT_ENCODING})
+        if self.scheduler is not None:
+            retries = Retry(total=0, read=False, redirect=None)
+        else:
+            retries = Retry(total=self.max_retries, backoff_factor=0.1, status_forcelist=RETRY_STATUSES,
+                            respect_retry_after_header=True)
+        pool_connections = max(10, self.max_threads * 2)
+        pool_maxsize = min(self.max_per_host or self.max_threads, self.max_threads)
+        for prefix in ('http://', 'https://'):
+            session.mount(prefix, InstrumentedHTTPAdapter(max_retries=retries, pool_connections=pool_connections,
+                                                          pool_maxsize=pool_maxsize, dns_cache=self.dns_cache))
         return session
 
-    @lru_cache(maxsize=None)
+    def connection_stats(self):
+        """
+        Returns connection reuse statistics for every host fetched from, including
+        those whose connection pools were evicted or closed.
+
+        Returns:
+        - dict: For each host, the number of requests, new connections and reused connections.
+        """
+        counts = {}
+        for prefix in ('http://', 'https://'):
+            for host, (requests, connections) in self.session.get_adapter(prefix).connection_counts().items():
+                host_counts = counts.setdefault(host, [0, 0])
+                host_counts[0] += requests
+                host_counts[1] += connections
+        return {
+            host: {"requests": requests, "connections": connections, "reused": max(0, requests - connections)}
+            for host, (requests, connections) in counts.items()
+        }
+
     def fetch_html_content(self, url):
         """
-        Fetches and returns the HTML content of the given URL.
+        Fetches the body of the given URL as bytes, without decoding it, and logs
+        why if that failed. See `fetch`.
+
+        Args:
+        - url (str): The URL to be fetched.
+
+        Returns:
+        - tuple or None: (body, encoding from the Content-Type header or None, URL the page
+          came from after redirects), or None if the page was not fetched.
+        """
+        result = self.fetch(url)
+        if result.page is None:
+            self.log_failure(url, result)
+        return result.page
+
+    def fetch(self, url):
+        """
+        Makes one attempt at fetching the body of the given URL. Fresh cached
+        responses are returned without a request, and stale ones are
+        revalidated with a conditional request. Responses that are not HTML or
+        exceed `max_body_bytes` are dropped before their body is downloaded.
+        Pages are recorded in the WARC archive, if there is one, under the URL
+        they came from after redirects.
 
         Args:
         - url (str): The URL to be fetched.
 
         Returns:
-        - str or None: Fetched HTML content or None in case of errors.
+        - FetchResult: The page, or what went wrong.
         """
+        cached_body, entry = self.cache.lookup(url)
+        if cached_body is not None:
+            final_url = entry.final_url or url
+            if self.archive is not None:
+                self.archive.write_response(final_url, cached_body, encoding=entry.encoding)
+            return FetchResult((cached_body, entry.encoding, final_url))
+
+        FETCHES_IN_FLIGHT.inc()
+        started = time.monotonic()
+        start = time.perf_counter()
+        latency = None
         try:
-            response = self.session.get(url, timeout=10)
-            if response.status_code == 200:
-                return response.text
-            else:
-                logging.warning(f"Non-successful HTTP response for URL {url}: {response.status_code}")
-                return None
-        except requests.exceptions.RequestException as req_err:
-            logging.error(f"Error fetching URL {url}: {req_err}")
-            return None
+            headers = entry.conditional_headers() if entry else None
+            response = self.session.get(url, timeout=10, headers=headers, stream=True)
+            try:
+                latency = time.perf_counter() - start
+                STAGE_FIRST_BYTE.observe(latency)
+                status = response.status_code
+                if status == 304 and entry:
+                    page = self.cache.revalidated(url, entry, response.headers), entry.encoding, response.url
+                    if self.archive is not None:
+                        self.archive.write_response(response.url, page[0], encoding=entry.encoding)
+                    return FetchResult(page, status, started=started, latency=latency)
+                if status != 200:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After")) \
+                        if status in RETRY_STATUSES else None
+                    return FetchResult(None, status, retry_after=retry_after, started=started, latency=latency)
+                wanted, encoding = check_response(url, response.headers, self.max_body_bytes)
+                body = self.read_body(url, response) if wanted else None
+                if body is None:
+                    return FetchResult(None, status, started=started, latency=latency)
+                STAGE_DOWNLOAD.observe(time.perf_counter() - start - latency)
+                BYTES_FETCHED.inc(len(body))
+                self.cache.store(url, body, response.headers, encoding, response.url)
+                page = body, encoding, response.url
+                if self.archive is not None:
+                    self.archive.write_response(response.url, body, response.headers, reason=response.reason or "OK")
+                return FetchResult(page, status, started=started, latency=latency)
+            finally:
+                response.close()
         except Exception as e:
-            logging.error(f"An unexpected error occurred while fetching URL {url}: {str(e)}")
-            return None
+            return FetchResult(None, error=e, started=started, latency=latency)
+        finally:
+            FETCHES_IN_FLIGHT.dec()
+            FETCH_SECONDS.observe(time.perf_counter() - start)
 
-    def run(self):
+    def log_failure(self, url, result):
+        """
+        Logs why a fetch failed. Responses dropped for their content type or size were logged already.
+
+        Args:
+        - url (str): The URL that was fetched.
+        - result (FetchResult): The failed result.
+        """
+        import requests
+        if isinstance(result.error, requests.exceptions.RequestException):
+            logging.error("Error fetching URL %s: %s", url, result.error)
+        elif result.error is not None:
+            logging.error("An unexpected error occurred while fetching URL %s: %s", url, result.error)
+        elif result.status != 200:
+            logging.warning("Non-successful HTTP response for URL %s: %s", url, result.status)
+
+    def schedule_retry(self, url, result):
+        """
+        Hands a failed URL back to the host scheduler for another attempt after
+        a jittered, exponentially growing delay, or the pause the server asked for.
+
+        Args:
+        - url (str): The URL that failed.
+        - result (FetchResult): The failed result.
+
+        Returns:
+        - bool: True if a retry was scheduled, False if the failure is final.
+        """
+        with self.lock:
+            attempt = self.attempts.pop(url, 0)
+            if (not result.retryable or attempt >= self.max_retries or self.drain_event.is_set()
+                    or (result.retry_after or 0) > self.max_retry_after):
+                return False
+            self.attempts[url] = attempt + 1
+        delay = self.retry_backoff * 2 ** attempt
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        if result.retry_after is not None:
+            delay = max(delay, result.retry_after)
+        self.scheduler.retry(url, delay, pause_host=result.retry_after is not None)
+        FETCH_RETRIES.inc()
+        logging.info("Retrying %s in %.2f seconds (attempt %d of %d): %s", url, delay, attempt + 1,
+                     self.max_retries, result.error or result.status)
+        return True
+
+    def read_body(self, url, response):
+        """
+        Reads a streamed response body, giving up once it exceeds `max_body_bytes`.
+
+        Args:
+        - url (str): The fetched URL.
+        - response (requests.Response): A response opened with `stream=True`.
+
+        Returns:
+        - bytes or None: The decompressed body, or None if it was too large.
+        """
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(64 * 1024):
+            size += len(chunk)
+            if self.max_body_bytes and size > self.max_body_bytes:
+                body_too_large(url, self.max_body_bytes)
+                return None
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def enqueue(self, url, page):
+        """
+        Places a fetched page in the shared queue, as a (url, body, encoding, final_url)
+        tuple, and updates the counters. Blocks while the queue is full; no page is dropped.
+
+        Args:
+        - url (str): The URL that was fetched.
+        - page (tuple or None): (body, encoding, final_url) as returned by `fetch_html_content`, or None
+          if the fetch failed.
+        """
+        if page and not self.put((url, *page)):
+            return
+        if not page and self.frontier is not None:
+            self.frontier.mark_done(url)
+        if self.journal is not None:
+            (self.journal.fetched if page else self.journal.failed)(url)
+        with self.lock:
+            if page:
+                self.successful_fetches += 1
+            else:
+                self.errors += 1
+        (PAGES_FETCHED if page else FETCH_ERRORS).inc()
+
+    def put(self, item):
+        """
+        Puts an item in the shared queue, waiting for room for as long as the
+        producer has not been stopped.
+
+        Args:
+        - item (tuple or None): The item to put.
+
+        Returns:
+        - bool: True if the item was queued, False if the producer was stopped first.
+        """
+        while True:
+            try:
+                self.shared_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                if self.stop_event.is_set():
+                    return False
+
+    def run_threaded(self):
         """
-        Fetches the HTML content for all URLs in the list concurrently
-        and enqueues the content into the shared queue.
+        Fetches all URLs on a pool of worker threads using the blocking session.
         """
 
         def fetch_and_enqueue(url):
-            html_content = self.fetch_html_content(url)
-            with self.lock:
-                if html_content:
-                    while self.shared_queue.qsize() >= self.max_queue_size:
-                        self.shared_queue.get()
-                    self.shared_queue.put((url, html_content))
-                    self.successful_fetches += 1
-                else:
-                    self.errors += 1
+            if not self.stop_event.is_set():
+                self.enqueue(url, self.fetch_html_content(url))
+
+        # Only a bounded window of URLs is submitted ahead of the workers, so that
+        # memory stays flat however long the (possibly lazy) URL list is.
+        window = threading.BoundedSemaphore(self.max_threads * 2)
+
+        def release_slot(_):
+            window.release()
+
+        with ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="FetchWorker") as executor:
+            for url in self.url_list:
+                window.acquire()
+                if self.stop_event.is_set():
+                    window.release()
+                    break
+                executor.submit(fetch_and_enqueue, url).add_done_callback(release_slot)
+
+    def run_scheduled(self):
+        """
+        Fetches all URLs on a pool of worker threads, taking them from the host
+        scheduler so that per-host concurrency and delay limits are respected.
+        """
+
+        def worker():
+            while True:
+                if self.drain_event.is_set():
+                    dropped = self.scheduler.discard()
+                    if dropped:
+                        logging.info("Shutting down: dropped %s URLs waiting in the host scheduler.", dropped)
+                url = self.scheduler.acquire()
+                if url is None:
+                    return
+                try:
+                    if self.stop_event.is_set():
+                        continue
+                    result = self.fetch(url)
+                    if self.limiter is not None and result.started is not None:
+                        self.limiter.record(host_of(url), result.started, result.latency,
+                                            overloaded=result.overloaded, failed=result.status is None,
+                                            network_failure=result.network_failure)
+                    if result.page is None:
+                        if self.schedule_retry(url, result):
+                            continue
+                        self.log_failure(url, result)
+                    # The outcome is final, so the URL's retry count is no longer needed.
+                    with self.lock:
+                        self.attempts.pop(url, None)
+                    self.enqueue(url, result.page)
+                finally:
+                    self.scheduler.release(url)
+
+        with ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="FetchWorker") as executor:
+            for _ in range(self.max_threads):
+                executor.submit(worker)
+            try:
+                for url in self.url_list:
+                    while not self.scheduler.add(url, timeout=0.5):
+                        if self.stop_event.is_set():
+                            break
+                    if self.stop_event.is_set():
+                        break
+            finally:
+                self.scheduler.close()
+
+        logging.info("Host scheduler stats: %s", self.scheduler.stats())
+        if self.limiter is not None:
+            logging.info("Adaptive concurrency limits: %s", self.limiter.stats())
+
+    def run_async(self):
+        """
+        Fetches all URLs on an asyncio event loop, keeping up to
+        `max_concurrency` requests in flight.
+        """
+        import asyncio
+        from async_fetcher import AsyncFetcher
+
+        async def on_result(url, page):
+            # enqueue may block on a full queue, so keep it off the event loop.
+            await asyncio.get_running_loop().run_in_executor(None, self.enqueue, url, page)
+
+        fetcher = AsyncFetcher(max_concurrency=self.max_concurrency, cache=self.cache,
+                               max_per_host=self.max_per_host, max_body_bytes=self.max_body_bytes,
+                               total_retries=self.max_retries, max_retry_after=self.max_retry_after,
+                               archive=self.archive, dns_cache=self.dns_cache, stop_event=self.stop_event)
+        fetcher.run(self.url_list, on_result, blocking_urls=self.frontier is not None)
+
+    def run(self):
+        """
+        Fetches the HTML content for all URLs in the list concurrently, using the
+        configured engine, and enqueues the content into the shared queue.
+        """
+        if self.dns_cache is not None:
+            from dns_cache import prefetching
+            # Pulling ahead of a frontier would wait for pages that are not fetched yet.
+            ahead = 0 if self.frontier is not None else self.dns_prefetch
+            self.url_list = prefetching(self.url_list, self.dns_cache, ahead, stop_event=self.drain_event)
+
+        if self.engine == "async":
+            self.run_async()
+        elif self.scheduler:
+            self.run_scheduled()
+        else:
+            self.run_threaded()
 
-        with ThreadPoolExecutor(max_workers=self.max_threads) as executor:
-            executor.map(fetch_and_enqueue, self.url_list)
+        self.put(None)
 
-        self.shared_queue.put(None)
+        self.connection_reuse = self.connection_stats()
+        logging.info("Connection reuse per host: %s", self.connection_reuse)
 
         self.session.close()
+        self.cache.close()
 
-        logging.info(f"Total URLs processed: {len(self.url_list)}")
-        logging.info(f"Successful fetches: {self.successful_fetches}")
-        logging.info(f"Errors encountered: {self.errors}")
+        if self.frontier is not None:
+            logging.info("Frontier stats: %s", self.frontier.stats())
+        logging.info("Total URLs processed: %s", self.successful_fetches + self.errors)
+        logging.info("Successful fetches: %s", self.successful_fetches)
+        logging.info("Errors encountered: %s", self.errors)
@@ -0,0 +1,293 @@
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+
+COMPRESSORS = {
+    "gzip": gzip.open,
+    "bz2": bz2.open,
+    "xz": lzma.open,
+}
+
+
+class OutputSink:
+    """
+    Base class for output sinks. Records are encoded into an in-memory buffer
+    and written out in one call when the buffer reaches `flush_bytes` or when
+    `flush_interval` seconds have passed since the last flush, instead of with
+    one write per page. A background thread enforces the interval while no
+    records arrive, so a stalled pipeline does not hold results back.
+    """
+
+    format = None
+
+    def __init__(self, path="-", flush_bytes=1024 * 1024, flush_interval=1.0, compression=None, append=False):
+        """
+        Initializes the OutputSink.
+
+        Args:
+        - path (str): File to write to, or "-" for stdout.
+        - flush_bytes (int): Buffer size that triggers a flush.
+        - flush_interval (float): Maximum number of seconds a record stays buffered. 0 flushes on every write.
+        - compression (str or None): One of the keys of `COMPRESSORS`, or None for plain output.
+        - append (bool): Add to the end of an existing file instead of replacing it. Compressed
+          output is added as a new stream, which readers of the format decompress transparently.
+        """
+        if compression is not None and compression not in COMPRESSORS:
+            raise ValueError(f"Unknown compression {compression!r}; expected one of {sorted(COMPRESSORS)}")
+        # Called after every flush, once the flushed records have been handed to the output stream.
+        self.on_flush = None
+        if path == "-":
+            self.appending = False
+            self.stream = sys.stdout.buffer
+            self.owns_stream = False
+            if compression is not None:
+                self.stream = COMPRESSORS[compression](self.stream, 'wb')
+                self.owns_stream = True
+        else:
+            mode = 'ab' if append else 'wb'
+            # Whether there are earlier records, so that formats with a header do not repeat it.
+            self.appending = append and os.path.exists(path) and os.path.getsize(path) > 0
+            self.stream = COMPRESSORS[compression](path, mode) if compression else open(path, mode)
+            self.owns_stream = True
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.buffer = bytearray()
+        self.last_flush = time.monotonic()
+        self.records = 0
+        self.flushes = 0
+        # Guards the buffer against the flusher thread; reentrant because `write` and subclasses call `flush`.
+        self.lock = threading.RLock()
+        self.closing = threading.Event()
+        self.start()
+        self.flusher = None
+        if flush_interval:
+            self.flusher = threading.Thread(target=self._flush_periodically, name="SinkFlusher", daemon=True)
+            self.flusher.start()
+
+    def start(self):
+        """Writes any header the format needs."""
+
+    def encode(self, source_url, hyperlinks):
+        """
+        Encodes one record.
+
+        Args:
+        - source_url (str): The source URL of the HTML content.
+        - hyperlinks (list): List of hyperlinks extracted from the page.
+        """
+        raise NotImplementedError
+
+    def write(self, source_url, hyperlinks):
+        """
+        Buffers the hyperlinks extracted from one page, flushing if needed.
+
+        Args:
+        - source_url (str): The source URL of the HTML content.
+        - hyperlinks (list): List of hyperlinks extracted from the page.
+        """
+        with self.lock:
+            self.encode(source_url, hyperlinks)
+            self.records += 1
+            if self.pending_bytes() >= self.flush_bytes or time.monotonic() - self.last_flush >= self.flush_interval:
+                self.flush()
+
+    def _flush_periodically(self):
+        """Flushes the buffered records once `flush_interval` seconds have passed since the last flush."""
+        wait = self.flush_interval
+        while not self.closing.wait(wait):
+            with self.lock:
+                wait = self.last_flush + self.flush_interval - time.monotonic()
+                if wait <= 0:
+                    if self.pending_bytes():
+                        self.flush()
+                    wait = self.flush_interval
+
+    def pending_bytes(self):
+        """Returns the size of the records not yet written out."""
+        return len(self.buffer)
+
+    def flush(self):
+        """Writes the buffered records to the output stream."""
+        with self.lock:
+            if self.buffer:
+                self.stream.write(self.buffer)
+                self.buffer.clear()
+                self.flushes += 1
+            self.stream.flush()
+            self.last_flush = time.monotonic()
+            if self.on_flush is not None:
+                self.on_flush()
+
+    def close(self):
+        """Flushes the remaining records and closes the output."""
+        self.closing.set()
+        if self.flusher is not None:
+            self.flusher.join()
+        self.flush()
+        if self.owns_stream:
+            self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JSONLinesSink(OutputSink):
+    """Writes one JSON object per page: {"url": ..., "links": [...]}."""
+
+    format = "jsonl"
+
+    def encode(self, source_url, hyperlinks):
+        self.buffer += json.dumps({"url": source_url, "links": hyperlinks}, ensure_ascii=False).encode('utf-8')
+        self.buffer += b"\n"
+
+
+class CSVSink(OutputSink):
+    """Writes one `source_url,link` row per extracted link."""
+
+    format = "csv"
+
+    def start(self):
+        self.text = io.StringIO()
+        self.writer = csv.writer(self.text, lineterminator="\n")
+        if not self.appending:
+            self.writer.writerow(("source_url", "link"))
+            self._drain()
+
+    def _drain(self):
+        self.buffer += self.text.getvalue().encode('utf-8')
+        self.text.seek(0)
+        self.text.truncate()
+
+    def encode(self, source_url, hyperlinks):
+        self.writer.writerows((source_url, link) for link in hyperlinks)
+        self._drain()
+
+
+class ColumnarSink(OutputSink):
+    """
+    Writes a compact binary file made of blocks, one per flush. Each block
+    stores its URLs, per-URL link counts and links as separate columns:
+
+        magic b"WLXB", uint32 page count, uint32 link count,
+        uint32[page count] link counts,
+        uint32[page count + link count] string lengths,
+        concatenated UTF-8 strings (pages first, then links)
+
+    All integers are little-endian. Use `read_columnar` to read a file back.
+    """
+
+    format = "columnar"
+    MAGIC = b"WLXB"
+
+    def start(self):
+        self.reset_block()
+
+    def reset_block(self):
+        self.pages = []
+        self.links = []
+        self.link_counts = array('I')
+        self.block_bytes = 0
+
+    def pending_bytes(self):
+        return self.block_bytes
+
+    def encode(self, source_url, hyperlinks):
+        page = source_url.encode('utf-8')
+        links = [link.encode('utf-8') for link in hyperlinks]
+        self.pages.append(page)
+        self.links.extend(links)
+        self.link_counts.append(len(links))
+        self.block_bytes += 8 + len(page) + sum(len(link) + 4 for link in links)
+
+    def flush(self):
+        with self.lock:
+            self._encode_block()
+            super().flush()
+
+    def _encode_block(self):
+        if self.pages:
+            strings = self.pages + self.links
+            lengths = array('I', map(len, strings))
+            counts = self.link_counts
+            if sys.byteorder != 'little':
+                lengths.byteswap()
+                counts.byteswap()
+            self.buffer += self.MAGIC + struct.pack('<II', len(self.pages), len(self.links))
+            self.buffer += counts.tobytes() + lengths.tobytes() + b"".join(strings)
+            self.reset_block()
+
+
+def read_columnar(path, compression=None):
+    """
+    Reads a file written by `ColumnarSink`.
+
+    Args:
+    - path (str): Path of the file.
+    - compression (str or None): Compression the file was written with.
+
+    Yields:
+    - tuple: (source_url, hyperlinks) for each page, in the order they were written.
+    """
+    opener = COMPRESSORS[compression] if compression else open
+    with opener(path, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset < len(data):
+        if data[offset:offset + 4] != ColumnarSink.MAGIC:
+            raise ValueError(f"Corrupt columnar block at offset {offset}")
+        num_pages, num_links = struct.unpack_from('<II', data, offset + 4)
+        offset += 12
+        counts = array('I', data[offset:offset + 4 * num_pages])
+        offset += 4 * num_pages
+        lengths = array('I', data[offset:offset + 4 * (num_pages + num_links)])
+        offset += 4 * (num_pages + num_links)
+        if sys.byteorder != 'little':
+            counts.byteswap()
+            lengths.byteswap()
+        strings = []
+        for length in lengths:
+            strings.append(data[offset:offset + length].decode('utf-8'))
+            offset += length
+        pages, links = strings[:num_pages], strings[num_pages:]
+        position = 0
+        for page, count in zip(pages, counts):
+            yield page, links[position:position + count]
+            position += count
+
+
+SINKS = {cls.format: cls for cls in (JSONLinesSink, CSVSink, ColumnarSink)}
+
+
+def open_sink(path="-", format=None, **kwargs):
+    """
+    Returns an output sink for the given path and format.
+
+    Args:
+    - path (str): File to write to, or "-" for stdout.
+    - format (str or None): One of the keys of `SINKS`. None picks it from the file
+      extension (".csv", ".wlx"), falling back to JSON Lines.
+    - **kwargs: Passed on to the sink, see `OutputSink`.
+
+    Returns:
+    - OutputSink: The sink.
+    """
+    if format is None:
+        name = path.lower()
+        for suffix in (".gz", ".bz2", ".xz"):
+            name = name.removesuffix(suffix)
+        format = "csv" if name.endswith(".csv") else "columnar" if name.endswith(".wlx") else "jsonl"
+    if format not in SINKS:
+        raise ValueError(f"Unknown output format {format!r}; expected one of {sorted(SINKS)}")
+    return SINKS[format](path, **kwargs)
@@ -0,0 +1,233 @@
+import hashlib
+import logging
+import math
+import os
+import sys
+from urllib.parse import urlparse, urlunparse
+
+
+def open_lines(source):
+    """
+    Opens a URL source and returns a lazy iterator over its non-blank lines.
+    The file is opened straight away, so a missing file raises here rather
+    than on first iteration.
+
+    Args:
+    - source (str): Path of a file with one URL per line, or "-" for stdin.
+
+    Returns:
+    - iterator: Stripped, non-blank lines.
+    """
+    f = sys.stdin if source == "-" else open(source, 'r')
+
+    def lines():
+        try:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+    return lines()
+
+
+def normalize_url(url):
+    """
+    Parses a URL once, keeping it only if it is a valid http(s) URL.
+
+    Args:
+    - url (str): The URL to be normalised.
+
+    Returns:
+    - str or None: The normalised URL, or None if the scheme is not allowed or the netloc is missing.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https'):
+        logging.warning("Disallowed URL scheme in %s", url)
+        return None
+    if not parsed.netloc:
+        logging.error("Invalid URL: %s", url)
+        return None
+    return urlunparse(parsed)
+
+
+class BloomFilter:
+    """
+    A fixed-size Bloom filter used as a compact seen-set. Memory depends only
+    on `capacity` and `error_rate`, never on the number of items added. A small
+    fraction (about `error_rate` once `capacity` items were added) of new items
+    are wrongly reported as already seen.
+    """
+
+    def __init__(self, capacity=10_000_000, error_rate=1e-4):
+        """
+        Initializes the BloomFilter.
+
+        Args:
+        - capacity (int): Number of items the filter is sized for.
+        - error_rate (float): Target false-positive rate at `capacity` items.
+        """
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def add(self, item):
+        """
+        Adds an item to the filter.
+
+        Args:
+        - item (str): The item to add.
+
+        Returns:
+        - bool: True if the item was not seen before, False if it (probably) was.
+        """
+        bits = self.bits
+        is_new = False
+        for pos in self._positions(item):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                is_new = True
+        if is_new:
+            self.count += 1
+        return is_new
+
+    def __len__(self):
+        return self.count
+
+    def false_positive_rate(self):
+        """
+        Estimates the chance that a new item is reported as already seen, given the items added so far.
+
+        Returns:
+        - float: The estimated false-positive rate.
+        """
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+class ScalableBloomFilter:
+    """
+    A Bloom filter that grows instead of degrading when more items are added
+    than it was sized for (Almeida et al., "Scalable Bloom Filters"). Once a
+    stage holds `capacity` items, a stage twice as large with half the error
+    rate is added, so the false-positive rate stays below `error_rate` however
+    many items arrive. Memory grows by about 2.6 bytes per item at the default
+    rate, and only once the initial capacity is exceeded.
+    """
+
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, capacity=1_000_000, error_rate=1e-4):
+        """
+        Initializes the ScalableBloomFilter.
+
+        Args:
+        - capacity (int): Number of items the first stage is sized for, ideally the expected number of items.
+        - error_rate (float): Upper bound of the overall false-positive rate.
+        """
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.stages = []
+        self._add_stage()
+
+    def _add_stage(self):
+        index = len(self.stages)
+        self.stage_capacity = self.capacity * self.GROWTH ** index
+        stage_error_rate = self.error_rate * (1 - self.TIGHTENING) * self.TIGHTENING ** index
+        self.stages.append(BloomFilter(self.stage_capacity, stage_error_rate))
+
+    def __contains__(self, item):
+        return any(item in stage for stage in reversed(self.stages))
+
+    def add(self, item):
+        """
+        Adds an item to the filter.
+
+        Args:
+        - item (str): The item to add.
+
+        Returns:
+        - bool: True if the item was not seen before, False if it (probably) was.
+        """
+        if item in self:
+            return False
+        if len(self.stages[-1]) >= self.stage_capacity:
+            self._add_stage()
+        return self.stages[-1].add(item)
+
+    def __len__(self):
+        return sum(len(stage) for stage in self.stages)
+
+    def false_positive_rate(self):
+        """
+        Estimates the chance that a new item is reported as already seen, given the items added so far.
+
+        Returns:
+        - float: The estimated false-positive rate.
+        """
+        rate = 1.0
+        for stage in self.stages:
+            rate *= 1 - stage.false_positive_rate()
+        return 1 - rate
+
+
+def expected_url_count(source, default=1_000_000):
+    """
+    Estimates the number of URLs in a source from its size, generously, so
+    that a seen-set sized from it rarely needs to grow.
+
+    Args:
+    - source (str): Path of a file with one URL per line, or "-" for stdin.
+    - default (int): Estimate for stdin and other sources without a known size.
+
+    Returns:
+    - int: The estimated number of URLs.
+    """
+    if source == "-":
+        return default
+    try:
+        size = os.path.getsize(source)
+    except OSError:
+        return default
+    # Few URLs are shorter than 24 bytes, newline included.
+    return max(1000, size // 24)
+
+
+def stream_urls(lines, seen=None):
+    """
+    Lazily normalises, validates and deduplicates URLs.
+
+    Args:
+    - lines (iterable): Raw URLs, for example from `open_lines`.
+    - seen (BloomFilter or None): Seen-set used for deduplication. Its `add` must return
+      True for new items. None disables deduplication.
+
+    Yields:
+    - str: Each valid URL the first time it is seen.
+    """
+    dropped = 0
+    for line in lines:
+        url = normalize_url(line)
+        if url is None:
+            continue
+        if seen is None or seen.add(url):
+            yield url
+        else:
+            dropped += 1
+    if dropped:
+        logging.info("Dropped %d repeated URLs; about %.2g of new URLs were wrongly taken for repeats",
+                     dropped, seen.false_positive_rate())
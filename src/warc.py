@@ -0,0 +1,385 @@
+import base64
+import hashlib
+import logging
+import mmap
+import os
+import threading
+import uuid
+import zlib
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from content import is_html, parse_content_type
+
+WARC_VERSION = b"WARC/1.1"
+SOFTWARE = "web-link-extractor"
+GZIP_MAGIC = b"\x1f\x8b\x08"
+# Headers describing the transfer of the body rather than the body. Bodies are archived
+# as the fetch engines return them, decompressed and de-chunked, so these are dropped.
+TRANSFER_HEADERS = frozenset(("content-encoding", "transfer-encoding", "content-length"))
+# Bytes of a gzip member fed to the decompressor at a time while reading a compressed archive.
+READ_CHUNK = 64 * 1024
+# Offset ranges the replay of an archive is split into, per parsing process and at least.
+DEFAULT_RANGE_BYTES = 16 * 1024 * 1024
+
+WarcRecord = namedtuple("WarcRecord", "offset headers block")
+WarcRecord.__doc__ = """
+A WARC record: its byte offset in the archive, its headers (names lower-cased) and its content block.
+"""
+
+
+def _warc_date():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _header_block(fields):
+    return "".join(f"{name}: {value}\r\n" for name, value in fields).encode("utf-8")
+
+
+def _parse_headers(data):
+    """
+    Parses `Name: value` lines into a dict with lower-cased names.
+
+    Args:
+    - data (bytes): The header lines, without the first line.
+
+    Returns:
+    - dict: The headers. A repeated header keeps its last value.
+    """
+    headers = {}
+    for line in data.split(b"\r\n"):
+        name, sep, value = line.partition(b":")
+        if sep:
+            headers[name.strip().lower().decode("latin-1")] = value.strip().decode("utf-8", errors="replace")
+    return headers
+
+
+class WarcWriter:
+    """
+    The WarcWriter class appends fetched responses to a WARC 1.1 archive as
+    they arrive. Each record is written out with a single unbuffered write, so
+    the archive never holds more than the record being written when the
+    process dies. Archives whose name ends in `.gz` get one gzip member per
+    record, which other WARC tools read and which keeps the archive splittable.
+    """
+
+    def __init__(self, path, append=False, compress=None, level=6):
+        """
+        Initializes the WarcWriter and writes a `warcinfo` record.
+
+        Args:
+        - path (str): Path of the archive.
+        - append (bool): Add to an existing archive instead of replacing it. A record
+          cut short by a crash is truncated away first.
+        - compress (bool or None): Gzip every record. None decides from the `.gz` extension.
+        - level (int): Gzip compression level.
+        """
+        self.path = path
+        self.compress = path.endswith(".gz") if compress is None else compress
+        self.level = level
+        self.lock = threading.Lock()
+        self.records = 0
+        self.bytes_written = 0
+        if append and os.path.exists(path):
+            end = _complete_length(path)
+            if end != os.path.getsize(path):
+                logging.warning("Truncating a partial record at offset %s of %s.", end, path)
+                os.truncate(path, end)
+        self.file = open(path, "ab" if append else "wb", buffering=0)
+        self.write_record("warcinfo", b"software: " + SOFTWARE.encode() + b"\r\nformat: WARC File Format 1.1\r\n",
+                          "application/warc-fields")
+
+    def write_record(self, warc_type, block, content_type, target_uri=None, extra_fields=()):
+        """
+        Writes one record.
+
+        Args:
+        - warc_type (str): The WARC-Type, such as "response".
+        - block (bytes): The content block.
+        - content_type (str): The Content-Type of the block.
+        - target_uri (str or None): The WARC-Target-URI.
+        - extra_fields (iterable): Further (name, value) header fields.
+        """
+        fields = [("WARC-Type", warc_type), ("WARC-Record-ID", f"<urn:uuid:{uuid.uuid4()}>"),
+                  ("WARC-Date", _warc_date())]
+        if target_uri is not None:
+            fields.append(("WARC-Target-URI", target_uri))
+        fields.extend(extra_fields)
+        fields.append(("Content-Type", content_type))
+        fields.append(("Content-Length", len(block)))
+        record = b"".join((WARC_VERSION, b"\r\n", _header_block(fields), b"\r\n", block, b"\r\n\r\n"))
+        if self.compress:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+            record = compressor.compress(record) + compressor.flush()
+        with self.lock:
+            self.file.write(record)
+            self.records += 1
+            self.bytes_written += len(record)
+
+    def write_response(self, url, body, headers=None, encoding=None, status=200, reason="OK"):
+        """
+        Archives a fetched page as a `response` record holding its status line, headers and body.
+
+        Args:
+        - url (str): The fetched URL.
+        - body (bytes or str): The decompressed response body. Text, from caches written by
+          earlier versions, is archived as UTF-8.
+        - headers (Mapping or None): The response headers. None, for pages served from the
+          HTTP cache, records just a Content-Type with `encoding`.
+        - encoding (str or None): Encoding of the body, used when `headers` is None.
+        - status (int): The HTTP status code.
+        - reason (str): The HTTP reason phrase.
+        """
+        if isinstance(body, str):
+            body, encoding, headers = body.encode("utf-8"), "utf-8", None
+        if headers is None:
+            fields = [("Content-Type", f"text/html; charset={encoding}" if encoding else "text/html")]
+        else:
+            fields = [(name, value) for name, value in headers.items() if name.lower() not in TRANSFER_HEADERS]
+        fields.append(("Content-Length", len(body)))
+        http_block = b"".join((f"HTTP/1.1 {status} {reason}\r\n".encode("latin-1"), _header_block(fields), b"\r\n",
+                               body))
+        digest = "sha1:" + base64.b32encode(hashlib.sha1(body).digest()).decode("ascii")
+        self.write_record("response", http_block, "application/http;msgtype=response", target_uri=url,
+                          extra_fields=[("WARC-Payload-Digest", digest)])
+
+    def close(self):
+        self.file.close()
+        logging.info("Wrote %s WARC records (%s bytes) to %s.", self.records, self.bytes_written, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class WarcReader:
+    """
+    The WarcReader class reads the records of a WARC archive, plain or with one
+    gzip member per record, through a read-only memory map. Reads are
+    sequential, so the kernel reads ahead and evicts pages already read.
+
+    An archive can be split into byte ranges (see `split`) that are read
+    independently, for instance by the processes of a pool: a range holds the
+    records that start inside it.
+    """
+
+    def __init__(self, path):
+        """
+        Opens and memory-maps the archive.
+
+        Args:
+        - path (str): Path of the archive.
+        """
+        self.path = path
+        self.file = open(path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        if self.size and hasattr(self.map, "madvise"):
+            self.map.madvise(mmap.MADV_SEQUENTIAL)
+        self.compressed = self.map[:3] == GZIP_MAGIC
+
+    def read_record(self, offset):
+        """
+        Reads the record starting at the given offset.
+
+        Args:
+        - offset (int): Offset of the record.
+
+        Returns:
+        - tuple: (WarcRecord, offset of the next record).
+
+        Raises:
+        - ValueError: If there is no complete record at the offset.
+        """
+        if self.compressed:
+            data, end = self._read_member(offset)
+            pos = 0
+        else:
+            data, pos, end = self.map, offset, None
+        if data[pos:pos + 6] != b"WARC/1":
+            raise ValueError(f"No WARC record at offset {offset} of {self.path}")
+        header_end = data.find(b"\r\n\r\n", pos)
+        line_end = data.find(b"\r\n", pos)
+        if header_end < 0:
+            raise ValueError(f"Truncated WARC record at offset {offset} of {self.path}")
+        headers = _parse_headers(data[line_end + 2:header_end])
+        length = headers.get("content-length", "")
+        if not length.isdigit():
+            raise ValueError(f"WARC record at offset {offset} of {self.path} has no Content-Length")
+        block_start = header_end + 4
+        block_end = block_start + int(length)
+        if block_end > len(data) or (end is None and data[block_end:block_end + 4] != b"\r\n\r\n"):
+            raise ValueError(f"Truncated WARC record at offset {offset} of {self.path}")
+        record = WarcRecord(offset, headers, data[block_start:block_end])
+        return record, end if end is not None else block_end + 4
+
+    def _read_member(self, offset):
+        decompressor = zlib.decompressobj(31)
+        chunks = []
+        pos = offset
+        while not decompressor.eof:
+            chunk = self.map[pos:pos + READ_CHUNK]
+            if not chunk:
+                raise ValueError(f"Truncated gzip member at offset {offset} of {self.path}")
+            try:
+                chunks.append(decompressor.decompress(chunk))
+            except zlib.error as e:
+                raise ValueError(f"Corrupt gzip member at offset {offset} of {self.path}: {e}") from None
+            pos += len(chunk)
+        return b"".join(chunks), pos - len(decompressor.unused_data)
+
+    def records(self, start=0, end=None):
+        """
+        Yields the records that start in the given byte range. Reading stops with
+        a warning at a record that is cut short or corrupt.
+
+        Args:
+        - start (int): Offset of the first record, as returned by `split`.
+        - end (int or None): End of the range. None reads to the end of the archive.
+
+        Yields:
+        - WarcRecord: The records, in archive order.
+        """
+        end = self.size if end is None else min(end, self.size)
+        pos = start
+        while pos < end:
+            try:
+                record, pos = self.read_record(pos)
+            except ValueError as e:
+                logging.warning("Stopped reading %s: %s", self.path, e)
+                return
+            yield record
+
+    def pages(self, start=0, end=None):
+        """
+        Yields the HTML pages archived in `response` records with a 200 status,
+        in the form the producer queues them. Pages are archived under the URL
+        they came from after redirects, so that is both their URL and their final URL.
+
+        Args:
+        - start (int): Offset of the first record, as returned by `split`.
+        - end (int or None): End of the range. None reads to the end of the archive.
+
+        Yields:
+        - tuple: (url, body, encoding from the Content-Type header or None, final_url).
+        """
+        for record in self.records(start, end):
+            if record.headers.get("warc-type") != "response" or "warc-target-uri" not in record.headers:
+                continue
+            block = record.block
+            http_end = block.find(b"\r\n\r\n")
+            status_line, _, header_lines = block[:max(http_end, 0)].partition(b"\r\n")
+            status = status_line.split(b" ", 2)[1:2]
+            if http_end < 0 or status != [b"200"]:
+                continue
+            media_type, encoding = parse_content_type(_parse_headers(header_lines).get("content-type"))
+            if is_html(media_type):
+                url = record.headers["warc-target-uri"]
+                yield url, block[http_end + 4:], encoding, url
+
+    def next_record(self, offset):
+        """
+        Finds the first record starting at or after the given offset. A candidate
+        must parse and be followed by another record or the end of the archive,
+        so that archived content which merely looks like a record is skipped.
+
+        Args:
+        - offset (int): Offset to search from.
+
+        Returns:
+        - int: Offset of the record, or the size of the archive if there is none.
+        """
+        marker, skip = (GZIP_MAGIC, 0) if self.compressed else (b"\r\n\r\nWARC/1", 4)
+        pos = max(offset - skip, 0)
+        while True:
+            found = self.map.find(marker, pos)
+            if found < 0:
+                return self.size
+            candidate = found + skip
+            if candidate >= offset:
+                try:
+                    _, following = self.read_record(candidate)
+                except ValueError:
+                    pass
+                else:
+                    if following == self.size or self._starts_record(following):
+                        return candidate
+            pos = found + 1
+
+    def _starts_record(self, offset):
+        if self.compressed:
+            return self.map[offset:offset + 3] == GZIP_MAGIC
+        return self.map[offset:offset + 6] == b"WARC/1"
+
+    def split(self, parts):
+        """
+        Splits the archive into byte ranges that start on record boundaries.
+
+        Args:
+        - parts (int): Number of ranges wanted. Fewer are returned when records are large.
+
+        Returns:
+        - list: (start, end) offsets, covering every record exactly once.
+        """
+        bounds = [0]
+        for part in range(1, parts):
+            offset = self.next_record(max(self.size * part // parts, bounds[-1] + 1))
+            if offset >= self.size:
+                break
+            bounds.append(offset)
+        bounds.append(self.size)
+        return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+    def close(self):
+        if self.size:
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _complete_length(path):
+    """
+    Returns the length of the leading run of complete records in an archive.
+
+    Args:
+    - path (str): Path of the archive.
+
+    Returns:
+    - int: Offset just past the last complete record.
+    """
+    with WarcReader(path) as reader:
+        end = 0
+        while end < reader.size:
+            try:
+                end = reader.read_record(end)[1]
+            except ValueError:
+                break
+        return end
+
+
+def replay_ranges(paths, parts, range_bytes=DEFAULT_RANGE_BYTES):
+    """
+    Splits archives into ranges of roughly `range_bytes`, and into at least
+    `parts` ranges each, for replay across a process pool.
+
+    Args:
+    - paths (list): Paths of the archives.
+    - parts (int): Minimum number of ranges per archive, usually the number of processes.
+    - range_bytes (int): Target size of a range.
+
+    Returns:
+    - list: (path, start, end) tuples, in archive order.
+    """
+    ranges = []
+    for path in paths:
+        with WarcReader(path) as reader:
+            count = max(parts, -(-reader.size // range_bytes))
+            ranges.extend((path, start, end) for start, end in reader.split(count))
+    return ranges
@@ -0,0 +1,453 @@
+import hashlib
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import deque
+
+from host_scheduler import host_of
+
+PENDING, LEASED, DONE, FAILED = range(4)
+RING_SIZE = 2 ** 32
+
+
+def hash_point(key):
+    """
+    Returns the position of a key on the hash ring.
+
+    Args:
+    - key (str): A host or a virtual node name.
+
+    Returns:
+    - int: A point in [0, 2**32).
+    """
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=4).digest(), 'big')
+
+
+def default_worker_id():
+    """Returns a worker id that is unique across processes and machines."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class HashRing:
+    """
+    The HashRing class maps hosts to workers with consistent hashing. Each
+    worker owns `replicas` points on the ring and every host belongs to the
+    worker owning the next point clockwise, so adding or removing a worker
+    only moves the hosts of the arcs next to its points.
+    """
+
+    def __init__(self, nodes=(), replicas=64):
+        """
+        Initializes the HashRing.
+
+        Args:
+        - nodes (iterable): Initial worker ids.
+        - replicas (int): Points per worker; more points spread hosts more evenly.
+        """
+        self.replicas = replicas
+        self.points = []
+        self.owners = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        for i in range(self.replicas):
+            point = hash_point(f"{node}#{i}")
+            if point not in self.owners:
+                self.owners[point] = node
+                insort(self.points, point)
+
+    def remove(self, node):
+        self.points = [point for point in self.points if self.owners[point] != node]
+        self.owners = {point: owner for point, owner in self.owners.items() if owner != node}
+
+    def node_for(self, point):
+        """
+        Returns the worker owning a point, or None if the ring is empty.
+
+        Args:
+        - point (int): A point, see `hash_point`.
+
+        Returns:
+        - str or None: The worker id.
+        """
+        if not self.points:
+            return None
+        index = bisect_left(self.points, point)
+        return self.owners[self.points[index % len(self.points)]]
+
+    def ranges_for(self, node):
+        """
+        Returns the arcs of the ring owned by a worker.
+
+        Args:
+        - node (str): The worker id.
+
+        Returns:
+        - list: (low, high) tuples of inclusive point bounds.
+        """
+        ranges = []
+        for index, point in enumerate(self.points):
+            if self.owners[point] != node:
+                continue
+            if index == 0:
+                ranges.append((0, point))
+                ranges.append((self.points[-1] + 1, RING_SIZE - 1))
+            else:
+                ranges.append((self.points[index - 1] + 1, point))
+        return [(low, high) for low, high in ranges if low <= high]
+
+
+class WorkStore:
+    """
+    The WorkStore class holds the URLs of a distributed run in an SQLite
+    database that every worker process opens, on one machine or on a shared
+    filesystem.
+
+    Hosts are sharded over the live workers with a `HashRing`, so each host is
+    fetched by one worker at a time and politeness limits and connection reuse
+    stay local to it. Workers lease batches of URLs from their part of the ring
+    and report back results and failures. A lease that is not renewed expires,
+    and the URLs of a worker that stops sending heartbeats go back to the pool
+    and are picked up by the worker now owning their hosts.
+    """
+
+    def __init__(self, path, lease_seconds=60.0, worker_timeout=None, max_attempts=3):
+        """
+        Initializes the WorkStore.
+
+        Args:
+        - path (str): Path of the SQLite database, created if needed.
+        - lease_seconds (float): How long a leased URL stays assigned without a heartbeat.
+        - worker_timeout (float or None): How long a worker stays on the ring without a
+          heartbeat. Defaults to `lease_seconds`.
+        - max_attempts (int): Number of failed fetches after which a URL is given up.
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.worker_timeout = worker_timeout if worker_timeout is not None else lease_seconds
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            "url TEXT PRIMARY KEY, point INTEGER NOT NULL, state INTEGER NOT NULL DEFAULT 0, "
+            "worker TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0, links INTEGER)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS urls_state_point ON urls (state, point)")
+        self.db.execute(f"CREATE INDEX IF NOT EXISTS urls_leases ON urls (worker) WHERE state = {LEASED}")
+        self.db.execute("CREATE TABLE IF NOT EXISTS workers (worker TEXT PRIMARY KEY, heartbeat REAL NOT NULL)")
+
+    def _transaction(self):
+        """Returns a context manager holding the lock and a write transaction."""
+        return _Transaction(self)
+
+    def add_urls(self, urls, chunk_size=1000):
+        """
+        Adds URLs to the store, ignoring ones it already holds.
+
+        Args:
+        - urls (iterable): URLs to add. Consumed lazily, in chunks.
+        - chunk_size (int): Number of URLs inserted per transaction.
+
+        Returns:
+        - int: Number of URLs added.
+        """
+        added = 0
+        chunk = []
+        for url in urls:
+            chunk.append((url, hash_point(host_of(url))))
+            if len(chunk) >= chunk_size:
+                added += self._insert(chunk)
+                chunk = []
+        if chunk:
+            added += self._insert(chunk)
+        return added
+
+    def _insert(self, rows):
+        with self._transaction() as db:
+            before = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO urls (url, point) VALUES (?, ?)", rows)
+            return db.total_changes - before
+
+    def heartbeat(self, worker):
+        """
+        Registers a worker as alive and renews its leases.
+
+        Args:
+        - worker (str): The worker id.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            db.execute("INSERT OR REPLACE INTO workers (worker, heartbeat) VALUES (?, ?)", (worker, now))
+            db.execute(f"UPDATE urls SET lease_expires = ? WHERE state = {LEASED} AND worker = ?",
+                       (now + self.lease_seconds, worker))
+
+    def leave(self, worker):
+        """
+        Removes a worker from the ring and returns its unfinished URLs to the pool.
+
+        Args:
+        - worker (str): The worker id.
+        """
+        with self._transaction() as db:
+            db.execute("DELETE FROM workers WHERE worker = ?", (worker,))
+            db.execute(f"UPDATE urls SET state = {PENDING}, worker = NULL, lease_expires = NULL "
+                       f"WHERE state = {LEASED} AND worker = ?", (worker,))
+
+    def live_workers(self):
+        """
+        Returns the workers that sent a heartbeat recently.
+
+        Returns:
+        - list: Worker ids.
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT worker FROM workers WHERE heartbeat >= ?",
+                                   (time.time() - self.worker_timeout,)).fetchall()
+        return [row[0] for row in rows]
+
+    def lease(self, worker, limit=100):
+        """
+        Leases up to `limit` URLs whose hosts belong to the worker on the ring of
+        live workers. Pending URLs and URLs whose lease expired are eligible.
+
+        Args:
+        - worker (str): The worker id. The worker must have sent a heartbeat.
+        - limit (int): Maximum number of URLs to lease.
+
+        Returns:
+        - list: The leased URLs.
+        """
+        ring = HashRing(set(self.live_workers()) | {worker})
+        ranges = ring.ranges_for(worker)
+        if not ranges:
+            return []
+        now = time.time()
+        where = " OR ".join("point BETWEEN ? AND ?" for _ in ranges)
+        bounds = [bound for low_high in ranges for bound in low_high]
+        with self._transaction() as db:
+            rows = db.execute(
+                f"SELECT rowid, url FROM urls WHERE (state = ? OR (state = ? AND lease_expires < ?)) "
+                f"AND ({where}) LIMIT ?",
+                [PENDING, LEASED, now, *bounds, limit],
+            ).fetchall()
+            db.executemany("UPDATE urls SET state = ?, worker = ?, lease_expires = ? WHERE rowid = ?",
+                           [(LEASED, worker, now + self.lease_seconds, rowid) for rowid, _ in rows])
+        return [url for _, url in rows]
+
+    def complete(self, worker, results):
+        """
+        Records finished URLs.
+
+        Args:
+        - worker (str): The worker id.
+        - results (iterable): (url, number of links) tuples.
+        """
+        with self._transaction() as db:
+            db.executemany("UPDATE urls SET state = ?, links = ?, worker = ?, lease_expires = NULL WHERE url = ?",
+                           [(DONE, links, worker, url) for url, links in results])
+
+    def fail(self, worker, urls):
+        """
+        Records failed fetches. A URL is retried, possibly by another worker,
+        until it has failed `max_attempts` times.
+
+        Args:
+        - worker (str): The worker id.
+        - urls (iterable): The URLs that failed.
+        """
+        with self._transaction() as db:
+            db.executemany(
+                "UPDATE urls SET attempts = attempts + 1, worker = ?, lease_expires = NULL, "
+                "state = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END WHERE url = ?",
+                [(worker, self.max_attempts, FAILED, PENDING, url) for url in urls],
+            )
+
+    def remaining(self):
+        """Returns the number of URLs not yet done or given up."""
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM urls WHERE state IN (?, ?)", (PENDING, LEASED)).fetchone()[0]
+
+    def stats(self):
+        """
+        Returns the store counters.
+
+        Returns:
+        - dict: URLs per state, links found and live workers.
+        """
+        with self.lock:
+            counts = dict(self.db.execute("SELECT state, COUNT(*) FROM urls GROUP BY state").fetchall())
+            links = self.db.execute("SELECT COALESCE(SUM(links), 0) FROM urls").fetchone()[0]
+        return {
+            "pending": counts.get(PENDING, 0),
+            "leased": counts.get(LEASED, 0),
+            "done": counts.get(DONE, 0),
+            "failed": counts.get(FAILED, 0),
+            "links": links,
+            "live_workers": len(self.live_workers()),
+        }
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class _Transaction:
+    def __init__(self, store):
+        self.store = store
+
+    def __enter__(self):
+        self.store.lock.acquire()
+        # IMMEDIATE takes the write lock up front, so that two workers cannot lease the same rows.
+        self.store.db.execute("BEGIN IMMEDIATE")
+        return self.store.db
+
+    def __exit__(self, exc_type, *exc_info):
+        try:
+            self.store.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.store.lock.release()
+
+
+class LeaseFrontier:
+    """
+    The LeaseFrontier class lets a worker run the usual pipeline on URLs leased
+    from a WorkStore. It is iterated by the Producer like a crawl Frontier, and
+    the Producer and Consumer report each URL back through `add_links` and
+    `mark_done`. Results are sent to the store in batches, with the next lease
+    or heartbeat. Iteration ends once the store has no work left.
+    """
+
+    def __init__(self, store, worker=None, batch_size=100, poll_interval=1.0, stop_event=None):
+        """
+        Initializes the LeaseFrontier.
+
+        Args:
+        - store (WorkStore): The shared work store.
+        - worker (str or None): The worker id. Defaults to `default_worker_id()`.
+        - batch_size (int): Number of URLs leased at once.
+        - poll_interval (float): Seconds to wait before asking again when there is nothing to lease.
+        - stop_event (threading.Event): Event that, once set, ends iteration early.
+        """
+        self.store = store
+        self.worker = worker or default_worker_id()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.stop_event = stop_event or threading.Event()
+        self.condition = threading.Condition()
+        self.pending = deque()
+        self.in_flight = set()
+        self.completed = []
+        self.failed = []
+        self.leased = 0
+        self.done = 0
+        self.errors = 0
+        self.closed = threading.Event()
+        self.heartbeat_thread = threading.Thread(target=self._heartbeat, name="LeaseHeartbeat", daemon=True)
+        self.store.heartbeat(self.worker)
+        self.heartbeat_thread.start()
+
+    def _heartbeat(self):
+        while not self.closed.wait(self.store.lease_seconds / 3):
+            self.flush()
+            self.store.heartbeat(self.worker)
+
+    def flush(self):
+        """Sends the results collected so far to the store."""
+        with self.condition:
+            completed, self.completed = self.completed, []
+            failed, self.failed = self.failed, []
+        if completed:
+            self.store.complete(self.worker, completed)
+        if failed:
+            self.store.fail(self.worker, failed)
+
+    def __iter__(self):
+        """
+        Yields leased URLs, leasing the next batch when the current one runs out.
+
+        Yields:
+        - str: The next URL to fetch.
+        """
+        while not self.stop_event.is_set():
+            with self.condition:
+                url = self.pending.popleft() if self.pending else None
+                if url is not None:
+                    self.in_flight.add(url)
+            if url is not None:
+                yield url
+                continue
+
+            self.flush()
+            batch = self.store.lease(self.worker, self.batch_size)
+            if batch:
+                with self.condition:
+                    self.pending.extend(batch)
+                    self.leased += len(batch)
+                continue
+            with self.condition:
+                idle = not self.in_flight
+            if idle and self.store.remaining() == 0:
+                return
+            # Other workers still hold work; one of them may die and leave it to us.
+            self.stop_event.wait(self.poll_interval)
+
+    def add_links(self, source_url, hyperlinks):
+        """
+        Reports the links extracted from a fetched page and marks it as done.
+
+        Args:
+        - source_url (str): The URL of the page, as yielded by the frontier.
+        - hyperlinks (list): Links extracted from the page.
+        """
+        with self.condition:
+            if source_url not in self.in_flight:
+                return
+            self.in_flight.discard(source_url)
+            self.completed.append((source_url, len(hyperlinks)))
+            self.done += 1
+
+    def mark_done(self, url):
+        """
+        Reports a URL that could not be fetched.
+
+        Args:
+        - url (str): The URL.
+        """
+        with self.condition:
+            if url not in self.in_flight:
+                return
+            self.in_flight.discard(url)
+            self.failed.append(url)
+            self.errors += 1
+
+    def close(self):
+        """Sends the remaining results, and leaves the ring so that unfinished URLs are reassigned."""
+        self.closed.set()
+        self.heartbeat_thread.join()
+        self.flush()
+        self.store.leave(self.worker)
+        logging.info("Worker %s stats: %s", self.worker, self.stats())
+
+    def stats(self):
+        """
+        Returns the worker counters.
+
+        Returns:
+        - dict: URLs leased, done, failed and in flight.
+        """
+        with self.condition:
+            return {
+                "leased": self.leased,
+                "done": self.done,
+                "failed": self.errors,
+                "in_flight": len(self.in_flight),
+                "pending": len(self.pending),
+            }
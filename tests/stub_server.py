@@ -0,0 +1,72 @@
+"""
+A local HTTP server for the tests that fetch pages, so that none of them touches the network.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Base class of the tests' request handlers, which implement `do_GET` with `reply`.
+    Connections are kept open, so that connection reuse can be checked.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def reply(self, status=200, body=b"", headers=None, content_type="text/html; charset=utf-8"):
+        """
+        Sends a complete response.
+
+        Args:
+        - status (int): The HTTP status code.
+        - body (bytes): The response body.
+        - headers (dict or None): Further response headers.
+        - content_type (str or None): The Content-Type header. None sends none.
+        """
+        self.send_response(status)
+        if content_type is not None:
+            self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """Runs a `ThreadingHTTPServer` with the given handler on a background thread."""
+
+    def __init__(self, handler):
+        """
+        Args:
+        - handler (type): The request handler class, usually a `StubHandler` subclass.
+        """
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="StubServer", daemon=True)
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
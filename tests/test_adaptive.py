@@ -0,0 +1,112 @@
+import queue
+import threading
+import time
+import unittest
+from src.adaptive import AdaptiveLimiter, AIMDLimit
+from src.content import parse_retry_after
+from src.producer import FetchResult, Producer
+from tests.stub_server import StubHandler, StubServer
+
+
+class _FlakyHandler(StubHandler):
+    """Answers /503 and /429 with an error on the first request, then with a page; /slow-down always asks for a pause."""
+    seen = set()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            first = self.path not in self.seen
+            self.seen.add(self.path)
+        if self.path == "/slow-down":
+            self.reply(429, headers={"Retry-After": "3600"})
+        elif first and self.path == "/503":
+            self.reply(503)
+        elif first and self.path == "/429":
+            self.reply(429, headers={"Retry-After": "0"})
+        else:
+            self.reply(200, b"<html></html>", content_type="text/html")
+
+
+class TestAdaptive(unittest.TestCase):
+
+    def test_aimd_limit(self):
+        limit = AIMDLimit(8, latency_tolerance=None)
+        self.assertEqual(limit.update(time.monotonic(), overloaded=True), -1)
+        self.assertEqual(limit.value, 4)
+        # A request sent before the decrease does not decrease the limit again.
+        self.assertEqual(limit.update(0.0, overloaded=True), 0)
+        self.assertEqual(limit.value, 4)
+        # Each success adds 1/limit, so a round of about `limit` successes adds one.
+        for _ in range(4):
+            limit.update(time.monotonic(), overloaded=False)
+        self.assertEqual(limit.value, 4)
+        self.assertEqual(limit.update(time.monotonic(), overloaded=False), 1)
+        self.assertEqual(limit.value, 5)
+
+    def test_latency_counts_as_overload_after_warmup(self):
+        limit = AIMDLimit(8, warmup=3, smoothing=1.0)
+        self.assertFalse(any(limit.latency_overloaded(0.1) for _ in range(3)))
+        self.assertFalse(limit.latency_overloaded(0.15))
+        self.assertTrue(limit.latency_overloaded(0.5))
+
+    def test_limiter_backs_off_per_host(self):
+        limiter = AdaptiveLimiter(10, 4)
+        limiter.record("a.com", time.monotonic(), 0.1, overloaded=True)
+        self.assertEqual(limiter.host_limit("a.com"), 2)
+        self.assertEqual(limiter.host_limit("b.com"), 4)
+        self.assertEqual(limiter.total_limit(), 10)
+        # A dead host lowers its own limit only; a timeout or reset lowers the global one too.
+        limiter.record("b.com", time.monotonic(), None, failed=True)
+        self.assertEqual(limiter.total_limit(), 10)
+        limiter.record("c.com", time.monotonic(), None, failed=True, network_failure=True)
+        self.assertEqual(limiter.total_limit(), 5)
+        self.assertEqual(limiter.stats(), {"total": 5, "hosts": {"a.com": 2, "b.com": 2, "c.com": 2}})
+
+    def test_limiter_forgets_least_recently_used_hosts(self):
+        limiter = AdaptiveLimiter(10, 4, max_hosts=2)
+        for host in ("a.com", "b.com", "a.com", "c.com"):
+            limiter.record(host, time.monotonic(), None, failed=True)
+        self.assertEqual(list(limiter.hosts), ["a.com", "c.com"])
+        self.assertEqual(limiter.host_limit("a.com"), 1)
+        self.assertEqual(limiter.host_limit("b.com"), 4)
+
+    def test_only_timeouts_and_resets_are_network_failures(self):
+        import requests
+        from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+        refused = requests.exceptions.ConnectionError(MaxRetryError(None, "/", NewConnectionError(None, "refused")))
+        reset = requests.exceptions.ConnectionError(ProtocolError("Connection aborted.", ConnectionResetError(104)))
+        unresolved = requests.exceptions.ConnectionError("Name or service not known")
+        self.assertFalse(FetchResult(error=refused).network_failure)
+        self.assertFalse(FetchResult(error=unresolved).network_failure)
+        self.assertTrue(FetchResult(error=reset).network_failure)
+        self.assertTrue(FetchResult(error=requests.exceptions.ReadTimeout()).network_failure)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("120"), 120.0)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+    def test_producer_retries_through_the_scheduler(self):
+        _FlakyHandler.seen = set()
+        with StubServer(_FlakyHandler) as server:
+            base_url = server.base_url
+            shared_queue = queue.Queue()
+            urls = [f"{base_url}/503", f"{base_url}/429", f"{base_url}/slow-down", f"{base_url}/ok"]
+            producer = Producer(shared_queue, urls, max_threads=2, max_per_host=2, adaptive=True,
+                                retry_backoff=0.01)
+            producer.run()
+
+        pages = {}
+        for item in iter(shared_queue.get, None):
+            url, body, encoding, final_url = item
+            pages[url] = body
+        self.assertEqual(sorted(pages), [f"{base_url}/429", f"{base_url}/503", f"{base_url}/ok"])
+        self.assertEqual(producer.successful_fetches, 3)
+        self.assertEqual(producer.errors, 1)
+        self.assertEqual(producer.scheduler.stats()["retrying"], 0)
+        self.assertEqual(producer.attempts, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
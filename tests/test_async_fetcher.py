@@ -0,0 +1,126 @@
+import queue
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+from src.async_fetcher import AsyncFetcher
+from src.http_cache import HTTPCache
+from src.producer import Producer
+from tests.stub_server import StubHandler, StubServer
+
+
+class _Handler(StubHandler):
+    flaky_hits = 0
+
+    def do_GET(self):
+        if self.path == "/flaky" and _Handler.flaky_hits < 2:
+            _Handler.flaky_hits += 1
+            self.send_error(503)
+            return
+        if self.path == "/busy":
+            self.reply(503, headers={"Retry-After": "30"})
+            return
+        if self.path == "/missing":
+            self.send_error(404)
+            return
+        if self.path == "/image":
+            self.reply(200, b"\x89PNG", content_type="image/png")
+            return
+        self.reply(200, f"<html>{self.path}</html>".encode())
+
+
+class TestAsyncFetcher(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StubServer(_Handler).start()
+        cls.base_url = cls.server.base_url
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        _Handler.flaky_hits = 0
+
+    def fetch_all(self, fetcher, urls):
+        results = {}
+
+        async def on_result(url, html_content):
+            results[url] = html_content
+
+        fetcher.run(urls, on_result)
+        return results
+
+    def test_fetch_all(self):
+        urls = [f"{self.base_url}/page/{i}" for i in range(50)]
+        results = self.fetch_all(AsyncFetcher(max_concurrency=8), urls)
+        self.assertEqual(len(results), 50)
+        self.assertEqual(results[urls[3]], (b"<html>/page/3</html>", "utf-8", urls[3]))
+
+    def test_archive_and_cache_run_off_the_loop(self):
+        archive, cache = Mock(), HTTPCache(ttl=60)
+        threads = set()
+        archive.write_response.side_effect = lambda *args, **kwargs: threads.add(threading.current_thread())
+        urls = [f"{self.base_url}/page/{i}" for i in range(5)]
+        store = cache.store
+        with patch.object(cache, 'store', side_effect=lambda *args: threads.add(threading.current_thread())
+                          or store(*args)) as mock_store:
+            results = self.fetch_all(AsyncFetcher(cache=cache, archive=archive), urls)
+        self.assertEqual(results[urls[0]], (b"<html>/page/0</html>", "utf-8", urls[0]))
+        self.assertEqual((archive.write_response.call_count, mock_store.call_count), (5, 5))
+        self.assertTrue(threads)
+        self.assertNotIn(threading.main_thread(), threads)
+
+    def test_fetch_non_successful_status(self):
+        results = self.fetch_all(AsyncFetcher(), [f"{self.base_url}/missing"])
+        self.assertIsNone(results[f"{self.base_url}/missing"])
+
+    def test_fetch_retries_server_errors(self):
+        results = self.fetch_all(AsyncFetcher(backoff_factor=0), [f"{self.base_url}/flaky"])
+        self.assertEqual(results[f"{self.base_url}/flaky"], (b"<html>/flaky</html>", "utf-8", f"{self.base_url}/flaky"))
+        self.assertEqual(_Handler.flaky_hits, 2)
+
+    def test_fetch_skips_non_html_and_large_bodies(self):
+        urls = [f"{self.base_url}/image", f"{self.base_url}/long/enough/to/exceed/the/limit"]
+        results = self.fetch_all(AsyncFetcher(max_body_bytes=30), urls)
+        self.assertEqual(results, {url: None for url in urls})
+
+    def test_fetch_gives_up_after_total_retries(self):
+        results = self.fetch_all(AsyncFetcher(total_retries=1, backoff_factor=0), [f"{self.base_url}/flaky"])
+        self.assertIsNone(results[f"{self.base_url}/flaky"])
+
+    def test_stop_event_cancels_fetches_waiting_to_retry(self):
+        stop_event = threading.Event()
+        timer = threading.Timer(0.2, stop_event.set)
+        timer.start()
+        started = time.monotonic()
+        results = self.fetch_all(AsyncFetcher(stop_event=stop_event), [f"{self.base_url}/busy"] * 3)
+        timer.join()
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(results, {})
+
+    def test_fetch_connection_error(self):
+        results = self.fetch_all(AsyncFetcher(total_retries=0), ["http://127.0.0.1:1/"])
+        self.assertIsNone(results["http://127.0.0.1:1/"])
+
+    def test_producer_async_engine(self):
+        shared_queue = queue.Queue()
+        urls = [f"{self.base_url}/a", f"{self.base_url}/missing"]
+        producer = Producer(shared_queue, urls, engine="async")
+        producer.run()
+
+        items = []
+        while not shared_queue.empty():
+            items.append(shared_queue.get())
+        self.assertEqual(items, [(urls[0], b"<html>/a</html>", "utf-8", urls[0]), None])
+        self.assertEqual(producer.successful_fetches, 1)
+        self.assertEqual(producer.errors, 1)
+
+    def test_producer_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            Producer(queue.Queue(), [], engine="gevent")
+
+
+if __name__ == "__main__":
+    unittest.main()
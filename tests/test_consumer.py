@@ -1,7 +1,19 @@
 import queue
 import unittest
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 from src.consumer import Consumer
+from src.producer import Producer
+from tests.stub_server import StubHandler, StubServer
+
+
+class _RedirectHandler(StubHandler):
+    """Redirects /docs to /docs/, which links to a page relative to it."""
+
+    def do_GET(self):
+        if self.path == "/docs":
+            self.reply(301, headers={"Location": "/docs/"}, content_type=None)
+        else:
+            self.reply(200, b'<a href="intro">Intro</a>')
 
 
 class TestConsumer(unittest.TestCase):
@@ -14,8 +26,19 @@ class TestConsumer(unittest.TestCase):
     def test_extract_hyperlinks(self):
         html_content = '<a href="http://example.com">Example</a>'
         links = self.consumer.extract_hyperlinks(html_content, "http://test.com")
-        self.assertEqual(links, ["http://example.com"])
+        self.assertEqual(links, ["http://example.com/"])
 
+    def test_extract_hyperlinks_resolves_relative_links(self):
+        html_content = ('<base href="/docs/"><a href="intro">Intro</a><a href="../about#team">About</a>'
+                        '<a href="intro?utm_source=feed">Intro again</a><a href="#top">Top</a>')
+        links = self.consumer.extract_hyperlinks(html_content, "http://Test.com/index.html")
+        self.assertEqual(links, ["http://test.com/docs/intro", "http://test.com/about"])
+
+
+    def test_extract_hyperlinks_decodes_bytes(self):
+        html_content = '<meta charset="iso-8859-1"><a href="http://example.com/café">Café</a>'.encode('latin-1')
+        links = self.consumer.extract_hyperlinks(html_content, "http://test.com")
+        self.assertEqual(links, ["http://example.com/caf%C3%A9"])
 
     def test_extract_hyperlinks_invalid_content(self):
         with patch('src.consumer.logging.error') as mock_error:
@@ -29,21 +52,71 @@ class TestConsumer(unittest.TestCase):
         mock_print.assert_called_once()
 
 
-    @patch("src.consumer.BeautifulSoup", side_effect=Exception("Parsing error"))
-    def test_extract_hyperlinks_parsing_exception(self, mock_soup):
-        with patch('src.consumer.logging.error') as mock_error:
+    def test_extract_hyperlinks_parsing_exception(self):
+        with patch.object(self.consumer.extractor, 'extract_with_base', side_effect=Exception("Parsing error")), \
+                patch('src.consumer.logging.error') as mock_error:
             self.consumer.extract_hyperlinks("<html></html>", "http://test.com")
             mock_error.assert_called()
 
     def test_run_method(self):
         with patch.object(self.consumer, 'extract_hyperlinks', return_value=["http://example.com"]), \
                 patch.object(self.consumer, 'write_to_terminal') as mock_write:
-            self.q.put(("http://test.com", "<html></html>"))
+            self.q.put(("http://test.com", b"<html></html>", None, "http://test.com"))
             self.q.put(None)  # sentinel value to end the run loop
 
             self.consumer.run()
             mock_write.assert_called_once_with("http://test.com", ["http://example.com"])
 
+    def test_extract_hyperlinks_with_streaming_extractor(self):
+        consumer = Consumer(self.q, extractor="stream")
+        links = consumer.extract_hyperlinks('<a href="http://example.com">Example</a><a href="/x">X</a>')
+        self.assertEqual(links, ["http://example.com/"])
+
+    def test_run_pool_preserves_order(self):
+        consumer = Consumer(self.q, processes=2, batch_size=3)
+        for i in range(10):
+            self.q.put((f"http://test.com/{i}", f'<a href="http://example.com/{i}">{i}</a>'.encode(), "utf-8",
+                        f"http://test.com/{i}"))
+        self.q.put(None)
+
+        with patch.object(consumer, 'write_to_terminal') as mock_write:
+            consumer.run()
+
+        self.assertEqual([c.args for c in mock_write.call_args_list],
+                         [(f"http://test.com/{i}", [f"http://example.com/{i}"]) for i in range(10)])
+
+    def test_run_pool_unordered(self):
+        consumer = Consumer(self.q, processes=2, batch_size=2, ordered=False, extractor="stream")
+        for i in range(5):
+            self.q.put((f"http://test.com/{i}", b"<html></html>", None, f"http://test.com/{i}"))
+        self.q.put(None)
+
+        with patch.object(consumer, 'write_to_terminal') as mock_write:
+            consumer.run()
+
+        self.assertCountEqual([c.args[0] for c in mock_write.call_args_list],
+                              [f"http://test.com/{i}" for i in range(5)])
+
+    def test_relative_links_resolve_against_the_redirected_url(self):
+        with StubServer(_RedirectHandler) as server:
+            for engine in Producer.ENGINES:
+                shared_queue, archive = queue.Queue(), Mock()
+                Producer(shared_queue, [f"{server.base_url}/docs"], engine=engine, archive=archive).run()
+                consumer = Consumer(shared_queue)
+                with patch.object(consumer, 'write_to_terminal') as mock_write:
+                    consumer.run()
+                mock_write.assert_called_once_with(f"{server.base_url}/docs", [f"{server.base_url}/docs/intro"])
+                self.assertEqual(archive.write_response.call_args.args[0], f"{server.base_url}/docs/", engine)
+
+    def test_run_pool_stops_on_stop_event(self):
+        consumer = Consumer(self.q, processes=2)
+        consumer.stop()
+
+        with patch.object(consumer, 'write_to_terminal') as mock_write:
+            consumer.run()
+
+        mock_write.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
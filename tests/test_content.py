@@ -0,0 +1,35 @@
+import unittest
+from src.content import check_response, decode_html, parse_content_type, sniff_meta_charset
+
+
+class TestContent(unittest.TestCase):
+
+    def test_parse_content_type(self):
+        self.assertEqual(parse_content_type('Text/HTML; charset="UTF-8"'), ("text/html", "utf-8"))
+        self.assertEqual(parse_content_type("text/html; charset=ISO-8859-1"), ("text/html", "cp1252"))
+        self.assertEqual(parse_content_type("text/html; charset=bogus"), ("text/html", None))
+        self.assertEqual(parse_content_type(None), (None, None))
+
+    def test_check_response(self):
+        self.assertEqual(check_response("u", {"Content-Type": "text/html; charset=utf-8"}), (True, "utf-8"))
+        self.assertEqual(check_response("u", {}), (True, None))
+        self.assertEqual(check_response("u", {"Content-Type": "image/png"}), (False, None))
+        self.assertEqual(check_response("u", {"Content-Length": "100"}, max_body_bytes=99), (False, None))
+
+    def test_sniff_meta_charset(self):
+        self.assertEqual(sniff_meta_charset(b'<head><meta charset="Shift_JIS">'), "shift_jis")
+        self.assertEqual(sniff_meta_charset(
+            b'<meta http-equiv="Content-Type" content="text/html; charset=windows-1251">'), "cp1251")
+        self.assertIsNone(sniff_meta_charset(b" " * 1024 + b'<meta charset="utf-8">'))
+
+    def test_decode_html(self):
+        text = "<p>café</p>"
+        self.assertEqual(decode_html(text.encode("utf-8")), text)
+        self.assertEqual(decode_html(text.encode("cp1252")), text)
+        self.assertEqual(decode_html(text.encode("utf-16-le"), "utf-16-le"), text)
+        self.assertEqual(decode_html(b"\xef\xbb\xbf" + text.encode("utf-8"), "cp1252"), text)
+        self.assertEqual(decode_html(text), text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import queue
+import socket
+import threading
+import unittest
+from unittest.mock import patch
+from src.dns_cache import DNSCache, prefetching
+from src.producer import Producer
+from tests.stub_server import StubHandler, StubServer
+
+
+class _Handler(StubHandler):
+
+    def do_GET(self):
+        self.reply(200, f"<html>{self.headers['Host']}</html>".encode())
+
+
+class StubResolver:
+    """Resolves the names it was given, counting lookups, and fails for any other name."""
+
+    def __init__(self, hosts, delay=None):
+        self.hosts = hosts
+        self.delay = delay
+        self.lookups = []
+        self.lock = threading.Lock()
+
+    def __call__(self, host, port, family=0, type=0):
+        with self.lock:
+            self.lookups.append(host)
+        if self.delay is not None:
+            self.delay.wait(5)
+        if host not in self.hosts:
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, 0)) for address in self.hosts[host]]
+
+
+class TestDNSCache(unittest.TestCase):
+
+    def test_hit_and_expiry(self):
+        resolver = StubResolver({"a.test": ["10.0.0.1", "10.0.0.2", "10.0.0.1"]})
+        cache = DNSCache(ttl=60, resolver=resolver)
+        with patch('src.dns_cache.time.monotonic', return_value=1000.0) as clock:
+            self.assertEqual(cache.resolve("a.test"), [(socket.AF_INET, "10.0.0.1"), (socket.AF_INET, "10.0.0.2")])
+            cache.resolve("a.test")
+            clock.return_value = 1061.0
+            cache.resolve("a.test")
+        self.assertEqual(resolver.lookups, ["a.test", "a.test"])
+        self.assertEqual(cache.stats(), {"hits": 1, "negative_hits": 0, "misses": 2, "prefetches": 0, "failures": 0,
+                                         "hosts": 1})
+
+    def test_negative_caching(self):
+        resolver = StubResolver({})
+        cache = DNSCache(negative_ttl=30, resolver=resolver)
+        with patch('src.dns_cache.time.monotonic', return_value=1000.0) as clock:
+            for _ in range(3):
+                with self.assertRaises(socket.gaierror) as raised:
+                    cache.resolve("missing.test")
+                self.assertEqual(raised.exception.errno, socket.EAI_NONAME)
+            clock.return_value = 1031.0
+            self.assertRaises(socket.gaierror, cache.resolve, "missing.test")
+        self.assertEqual(resolver.lookups, ["missing.test", "missing.test"])
+        self.assertEqual((cache.stats()["negative_hits"], cache.stats()["failures"]), (2, 2))
+
+    def test_concurrent_lookups_share_one_resolution(self):
+        release = threading.Event()
+        resolver = StubResolver({"a.test": ["10.0.0.1"]}, delay=release)
+        cache = DNSCache(resolver=resolver)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.resolve("a.test"))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(resolver.lookups, ["a.test"])
+        self.assertEqual(len(results), 4)
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (3, 1))
+
+    def test_prefetching_resolves_hosts_ahead(self):
+        resolver = StubResolver({"a.test": ["10.0.0.1"], "b.test": ["10.0.0.2"]})
+        cache = DNSCache(resolver=resolver)
+        urls = ["http://a.test/1", "http://b.test:8080/", "http://a.test/2", "http://10.0.0.3/"]
+        pulled = prefetching(iter(urls), cache, ahead=2)
+        self.assertEqual(next(pulled), urls[0])
+        cache.executor.shutdown(wait=True)
+        self.assertEqual(sorted(resolver.lookups), ["a.test", "b.test"])
+        self.assertEqual(cache.resolve("b.test"), [(socket.AF_INET, "10.0.0.2")])
+        self.assertEqual(list(pulled), urls[1:])
+        self.assertEqual(cache.stats(), {"hits": 1, "negative_hits": 0, "misses": 0, "prefetches": 2, "failures": 0,
+                                         "hosts": 2})
+
+    def test_producer_resolves_through_cache(self):
+        with StubServer(_Handler) as server:
+            port = server.port
+            for engine in Producer.ENGINES:
+                resolver = StubResolver({"site.test": ["127.0.0.1"]})
+                cache = DNSCache(resolver=resolver)
+                shared_queue = queue.Queue()
+                urls = [f"http://site.test:{port}/{i}" for i in range(6)] + [f"http://missing.test:{port}/"]
+                producer = Producer(shared_queue, urls, max_threads=3, cache_size=0, engine=engine, max_retries=0,
+                                    dns_cache=cache)
+                producer.run()
+                cache.close()
+                pages = {}
+                while (item := shared_queue.get()) is not None:
+                    pages[item[0]] = item[1]
+                self.assertEqual((producer.successful_fetches, producer.errors), (6, 1), engine)
+                self.assertEqual(pages[urls[0]], f"<html>site.test:{port}</html>".encode())
+                self.assertEqual(sorted(resolver.lookups), ["missing.test", "site.test"], engine)
+
+
+if __name__ == "__main__":
+    unittest.main()
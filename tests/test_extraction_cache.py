@@ -0,0 +1,66 @@
+import queue
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.consumer import Consumer
+from src.extraction_cache import HREF_OVERHEAD, ExtractionCache
+
+PAGE = b'<base href="/dir/"><a href="a">a</a><a href="http://b.com/">b</a>'
+
+
+class TestExtractionCache(unittest.TestCase):
+
+    def test_lru_eviction_and_stats(self):
+        cache = ExtractionCache("stream:1", max_bytes=2 * (2 * HREF_OVERHEAD + 1))
+        keys = [cache.key(f"<a href='{i}'>".encode()) for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.put(key, [str(i)], None)
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertEqual(cache.get(keys[2]), (("2",), None))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "evictions": 1, "entries": 2,
+                                         "bytes": 2 * (2 * HREF_OVERHEAD + 1)})
+
+    def test_key_depends_on_body_encoding_and_backend(self):
+        cache = ExtractionCache("stream:1")
+        self.assertEqual(cache.key(PAGE), cache.key(PAGE))
+        self.assertNotEqual(cache.key(PAGE), cache.key(PAGE, "cp1252"))
+        self.assertNotEqual(cache.key(PAGE), cache.key(PAGE + b" "))
+        self.assertNotEqual(cache.key(PAGE), ExtractionCache("stream:2").key(PAGE))
+
+    def test_persists_across_instances(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ExtractionCache("stream:1", max_bytes=0, directory=directory)
+            cache.put(cache.key(PAGE), ["a", "b"], "/dir/")
+            cache.close()
+            cache = ExtractionCache("stream:1", directory=directory)
+            self.assertEqual(cache.get(cache.key(PAGE)), (("a", "b"), "/dir/"))
+            self.assertEqual(cache.stats()["entries"], 1)
+            cache.close()
+
+    def test_consumer_parses_identical_bodies_once(self):
+        consumer = Consumer(None, extractor="stream")
+        extract = consumer.extractor.extract_with_base
+        with patch.object(consumer.extractor, 'extract_with_base', wraps=extract) as spy, \
+                patch('src.consumer.EXTRACTION_CACHE_HITS') as hits, \
+                patch('src.consumer.EXTRACTION_CACHE_MISSES') as misses:
+            first = consumer.extract_hyperlinks(PAGE, "http://a.com/x")
+            second = consumer.extract_hyperlinks(PAGE, "http://c.com/y")
+        spy.assert_called_once()
+        self.assertEqual(first, ["http://a.com/dir/a", "http://b.com/"])
+        self.assertEqual(second, ["http://c.com/dir/a", "http://b.com/"])
+        self.assertEqual((hits.inc.call_count, misses.inc.call_count), (1, 1))
+
+    def test_pool_reports_cache_hits(self):
+        shared_queue = queue.Queue()
+        for i in range(4):
+            shared_queue.put((f"http://a.com/{i}", PAGE, None, f"http://a.com/{i}"))
+        shared_queue.put(None)
+        consumer = Consumer(shared_queue, processes=2, batch_size=4, extractor="stream")
+        self.assertIsNone(consumer.extraction_cache)
+        with patch.object(consumer, 'write_to_terminal'), patch('src.consumer.EXTRACTION_CACHE_HITS') as hits:
+            consumer.run()
+        self.assertEqual(hits.inc.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
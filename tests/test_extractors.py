@@ -0,0 +1,63 @@
+import glob
+import os
+import unittest
+from src.extractors import EXTRACTORS, get_extractor, StreamingExtractor
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "fixtures", "html", "*.html")))
+
+
+def read_fixture(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+class TestExtractors(unittest.TestCase):
+
+    def test_backends_agree_on_fixtures(self):
+        self.assertTrue(FIXTURES)
+        for path in FIXTURES:
+            html_content = read_fixture(path)
+            expected = get_extractor("soup").extract_with_base(html_content)
+            for name in EXTRACTORS:
+                with self.subTest(fixture=os.path.basename(path), backend=name):
+                    self.assertEqual(get_extractor(name).extract_with_base(html_content), expected)
+
+    def test_streaming_extractor(self):
+        html_content = read_fixture(os.path.join(os.path.dirname(__file__), "fixtures", "html", "malformed.html"))
+        self.assertEqual(StreamingExtractor().extract(html_content), [
+            "http://example.com/upper",
+            "http://example.com/unclosed",
+            "http://example.com/in-p",
+            "http://example.com/self-closing",
+            "http://example.com/second",
+        ])
+
+    def test_streaming_extractor_skips_script_and_comments(self):
+        html_content = read_fixture(os.path.join(os.path.dirname(__file__), "fixtures", "html", "scripts.html"))
+        links = StreamingExtractor().extract(html_content)
+        self.assertNotIn("http://example.com/in-script", links)
+        self.assertNotIn("http://example.com/in-comment", links)
+        self.assertIn("http://example.com/after-comment", links)
+
+    def test_extract_with_base(self):
+        html_content = read_fixture(os.path.join(os.path.dirname(__file__), "fixtures", "html", "mixed.html"))
+        for name in EXTRACTORS:
+            with self.subTest(backend=name):
+                hrefs, base_href = get_extractor(name).extract_with_base(html_content)
+                self.assertEqual(base_href, "http://example.com/base/")
+                self.assertIn("#top", hrefs)
+                self.assertIn("mailto:someone@example.com", hrefs)
+                self.assertNotIn("http://example.com/style.css", hrefs)
+
+    def test_get_extractor_unknown(self):
+        with self.assertRaises(ValueError):
+            get_extractor("regex")
+
+    def test_invalid_content_raises(self):
+        for name in EXTRACTORS:
+            with self.subTest(backend=name), self.assertRaises(Exception):
+                get_extractor(name).extract(None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import queue
+import threading
+import unittest
+from unittest.mock import patch
+from src.consumer import Consumer
+from src.frontier import Frontier, domain_of
+from src.producer import Producer
+from tests.stub_server import StubHandler, StubServer
+
+
+class _TreeHandler(StubHandler):
+    """Serves /N pages linking to /2N, /2N+1 and an external site."""
+
+    def do_GET(self):
+        n = int(self.path.strip("/") or 1)
+        base = "http://%s:%d" % self.server.server_address[:2]
+        body = (f'<a href="{base}/{2 * n}">a</a><a href="{base}/{2 * n + 1}#frag">b</a>'
+                f'<a href="http://elsewhere.example/{n}">c</a>').encode()
+        self.reply(200, body)
+
+
+class TestFrontier(unittest.TestCase):
+
+    def test_domain_of(self):
+        self.assertEqual(domain_of("www.example.com:8080"), "example.com")
+        self.assertEqual(domain_of("[::1]:8080"), "[::1]")
+
+    def test_seeds_are_canonicalised_and_deduped(self):
+        frontier = Frontier(["HTTP://Example.com:80", "http://example.com/", "ftp://x.com"], max_depth=0)
+        urls = []
+        for url in frontier:
+            urls.append(url)
+            frontier.mark_done(url)
+        self.assertEqual(urls, ["http://example.com/"])
+
+    def test_depth_limit_and_scope(self):
+        frontier = Frontier(["http://a.com/"], max_depth=1)
+        it = iter(frontier)
+        seed = next(it)
+        frontier.add_links(seed, ["http://a.com/1", "http://sub.a.com/2", "http://b.com/3", "http://a.com/1#x"])
+        children = [next(it), next(it)]
+        self.assertEqual(children, ["http://a.com/1", "http://sub.a.com/2"])
+        for child in children:
+            frontier.add_links(child, ["http://a.com/deeper"])
+        self.assertEqual(list(it), [])
+        self.assertEqual(frontier.stats()["discovered"], 2)
+
+    def test_allowed_domains(self):
+        frontier = Frontier(["http://a.com/"], max_depth=1, same_domain=False, allowed_domains=["b.com"])
+        self.assertTrue(frontier.in_scope("http://www.b.com/x"))
+        self.assertFalse(frontier.in_scope("http://a.com/x"))
+
+    def test_page_budget(self):
+        frontier = Frontier(["http://a.com/"], max_depth=5, max_pages=3)
+        it = iter(frontier)
+        frontier.add_links(next(it), [f"http://a.com/{i}" for i in range(10)])
+        self.assertEqual(frontier.stats()["admitted"], 3)
+
+    def test_seen_set_holds_the_configured_capacity(self):
+        links = [f"http://a.com/{i}" for i in range(20000)]
+        for options in ({"max_pages": len(links) + 1}, {"expected_urls": 1000}):
+            frontier = Frontier(["http://a.com/"], max_depth=1, **options)
+            frontier.add_links(next(iter(frontier)), links)
+            # At a 0.01% false-positive rate, hardly any new link may be mistaken for a seen one.
+            self.assertGreaterEqual(frontier.stats()["admitted"], len(links) - 5, options)
+            self.assertLess(frontier.seen.false_positive_rate(), 1.1e-4, options)
+
+    def test_iteration_waits_for_in_flight_pages(self):
+        frontier = Frontier(["http://a.com/"], max_depth=1)
+        it = iter(frontier)
+        seed = next(it)
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(next(it, None)))
+        waiter.start()
+        waiter.join(0.1)
+        self.assertTrue(waiter.is_alive())
+        frontier.add_links(seed, ["http://a.com/child"])
+        waiter.join()
+        self.assertEqual(result, ["http://a.com/child"])
+
+    def test_stop_event_ends_iteration(self):
+        stop_event = threading.Event()
+        frontier = Frontier(["http://a.com/"], stop_event=stop_event)
+        stop_event.set()
+        self.assertEqual(list(frontier), [])
+
+    def test_crawl_pipeline_terminates(self):
+        with StubServer(_TreeHandler) as server:
+            base = server.base_url
+            shared_queue = queue.Queue()
+            frontier = Frontier([f"{base}/1"], max_depth=3)
+            producer = Producer(shared_queue, [], max_threads=4, frontier=frontier)
+            consumer = Consumer(shared_queue, frontier=frontier)
+            with patch.object(consumer, 'write_to_terminal') as mock_write:
+                threads = [threading.Thread(target=producer.run), threading.Thread(target=consumer.run)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join(30)
+
+        self.assertFalse(any(t.is_alive() for t in threads))
+        crawled = sorted(int(c.args[0].rsplit("/", 1)[1]) for c in mock_write.call_args_list)
+        self.assertEqual(crawled, list(range(1, 16)))
+        self.assertEqual(frontier.stats()["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
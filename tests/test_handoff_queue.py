@@ -0,0 +1,74 @@
+import queue
+import threading
+import unittest
+from src.handoff_queue import HandoffQueue, item_size
+from src.producer import Producer
+
+
+class TestHandoffQueue(unittest.TestCase):
+
+    def test_item_size(self):
+        self.assertEqual(item_size(("http://a.com", "<html>")), 18)
+        self.assertEqual(item_size(None), 0)
+
+    def test_fifo_order(self):
+        q = HandoffQueue()
+        for i in range(3):
+            q.put(("u", str(i)))
+        self.assertEqual([q.get()[1] for _ in range(3)], ["0", "1", "2"])
+
+    def test_put_blocks_on_byte_budget(self):
+        q = HandoffQueue(max_bytes=10, sizeof=lambda item: len(item))
+        q.put("aaaaaa")
+        with self.assertRaises(queue.Full):
+            q.put("bbbbbb", timeout=0.05)
+        q.get()
+        q.put("bbbbbb", timeout=0.05)
+        self.assertEqual(q.qsize(), 1)
+
+    def test_put_blocks_on_item_count(self):
+        q = HandoffQueue(max_items=1)
+        q.put(("u", "a"))
+        with self.assertRaises(queue.Full):
+            q.put_nowait(("u", "b"))
+
+    def test_oversized_item_accepted_when_empty(self):
+        q = HandoffQueue(max_bytes=1, sizeof=lambda item: len(item))
+        q.put("too large")
+        self.assertEqual(q.get(), "too large")
+
+    def test_get_timeout_raises_empty(self):
+        with self.assertRaises(queue.Empty):
+            HandoffQueue().get(timeout=0.01)
+
+    def test_no_items_lost_under_backpressure(self):
+        q = HandoffQueue(max_items=4, max_bytes=100)
+
+        def produce(worker):
+            for i in range(200):
+                q.put((f"http://{worker}.com/{i}", "x" * 30))
+
+        producers = [threading.Thread(target=produce, args=(w,)) for w in range(4)]
+        for t in producers:
+            t.start()
+        received = [q.get(timeout=5) for _ in range(800)]
+        for t in producers:
+            t.join()
+
+        self.assertEqual(len(set(url for url, _ in received)), 800)
+        stats = q.stats()
+        self.assertLessEqual(stats["high_water_bytes"], 100)
+        self.assertLessEqual(stats["high_water_items"], 4)
+        self.assertGreater(stats["blocked_puts"], 0)
+
+    def test_producer_put_gives_up_when_stopped(self):
+        q = HandoffQueue(max_items=1)
+        q.put(("u", "a"))
+        stop_event = threading.Event()
+        producer = Producer(q, [], stop_event=stop_event)
+        stop_event.set()
+        self.assertFalse(producer.put(("u", "b")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import queue
+import time
+import unittest
+import requests
+from src.http_adapter import InstrumentedHTTPAdapter
+from src.host_scheduler import HostScheduler, host_of
+from src.producer import Producer
+from tests.stub_server import StubHandler, StubServer
+
+
+class _Handler(StubHandler):
+
+    def do_GET(self):
+        self.reply(200, b"<html></html>", content_type=None)
+
+
+class TestHostScheduler(unittest.TestCase):
+
+    def test_host_of(self):
+        self.assertEqual(host_of("https://Example.com:8080/path"), "example.com:8080")
+
+    def test_round_robin_across_hosts(self):
+        scheduler = HostScheduler(max_per_host=10)
+        for url in ["http://a.com/1", "http://a.com/2", "http://a.com/3", "http://b.com/1", "http://c.com/1"]:
+            scheduler.add(url)
+        order = [scheduler.acquire(timeout=0) for _ in range(5)]
+        self.assertEqual(order, ["http://a.com/1", "http://b.com/1", "http://c.com/1",
+                                 "http://a.com/2", "http://a.com/3"])
+
+    def test_max_per_host(self):
+        scheduler = HostScheduler(max_per_host=1)
+        scheduler.add("http://a.com/1")
+        scheduler.add("http://a.com/2")
+        first = scheduler.acquire(timeout=0)
+        self.assertIsNone(scheduler.acquire(timeout=0.05))
+        scheduler.release(first)
+        self.assertEqual(scheduler.acquire(timeout=0), "http://a.com/2")
+
+    def test_min_delay(self):
+        scheduler = HostScheduler(max_per_host=5, min_delay=0.1)
+        scheduler.add("http://a.com/1")
+        scheduler.add("http://a.com/2")
+        start = time.monotonic()
+        scheduler.acquire()
+        scheduler.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_close_returns_none_once_drained(self):
+        scheduler = HostScheduler()
+        scheduler.add("http://a.com/1")
+        scheduler.close()
+        self.assertEqual(scheduler.acquire(), "http://a.com/1")
+        self.assertIsNone(scheduler.acquire(timeout=0))
+        scheduler.release("http://a.com/1")
+        self.assertIsNone(scheduler.acquire())
+
+    def test_retry_waits_without_holding_a_worker(self):
+        scheduler = HostScheduler(max_per_host=1)
+        scheduler.add("http://a.com/1")
+        scheduler.add("http://b.com/1")
+        scheduler.close()
+        url = scheduler.acquire(timeout=0)
+        scheduler.retry(url, 0.1)
+        scheduler.release(url)
+        self.assertEqual(scheduler.stats()["retrying"], 1)
+        self.assertEqual(scheduler.acquire(timeout=0), "http://b.com/1")
+        scheduler.release("http://b.com/1")
+        start = time.monotonic()
+        self.assertEqual(scheduler.acquire(), "http://a.com/1")
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        scheduler.release("http://a.com/1")
+        self.assertIsNone(scheduler.acquire())
+
+    def test_retry_can_pause_the_host(self):
+        scheduler = HostScheduler(max_per_host=5)
+        scheduler.add("http://a.com/1")
+        scheduler.add("http://a.com/2")
+        url = scheduler.acquire(timeout=0)
+        scheduler.retry(url, 0.1, pause_host=True)
+        scheduler.release(url)
+        self.assertIsNone(scheduler.acquire(timeout=0.05))
+        self.assertEqual(scheduler.acquire(timeout=1), "http://a.com/2")
+
+    def test_dispatch_counts_stay_bounded(self):
+        scheduler = HostScheduler(max_per_host=1000, max_pending=100000)
+        scheduler.TRACKED_HOSTS = 20
+        for i in range(500):
+            scheduler.add(f"http://host{i}.com/")
+            scheduler.add("http://busy.com/%d" % i)
+        scheduler.close()
+        while (url := scheduler.acquire(timeout=0)) is not None:
+            scheduler.release(url)
+        stats = scheduler.stats()
+        self.assertEqual(stats["dispatched"], 1000)
+        self.assertEqual(len(scheduler.host_dispatches), 20)
+        self.assertEqual(len(stats["top_hosts"]), HostScheduler.TOP_HOSTS)
+        self.assertEqual(next(iter(stats["top_hosts"])), "busy.com")
+
+    def test_add_blocks_when_full(self):
+        scheduler = HostScheduler(max_pending=1)
+        self.assertTrue(scheduler.add("http://a.com/1"))
+        self.assertFalse(scheduler.add("http://a.com/2", timeout=0.01))
+
+    def test_producer_run_scheduled(self):
+        with StubServer(_Handler) as server:
+            base_url = server.base_url
+            shared_queue = queue.Queue()
+            producer = Producer(shared_queue, [f"{base_url}/{i}" for i in range(20)], max_threads=4, max_per_host=2)
+            producer.run()
+
+        self.assertEqual(producer.successful_fetches, 20)
+        self.assertEqual(producer.scheduler.stats()["dispatched"], 20)
+        self.assertEqual(producer.scheduler.stats()["top_hosts"], {host_of(base_url): 20})
+        host_stats = producer.connection_reuse[host_of(base_url)]
+        self.assertEqual(host_stats["requests"], 20)
+        self.assertLessEqual(host_stats["connections"], 2)
+        self.assertGreater(host_stats["reused"], 0)
+
+    def test_connection_counts_outlive_evicted_pools(self):
+        adapter = InstrumentedHTTPAdapter(pool_connections=1)
+        with StubServer(_Handler) as server, requests.Session() as session:
+            session.mount("http://", adapter)
+            hosts = [f"127.0.0.1:{server.port}", f"localhost:{server.port}"]
+            for i in range(6):
+                session.get(f"http://{hosts[i % 2]}/{i}").close()
+            counts = adapter.connection_counts()
+        self.assertEqual(counts, {host: [3, 3] for host in hosts})
+
+
+if __name__ == "__main__":
+    unittest.main()
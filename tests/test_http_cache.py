@@ -0,0 +1,128 @@
+import tempfile
+import time
+import unittest
+from unittest.mock import patch, Mock
+from src.http_cache import HTTPCache, CachedResponse
+from src.producer import Producer
+
+
+class TestHTTPCache(unittest.TestCase):
+
+    def test_lookup_fresh_entry_is_a_hit(self):
+        cache = HTTPCache(ttl=60)
+        cache.store("http://a.com", "<html>a</html>", {})
+        body, entry = cache.lookup("http://a.com")
+        self.assertEqual(body, "<html>a</html>")
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_lookup_stale_entry_is_returned_for_revalidation(self):
+        cache = HTTPCache(ttl=0)
+        cache.store("http://a.com", "<html>a</html>", {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+        body, entry = cache.lookup("http://a.com")
+        self.assertIsNone(body)
+        self.assertEqual(entry.conditional_headers(), {
+            "If-None-Match": '"v1"',
+            "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+        })
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_memory_tier_is_bounded_by_bytes(self):
+        cache = HTTPCache(max_bytes=10)
+        cache.store("http://a.com", "aaaa", {})
+        cache.store("http://b.com", "bbbb", {})
+        cache.get("http://a.com")
+        cache.store("http://c.com", "cccc", {})
+
+        self.assertIsNotNone(cache.get("http://a.com"))
+        self.assertIsNone(cache.get("http://b.com"))
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["bytes"], 8)
+
+    def test_oversized_body_is_not_kept_in_memory(self):
+        cache = HTTPCache(max_bytes=3)
+        cache.store("http://a.com", "aaaa", {})
+        self.assertIsNone(cache.get("http://a.com"))
+
+    def test_disk_store_survives_restart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = HTTPCache(directory=directory)
+            cache.store("http://a.com", b"<html>a</html>", {"ETag": '"v1"'}, "utf-8", "http://a.com/")
+            cache.store("http://b.com/", b"<html>b</html>", {}, final_url="http://b.com/")
+            cache.close()
+
+            reopened = HTTPCache(directory=directory)
+            entry = reopened.get("http://a.com")
+            unredirected = reopened.get("http://b.com/")
+            reopened.close()
+
+        self.assertEqual(entry.body, b"<html>a</html>")
+        self.assertEqual(entry.etag, '"v1"')
+        self.assertEqual(entry.encoding, "utf-8")
+        self.assertEqual(entry.final_url, "http://a.com/")
+        self.assertIsNone(unredirected.final_url)
+
+    def test_disk_writes_are_batched(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = HTTPCache(max_bytes=0, directory=directory)
+            for url in ("http://a.com", "http://b.com"):
+                cache.store(url, b"<html></html>", {})
+            self.assertEqual(cache.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0], 0)
+            self.assertEqual(cache.get("http://a.com").body, b"<html></html>")
+            cache.close()
+
+            reopened = HTTPCache(directory=directory)
+            self.assertEqual(reopened.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0], 2)
+            reopened.close()
+
+    def test_prune_drops_stale_and_over_budget_entries(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = HTTPCache(max_bytes=0, ttl=60, directory=directory, max_disk_bytes=10, max_stale=60)
+            cache._save("http://stale.com", CachedResponse(b"ssss", expires_at=time.time() - 120))
+            for i, url in enumerate(("http://a.com", "http://b.com", "http://c.com")):
+                cache._save(url, CachedResponse(b"aaaa", expires_at=time.time() + i))
+            cache.flush()
+            cache.prune()
+            self.assertEqual(cache.stats()["pruned"], 2)
+            self.assertIsNone(cache.get("http://stale.com"))
+            self.assertIsNone(cache.get("http://a.com"))
+            self.assertIsNotNone(cache.get("http://c.com"))
+            cache.close()
+
+    def test_revalidated_extends_expiry(self):
+        cache = HTTPCache(ttl=60)
+        entry = CachedResponse("<html>a</html>", etag='"v1"', expires_at=time.time() - 1)
+        body = cache.revalidated("http://a.com", entry, {})
+        self.assertEqual(body, "<html>a</html>")
+        self.assertTrue(cache.get("http://a.com").is_fresh())
+        self.assertEqual(cache.stats()["revalidations"], 1)
+
+    @patch('requests.Session.get')
+    def test_producer_revalidates_stale_entry(self, mock_get):
+        url = 'https://www.example.com/'
+        fresh = Mock(status_code=200, url=url, headers={"ETag": '"v1"', "Content-Type": "text/html; charset=latin-1"})
+        fresh.iter_content.return_value = [b'<html></html>']
+        not_modified = Mock(status_code=304, url=url, headers={})
+        mock_get.side_effect = [fresh, not_modified]
+
+        producer = Producer(Mock(), [], cache_ttl=0)
+        self.assertEqual(producer.fetch_html_content(url), (b'<html></html>', 'cp1252', url))
+        self.assertEqual(producer.fetch_html_content(url), (b'<html></html>', 'cp1252', url))
+
+        self.assertEqual(mock_get.call_args_list[1].kwargs["headers"], {"If-None-Match": '"v1"'})
+        self.assertEqual(producer.cache.stats()["revalidations"], 1)
+
+    @patch('requests.Session.get')
+    def test_producer_serves_fresh_entry_without_request(self, mock_get):
+        mock_get.return_value = Mock(status_code=200, headers={})
+        mock_get.return_value.iter_content.return_value = [b'<html></html>']
+
+        producer = Producer(Mock(), [])
+        producer.fetch_html_content('https://www.example.com')
+        producer.fetch_html_content('https://www.example.com')
+
+        mock_get.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+CHECK = """
+import signal, sys
+handler = signal.getsignal(signal.SIGINT)
+import main, producer, consumer
+print(signal.getsignal(signal.SIGINT) is handler)
+print(" ".join(m for m in ("requests", "urllib3", "bs4", "aiohttp", "sqlite3", "http.server") if m in sys.modules))
+"""
+
+
+class TestImports(unittest.TestCase):
+
+    def test_imports_have_no_side_effects(self):
+        with tempfile.TemporaryDirectory() as cwd:
+            process = subprocess.run([sys.executable, "-c", CHECK], cwd=cwd, capture_output=True, text=True,
+                                     env={**os.environ, "PYTHONPATH": os.path.abspath(SRC)}, check=True)
+            self.assertEqual(os.listdir(cwd), [])
+        self.assertEqual(process.stdout.splitlines(), ["True", ""])
+        self.assertEqual(process.stderr, "")
+
+
+if __name__ == "__main__":
+    unittest.main()
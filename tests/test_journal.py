@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+from src.journal import EMITTED, FAILED, FETCHED, Journal, load_journal
+from src.sinks import JSONLinesSink
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "run.journal")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_latest_state_wins_and_emitted_is_final(self):
+        journal = Journal(self.path)
+        journal.fetched("http://a.com")
+        journal.failed("http://b.com")
+        journal.fetched("http://c.com")
+        journal.emitted("http://c.com")
+        journal.failed("http://c.com")
+        journal.close()
+        self.assertEqual(load_journal(self.path), {"http://a.com": FETCHED, "http://b.com": FAILED,
+                                                   "http://c.com": EMITTED})
+
+    def test_writes_in_batches(self):
+        journal = Journal(self.path, flush_records=3, flush_interval=3600)
+        journal.fetched("http://a.com")
+        journal.fetched("http://b.com")
+        self.assertEqual(os.path.getsize(self.path), 0)
+        journal.fetched("http://c.com")
+        self.assertEqual(len(load_journal(self.path)), 3)
+        journal.close()
+
+    def test_resume_appends_and_ignores_torn_line(self):
+        journal = Journal(self.path)
+        journal.emitted("http://a.com")
+        journal.close()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("E\thttp://b.c")
+        self.assertEqual(load_journal(self.path), {"http://a.com": EMITTED})
+        journal = Journal(self.path, resume=True)
+        journal.fetched("http://b.com")
+        journal.close()
+        self.assertEqual(load_journal(self.path), {"http://a.com": EMITTED, "http://b.com": FETCHED})
+
+    def test_emitted_waits_for_sink_flush(self):
+        sink = JSONLinesSink(os.path.join(self.tmpdir.name, "out.jsonl"), flush_interval=3600)
+        journal = Journal(self.path, flush_records=1, hold_emitted=True)
+        sink.on_flush = journal.release_emitted
+        sink.write("http://a.com", [])
+        journal.emitted("http://a.com")
+        journal.flush()
+        self.assertEqual(load_journal(self.path), {})
+        sink.close()
+        journal.close()
+        self.assertEqual(load_journal(self.path), {"http://a.com": EMITTED})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from src.consumer import Consumer
+from src.link_graph import LinkGraph, LinkGraphWriter
+
+PAGES = [
+    ("http://a.com/", ["http://a.com/x", "http://b.com/", "http://www.b.com/y"]),
+    ("http://a.com/x", ["http://b.com/"]),
+    ("http://b.com/", ["http://a.com/", "http://a.com/x"]),
+    ("http://c.com/", []),
+]
+
+
+class TestLinkGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "graph")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, pages, **kwargs):
+        with LinkGraphWriter(self.path, **kwargs) as writer:
+            for source_url, hyperlinks in pages:
+                writer.add(source_url, hyperlinks)
+        return writer
+
+    def test_queries_across_segments(self):
+        writer = self.write(PAGES, segment_edges=2)
+        self.assertEqual(len(writer.segments), 2)
+        with LinkGraph(self.path) as graph:
+            self.assertEqual((len(graph), graph.edges), (5, 6))
+            self.assertEqual(graph.out_links("http://a.com/"), ["http://a.com/x", "http://b.com/", "http://www.b.com/y"])
+            self.assertEqual(graph.in_links("http://b.com/"), ["http://a.com/", "http://a.com/x"])
+            self.assertEqual(graph.in_links("http://b.com/", limit=1), ["http://a.com/"])
+            self.assertEqual(graph.out_links("http://c.com/"), [])
+            self.assertEqual(graph.in_links("http://unknown.com/"), [])
+            self.assertEqual(graph.in_degree("http://a.com/x"), 2)
+
+    def test_top_linked_and_domain_counts(self):
+        self.write(PAGES)
+        with LinkGraph(self.path) as graph:
+            self.assertCountEqual(graph.top_linked(2), [("http://a.com/x", 2), ("http://b.com/", 2)])
+            self.assertEqual(graph.top_linked(10)[-1], ("http://www.b.com/y", 1))
+            self.assertEqual(graph.domain_counts(), [("a.com", 2, 3), ("b.com", 2, 3), ("c.com", 1, 0)])
+            self.assertEqual(graph.domain_counts(1), [("a.com", 2, 3)])
+
+    def test_append_drops_unflushed_work(self):
+        self.write(PAGES[:2])
+        crashed = LinkGraphWriter(self.path, segment_edges=1, append=True)
+        crashed.add("http://d.com/", ["http://b.com/"])
+        crashed.segment_edges = 10
+        crashed.add("http://e.com/", ["http://f.com/"])
+        crashed.url_file.close()
+        crashed.index_file.close()
+        with self.assertRaises(ValueError):
+            LinkGraph(self.path)
+
+        self.write(PAGES[2:], append=True)
+        with LinkGraph(self.path) as graph:
+            self.assertEqual(graph.in_links("http://b.com/"), ["http://a.com/", "http://a.com/x", "http://d.com/"])
+            self.assertEqual(graph.edges, 7)
+            self.assertIsNone(graph.node("http://f.com/"))
+            self.assertEqual(graph.in_degree("http://a.com/"), 1)
+
+    def test_consumer_builds_graph(self):
+        writer = LinkGraphWriter(self.path)
+        consumer = Consumer(None, sink=None, graph=writer)
+        consumer.write_to_terminal = lambda *args: None
+        consumer.handle_result("http://a.com/", consumer.extract_hyperlinks('<a href="/x">x</a>', "http://a.com/"))
+        writer.close()
+        with LinkGraph(self.path) as graph:
+            self.assertEqual(graph.out_links("http://a.com/"), ["http://a.com/x"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from src.links import canonicalize_url, parse_base, resolve_link, resolve_links
+
+
+class TestLinks(unittest.TestCase):
+
+    def test_canonicalize_url(self):
+        self.assertEqual(canonicalize_url("HTTP://Example.COM:80"), "http://example.com/")
+        self.assertEqual(canonicalize_url("https://example.com:8443/a/./b/../c#frag"), "https://example.com:8443/a/c")
+        self.assertEqual(canonicalize_url("http://[::1]:80/"), "http://[::1]/")
+        self.assertEqual(canonicalize_url("https://例え.jp/パス"), "https://xn--r8jz45g.jp/%E3%83%91%E3%82%B9")
+        self.assertIsNone(canonicalize_url("ftp://example.com/"))
+        self.assertIsNone(canonicalize_url("http://example.com:99999/"))
+        self.assertIsNone(canonicalize_url("http:///path"))
+
+    def test_percent_encoding_and_tracking_parameters(self):
+        self.assertEqual(canonicalize_url("http://a.com/%7euser/a b?q=%2f%41&utm_source=x&id=1&fbclid=y"),
+                         "http://a.com/~user/a%20b?q=%2FA&id=1")
+        self.assertEqual(canonicalize_url("http://a.com/100%?utm_medium=x"), "http://a.com/100%25")
+
+    def test_canonical_urls_are_unchanged(self):
+        for url in ["http://a.com/%7euser/a b?q=%2f", "https://例え.jp/パス?x=é", "http://a.com/x/../.."]:
+            canonical = canonicalize_url(url)
+            self.assertEqual(canonicalize_url(canonical), canonical)
+
+    def test_resolve_link(self):
+        base = parse_base("https://a.com/dir/page.html?q=1")
+        self.assertEqual(resolve_link("other.html", base), "https://a.com/dir/other.html")
+        self.assertEqual(resolve_link("../up", base), "https://a.com/up")
+        self.assertEqual(resolve_link("/root", base), "https://a.com/root")
+        self.assertEqual(resolve_link("?page=2", base), "https://a.com/dir/page.html?page=2")
+        self.assertEqual(resolve_link("//cdn.b.com/x", base), "https://cdn.b.com/x")
+        self.assertEqual(resolve_link(" \tsub\n/x ", base), "https://a.com/dir/sub/x")
+        for href in ["#top", "mailto:a@b.com", "javascript:void(0)", ""]:
+            self.assertIsNone(resolve_link(href, base))
+        self.assertIsNone(resolve_link("relative", None))
+
+    def test_resolve_links_uses_base_and_dedupes(self):
+        hrefs = ["a", "./a", "/x/a#frag", "http://A.com/x/a", "b?utm_campaign=z"]
+        self.assertEqual(resolve_links(hrefs, "http://a.com/x/"), ["http://a.com/x/a", "http://a.com/x/b"])
+        self.assertEqual(resolve_links(["a"], "http://a.com/x/", "/y/"), ["http://a.com/y/a"])
+        self.assertEqual(resolve_links(["a"], "http://a.com/x/", "http://b.com/z/"), ["http://b.com/z/a"])
+        self.assertEqual(resolve_links(["a", "http://b.com"], "Unknown URL"), ["http://b.com/"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+import urllib.request
+from src.metrics import Counter, Gauge, Histogram, MetricsFileWriter, MetricsRegistry, MetricsServer
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("latency_seconds", "Latency.", registry=self.registry, buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 5.0):
+            histogram.observe(value)
+        samples = {(suffix, (extra or {}).get("le")): value for suffix, extra, value in histogram.samples()}
+        self.assertEqual(samples[("_bucket", "0.1")], 1)
+        self.assertEqual(samples[("_bucket", "1.0")], 3)
+        self.assertEqual(samples[("_bucket", "+Inf")], 4)
+        self.assertEqual(samples[("_count", None)], 4)
+        self.assertAlmostEqual(samples[("_sum", None)], 6.25)
+
+    def test_render_groups_families(self):
+        Histogram("stage_seconds", "Stage time.", {"stage": "parse"}, registry=self.registry, buckets=(1.0,))
+        Histogram("stage_seconds", "Stage time.", {"stage": "output"}, registry=self.registry, buckets=(1.0,))
+        counter = Counter("pages_total", "Pages.", registry=self.registry)
+        gauge = Gauge("queue_items", "Items.", registry=self.registry)
+        counter.inc(3)
+        gauge.set(7)
+        text = self.registry.render()
+        self.assertEqual(text.count("# TYPE stage_seconds histogram"), 1)
+        self.assertIn('stage_seconds_bucket{stage="parse",le="+Inf"} 0', text)
+        self.assertIn('stage_seconds_count{stage="output"} 0', text)
+        self.assertIn("# TYPE pages_total counter\npages_total 3", text)
+        self.assertIn("queue_items 7", text)
+
+    def test_histogram_quantile(self):
+        histogram = Histogram("quantile_seconds", "Quantiles.", registry=self.registry, buckets=(1.0, 2.0))
+        self.assertIsNone(histogram.quantile(0.5))
+        for value in (0.5, 1.5, 1.5, 1.5):
+            histogram.observe(value)
+        self.assertAlmostEqual(histogram.quantile(0.25), 1.0)
+        self.assertAlmostEqual(histogram.quantile(0.5), 1 + 1 / 3)
+        histogram.observe(50.0)
+        self.assertEqual(histogram.quantile(0.99), 2.0)
+
+    def test_histogram_timer(self):
+        histogram = Histogram("timed_seconds", "Timed.", registry=self.registry)
+        with histogram.time():
+            pass
+        self.assertEqual(histogram.count, 1)
+
+    def test_server_serves_metrics(self):
+        Counter("served_total", "Served.", registry=self.registry).inc()
+        server = MetricsServer(0, registry=self.registry)
+        server.start()
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as response:
+                body = response.read().decode("utf-8")
+        finally:
+            server.stop()
+        self.assertIn("served_total 1", body)
+
+    def test_file_writer_writes_on_stop(self):
+        counter = Counter("written_total", "Written.", registry=self.registry)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "metrics.prom")
+            writer = MetricsFileWriter(path, interval=60, registry=self.registry)
+            writer.start()
+            counter.inc(2)
+            writer.stop()
+            with open(path, encoding="utf-8") as f:
+                self.assertIn("written_total 2", f.read())
+            self.assertEqual(os.listdir(tmpdir), ["metrics.prom"])
+
+
+if __name__ == '__main__':
+    unittest.main()
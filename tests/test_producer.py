@@ -12,7 +12,7 @@ class TestProducer(unittest.TestCase):
         self.mock_shared_queue.put.side_effect = self.mock_put
         self.mock_shared_queue.get.side_effect = self.mock_get
 
-    def mock_put(self, item):
+    def mock_put(self, item, block=True, timeout=None):
         self.mock_shared_queue.queue.append(item)
 
     def mock_get(self):
@@ -42,12 +42,39 @@ class TestProducer(unittest.TestCase):
     def test_fetch_html_content_success(self, mock_get):
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.text = '<html></html>'
+        mock_response.headers = {"Content-Type": "text/html; charset=utf-8"}
+        mock_response.iter_content.return_value = [b'<html>', b'</html>']
+        mock_response.url = 'https://www.example.com/'
         mock_get.return_value = mock_response
 
         producer = Producer(self.mock_shared_queue, [])
         content = producer.fetch_html_content('https://www.example.com')
-        self.assertEqual(content, '<html></html>')
+        self.assertEqual(content, (b'<html></html>', 'utf-8', 'https://www.example.com/'))
+
+    @patch('requests.Session.get')
+    def test_fetch_html_content_skips_non_html(self, mock_get):
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.headers = {"Content-Type": "application/pdf"}
+        mock_get.return_value = mock_response
+
+        producer = Producer(self.mock_shared_queue, [])
+        self.assertIsNone(producer.fetch_html_content('https://www.example.com/a.pdf'))
+        mock_response.iter_content.assert_not_called()
+
+    @patch('requests.Session.get')
+    def test_fetch_html_content_enforces_max_body_bytes(self, mock_get):
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.headers = {"Content-Type": "text/html"}
+        mock_response.iter_content.return_value = [b'x' * 6, b'x' * 6]
+        mock_get.return_value = mock_response
+
+        producer = Producer(self.mock_shared_queue, [], max_body_bytes=10)
+        self.assertIsNone(producer.fetch_html_content('https://www.example.com'))
+        mock_response.headers["Content-Length"] = "11"
+        self.assertIsNone(producer.fetch_html_content('https://www.example.com'))
+        self.assertEqual(mock_get.call_count, 2)
 
     @patch('requests.Session.get')
     def test_fetch_html_content_failure(self, mock_get):
@@ -71,14 +98,17 @@ class TestProducer(unittest.TestCase):
     def test_run(self, mock_get):
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.text = '<html></html>'
+        mock_response.headers = {}
+        mock_response.iter_content.return_value = [b'<html></html>']
         mock_get.return_value = mock_response
 
         producer = Producer(self.mock_shared_queue, ['https://www.example.com'])
+        mock_response.url = producer.url_list[0]
 
         producer.run()
 
-        self.assertTrue((producer.url_list[0], mock_response.text) in list(self.mock_shared_queue.queue))
+        self.assertTrue((producer.url_list[0], b'<html></html>', None, producer.url_list[0])
+                        in list(self.mock_shared_queue.queue))
 
 
 if __name__ == '__main__':
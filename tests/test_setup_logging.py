@@ -1,8 +1,12 @@
+import io
+import json
 import logging
 import os
+import queue
+import sys
 import unittest
 from unittest.mock import patch
-from src.log_config import setup_logging
+from src.log_config import JSONFormatter, NonBlockingQueueHandler, RateLimitFilter, setup_logging, stop_logging
 
 
 class TestSetupLogging(unittest.TestCase):
@@ -11,6 +15,7 @@ class TestSetupLogging(unittest.TestCase):
         self.log_file = "test.log"
 
     def tearDown(self):
+        stop_logging()
         # Remove the log file after tests
         try:
             os.remove(self.log_file)
@@ -38,5 +43,59 @@ class TestSetupLogging(unittest.TestCase):
         self.assertEqual(len(calls), 1)
 
 
+    def test_queue_mode_writes_on_background_thread(self):
+        setup_logging(log_filename=self.log_file, use_queue=True, json_format=True)
+        logging.info("Fetched %s", "http://example.com")
+        stop_logging()
+
+        with open(self.log_file, 'r') as f:
+            entry = json.loads(f.read().splitlines()[-1])
+        self.assertEqual(entry["message"], "Fetched http://example.com")
+        self.assertEqual(entry["level"], "INFO")
+        self.assertEqual(entry["thread"], "MainThread")
+
+    def test_json_formatter_includes_exception(self):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.LogRecord("root", logging.ERROR, __file__, 1, "failed", None, sys.exc_info())
+        entry = json.loads(JSONFormatter().format(record))
+        self.assertIn("ValueError: boom", entry["exc_info"])
+
+    def test_rate_limit_filter_suppresses_repeats(self):
+        rate_filter = RateLimitFilter(rate=0.0001, burst=2)
+
+        def record(lineno, level=logging.WARNING):
+            return logging.LogRecord("root", level, __file__, lineno, "Queue is empty.", None, None)
+
+        self.assertEqual([rate_filter.filter(record(10)) for _ in range(5)], [True, True, False, False, False])
+        self.assertTrue(rate_filter.filter(record(11)))
+        self.assertTrue(rate_filter.filter(record(10, logging.ERROR)))
+        self.assertEqual(rate_filter.suppressed, 3)
+
+        rate_filter.rate = 1e9
+        resumed = record(10)
+        self.assertTrue(rate_filter.filter(resumed))
+        self.assertIn("(3 similar messages suppressed)", resumed.getMessage())
+
+    def test_rate_limit_applies_to_child_loggers(self):
+        for use_queue in (False, True):
+            with self.subTest(use_queue=use_queue), patch('sys.stderr', new_callable=io.StringIO) as console:
+                setup_logging(log_filename=self.log_file, use_queue=use_queue, rate_limit=1.0)
+                for _ in range(20):
+                    logging.getLogger("urllib3.connectionpool").warning("Connection pool is full")
+                stop_logging()
+                with open(self.log_file, 'r') as f:
+                    written = f.read().count("Connection pool is full")
+                os.remove(self.log_file)
+                self.assertEqual((written, console.getvalue().count("Connection pool is full")), (2, 2))
+
+    def test_queue_handler_drops_instead_of_blocking(self):
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        for _ in range(3):
+            handler.handle(logging.LogRecord("root", logging.INFO, __file__, 1, "msg", None, None))
+        self.assertEqual(handler.dropped, 2)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
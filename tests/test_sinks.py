@@ -0,0 +1,103 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from src.consumer import Consumer
+from src.sinks import ColumnarSink, CSVSink, JSONLinesSink, open_sink, read_columnar
+
+RECORDS = [
+    ("http://a.com", ["http://x.com/1", "http://x.com/2"]),
+    ("http://b.com", []),
+    ("http://c.com/ünïcode", ["http://y.com/,comma\"quote"]),
+]
+
+
+class TestSinks(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def write_records(self, sink):
+        with sink:
+            for source_url, hyperlinks in RECORDS:
+                sink.write(source_url, hyperlinks)
+
+    def test_jsonl_sink(self):
+        self.write_records(JSONLinesSink(self.path("out.jsonl")))
+        with open(self.path("out.jsonl"), encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(rows, [{"url": url, "links": links} for url, links in RECORDS])
+
+    def test_csv_sink(self):
+        self.write_records(CSVSink(self.path("out.csv")))
+        with open(self.path("out.csv"), encoding="utf-8", newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows, [["source_url", "link"], ["http://a.com", "http://x.com/1"],
+                                ["http://a.com", "http://x.com/2"], ["http://c.com/ünïcode", 'http://y.com/,comma"quote']])
+
+    def test_columnar_sink_round_trip_across_blocks(self):
+        sink = ColumnarSink(self.path("out.wlx"), flush_bytes=1)
+        self.write_records(sink)
+        self.assertEqual(sink.flushes, 3)
+        self.assertEqual(list(read_columnar(self.path("out.wlx"))), RECORDS)
+
+    def test_compression(self):
+        self.write_records(JSONLinesSink(self.path("out.jsonl.gz"), compression="gzip"))
+        with gzip.open(self.path("out.jsonl.gz"), "rt", encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+    def test_csv_append_writes_header_once(self):
+        self.write_records(CSVSink(self.path("out.csv")))
+        self.write_records(CSVSink(self.path("out.csv"), append=True))
+        with open(self.path("out.csv"), encoding="utf-8", newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows.count(["source_url", "link"]), 1)
+
+    def test_buffers_until_flush_threshold(self):
+        sink = JSONLinesSink(self.path("out.jsonl"), flush_bytes=1024 * 1024, flush_interval=3600)
+        sink.write(*RECORDS[0])
+        self.assertEqual(os.path.getsize(self.path("out.jsonl")), 0)
+        sink.close()
+        self.assertGreater(os.path.getsize(self.path("out.jsonl")), 0)
+
+    def test_flush_interval_is_enforced_without_new_records(self):
+        sink = JSONLinesSink(self.path("out.jsonl"), flush_bytes=1024 * 1024, flush_interval=0.05)
+        flushed = threading.Event()
+        sink.on_flush = flushed.set
+        sink.write(*RECORDS[0])
+        self.assertTrue(flushed.wait(5))
+        self.assertGreater(os.path.getsize(self.path("out.jsonl")), 0)
+        sink.close()
+        self.assertFalse(sink.flusher.is_alive())
+
+    def test_open_sink_picks_format_from_extension(self):
+        for name, cls in [("a.csv", CSVSink), ("a.wlx.gz", ColumnarSink), ("a.txt", JSONLinesSink)]:
+            sink = open_sink(self.path(name))
+            sink.close()
+            self.assertIsInstance(sink, cls)
+        with self.assertRaises(ValueError):
+            open_sink(self.path("a.out"), format="xml")
+
+    def test_consumer_writes_to_sink(self):
+        sink = JSONLinesSink(self.path("out.jsonl"))
+        consumer = Consumer(None, sink=sink)
+        with patch.object(consumer, 'write_to_terminal') as mock_write:
+            consumer.handle_result("http://a.com", ["http://x.com"])
+        sink.close()
+        mock_write.assert_not_called()
+        self.assertEqual(sink.records, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
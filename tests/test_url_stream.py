@@ -0,0 +1,96 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock, patch
+from src.producer import Producer
+from src.url_stream import BloomFilter, ScalableBloomFilter, expected_url_count, normalize_url, open_lines, stream_urls
+
+
+class TestUrlStream(unittest.TestCase):
+
+    def test_open_lines_is_lazy_and_skips_blank_lines(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write("https://a.com\n\n  https://b.com  \n")
+        try:
+            lines = open_lines(f.name)
+            self.assertEqual(next(lines), "https://a.com")
+            self.assertEqual(list(lines), ["https://b.com"])
+        finally:
+            os.remove(f.name)
+
+    def test_open_lines_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            open_lines("does-not-exist.txt")
+
+    def test_normalize_url(self):
+        self.assertEqual(normalize_url("https://www.example.com"), "https://www.example.com")
+        self.assertIsNone(normalize_url("javascript:alert(1)"))
+        self.assertIsNone(normalize_url("https:/www.example.com"))
+
+    def test_bloom_filter(self):
+        seen = BloomFilter(capacity=1000, error_rate=0.001)
+        self.assertTrue(seen.add("https://a.com"))
+        self.assertFalse(seen.add("https://a.com"))
+        self.assertIn("https://a.com", seen)
+        self.assertNotIn("https://b.com", seen)
+        self.assertEqual(len(seen), 1)
+
+    def test_bloom_filter_false_positive_rate(self):
+        seen = BloomFilter(capacity=10000, error_rate=0.01)
+        for i in range(10000):
+            seen.add(f"https://example.com/{i}")
+        false_positives = sum(f"https://other.com/{i}" in seen for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_scalable_bloom_filter_keeps_its_rate_past_capacity(self):
+        seen = ScalableBloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(20000):
+            seen.add(f"https://example.com/{i}")
+        self.assertEqual(len(seen.stages), 5)
+        self.assertGreater(len(seen), 19800)
+        self.assertLess(seen.false_positive_rate(), 0.01)
+        false_positives = sum(f"https://other.com/{i}" in seen for i in range(20000))
+        self.assertLess(false_positives, 200)
+
+    def test_expected_url_count(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write("https://example.com/page\n" * 10000)
+        try:
+            self.assertGreaterEqual(expected_url_count(f.name), 10000)
+        finally:
+            os.remove(f.name)
+        self.assertEqual(expected_url_count("-", default=5), 5)
+
+    def test_stream_urls_validates_and_dedupes(self):
+        lines = iter(["https://a.com", "ftp://a.com", "https://a.com", "www.b.com", "http://c.com"])
+        with patch('src.url_stream.logging.info') as mock_info:
+            self.assertEqual(list(stream_urls(lines, seen=BloomFilter(capacity=100))),
+                             ["https://a.com", "http://c.com"])
+        self.assertEqual(mock_info.call_args[0][1], 1)
+
+    def test_producer_consumes_lazy_input_through_bounded_window(self):
+        release = threading.Event()
+        yielded = []
+
+        def urls():
+            for i in range(100):
+                yielded.append(i)
+                yield f"https://example.com/{i}"
+
+        producer = Producer(Mock(), urls(), max_threads=2)
+        with patch.object(producer, 'fetch_html_content', side_effect=lambda url: release.wait() and None):
+            runner = threading.Thread(target=producer.run_threaded)
+            runner.start()
+            release.wait(0.2)
+            in_flight = len(yielded)
+            release.set()
+            runner.join()
+
+        self.assertLessEqual(in_flight, 5)
+        self.assertEqual(len(yielded), 100)
+        self.assertEqual(producer.errors, 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
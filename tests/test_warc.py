@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, Mock
+from src.consumer import Consumer
+from src.producer import Producer
+from src.warc import WarcReader, WarcWriter, replay_ranges
+
+PAGES = [(f"http://a.com/{i}", f'<a href="/p{i}">\r\n\r\nWARC/1.1\r\n</a>'.encode() * (i + 1)) for i in range(20)]
+
+
+class TestWarc(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, pages=PAGES, **kwargs):
+        path = os.path.join(self.tmpdir.name, name)
+        with WarcWriter(path, **kwargs) as writer:
+            for url, body in pages:
+                writer.write_response(url, body, {"Content-Type": "text/html; charset=latin-1",
+                                                  "Content-Encoding": "gzip", "Content-Length": "3"})
+        return path
+
+    def test_round_trip(self):
+        for name in ("a.warc", "a.warc.gz"):
+            path = self.write(name)
+            with WarcReader(path) as reader:
+                self.assertEqual(reader.compressed, name.endswith(".gz"))
+                records = list(reader.records())
+                self.assertEqual([r.headers["warc-type"] for r in records[:2]], ["warcinfo", "response"])
+                self.assertIn(b"\r\nContent-Length: 32\r\n", records[1].block)
+                self.assertNotIn(b"Content-Encoding", records[1].block)
+                self.assertEqual(list(reader.pages()), [(url, body, "cp1252", url) for url, body in PAGES])
+
+    def test_split_covers_every_record_once(self):
+        for name in ("a.warc", "a.warc.gz"):
+            path = self.write(name)
+            with WarcReader(path) as reader:
+                ranges = reader.split(7)
+                self.assertEqual((ranges[0][0], ranges[-1][1]), (0, reader.size))
+                self.assertGreater(len(ranges), 3)
+                pages = [page for start, end in ranges for page in reader.pages(start, end)]
+            self.assertEqual([url for url, _, _, _ in pages], [url for url, _ in PAGES])
+            # One range per record, the warcinfo record included.
+            self.assertEqual(len(replay_ranges([path, path], 2, range_bytes=1)), 2 * (len(PAGES) + 1))
+
+    def test_append_truncates_partial_record(self):
+        path = self.write("a.warc", PAGES[:3])
+        with open(path, "ab") as f:
+            f.write(b"WARC/1.1\r\nWARC-Type: response\r\nContent-Length: 1000\r\n\r\n<html>")
+        with patch('src.warc.logging.warning') as mock_warning:
+            self.write("a.warc", PAGES[3:5], append=True)
+            mock_warning.assert_called_once()
+        with WarcReader(path) as reader:
+            self.assertEqual([url for url, _, _, _ in reader.pages()], [url for url, _ in PAGES[:5]])
+
+    @patch('requests.Session.get')
+    def test_producer_records_and_consumer_replays(self, mock_get):
+        mock_response = Mock(status_code=200, reason="OK", headers={"Content-Type": "text/html"})
+        mock_response.iter_content.return_value = [b'<a href="/x">x</a>']
+        mock_get.return_value = mock_response
+        path = os.path.join(self.tmpdir.name, "a.warc.gz")
+        with WarcWriter(path) as writer:
+            producer = Producer(Mock(), [], cache_size=0, archive=writer)
+            for url in ("http://a.com/", "http://b.com/"):
+                mock_response.url = url
+                producer.fetch_html_content(url)
+
+        for processes in (1, 2):
+            consumer = Consumer(None, processes=processes)
+            with patch.object(consumer, 'write_to_terminal') as mock_write:
+                consumer.run_replay([path])
+            self.assertEqual([c.args for c in mock_write.call_args_list],
+                             [("http://a.com/", ["http://a.com/x"]), ("http://b.com/", ["http://b.com/x"])])
+
+
+if __name__ == "__main__":
+    unittest.main()
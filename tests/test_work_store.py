@@ -0,0 +1,112 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from src.work_store import HashRing, LeaseFrontier, WorkStore, hash_point
+
+
+class TestHashRing(unittest.TestCase):
+
+    def test_ranges_match_node_for(self):
+        ring = HashRing(["a", "b", "c"], replicas=16)
+        for node in ("a", "b", "c"):
+            for low, high in ring.ranges_for(node):
+                self.assertEqual(ring.node_for(low), node)
+                self.assertEqual(ring.node_for(high), node)
+        covered = sum(high - low + 1 for node in "abc" for low, high in ring.ranges_for(node))
+        self.assertEqual(covered, 2 ** 32)
+
+    def test_adding_a_node_only_moves_hosts_to_it(self):
+        hosts = [hash_point(f"host{i}.example.com") for i in range(1000)]
+        before = HashRing(["a", "b", "c"])
+        after = HashRing(["a", "b", "c", "d"])
+        moved = [point for point in hosts if before.node_for(point) != after.node_for(point)]
+        self.assertTrue(all(after.node_for(point) == "d" for point in moved))
+        self.assertLess(len(moved), 400)
+
+
+class TestWorkStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "work.db")
+        self.urls = [f"http://host{h}.example.com/page{p}" for h in range(20) for p in range(5)]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_hosts_are_leased_by_one_worker(self):
+        store = WorkStore(self.path)
+        self.assertEqual(store.add_urls(self.urls), 100)
+        self.assertEqual(store.add_urls(self.urls[:10]), 0)
+        store.heartbeat("a")
+        store.heartbeat("b")
+        leased_a = store.lease("a", limit=1000)
+        leased_b = store.lease("b", limit=1000)
+        self.assertEqual(len(leased_a) + len(leased_b), 100)
+        hosts_a = {url.split("/")[2] for url in leased_a}
+        hosts_b = {url.split("/")[2] for url in leased_b}
+        self.assertFalse(hosts_a & hosts_b)
+        self.assertEqual(store.lease("a"), [])
+        store.close()
+
+    def test_expired_leases_are_reassigned(self):
+        store = WorkStore(self.path, lease_seconds=0.1)
+        store.add_urls(self.urls)
+        store.heartbeat("a")
+        store.heartbeat("b")
+        leased_a = store.lease("a", limit=1000)
+        store.lease("b", limit=1000)
+        time.sleep(0.2)
+        # Worker "a" stopped sending heartbeats, so "b" now owns the whole ring and takes over its URLs.
+        store.heartbeat("b")
+        self.assertEqual(sorted(store.lease("b", limit=1000)), sorted(leased_a))
+        self.assertEqual(store.stats()["leased"], 100)
+        store.close()
+
+    def test_complete_and_fail(self):
+        store = WorkStore(self.path, max_attempts=2)
+        store.add_urls(self.urls[:2])
+        store.heartbeat("a")
+        first, second = sorted(store.lease("a"))
+        store.complete("a", [(first, 7)])
+        store.fail("a", [second])
+        self.assertEqual(store.lease("a"), [second])
+        store.fail("a", [second])
+        self.assertEqual(store.stats(), {"pending": 0, "leased": 0, "done": 1, "failed": 1, "links": 7,
+                                         "live_workers": 1})
+        self.assertEqual(store.remaining(), 0)
+        store.close()
+
+    def test_lease_frontier_reports_back(self):
+        store = WorkStore(self.path)
+        store.add_urls(self.urls)
+        frontier = LeaseFrontier(store, worker="a", batch_size=30)
+        seen = []
+
+        def process():
+            for url in frontier:
+                seen.append(url)
+                if url.endswith("page0"):
+                    frontier.mark_done(url)
+                else:
+                    frontier.add_links(url, ["http://example.com/"])
+
+        worker = threading.Thread(target=process)
+        worker.start()
+        worker.join(timeout=10)
+        self.assertFalse(worker.is_alive())
+        frontier.close()
+        # Failed URLs are leased again until they have failed max_attempts times.
+        self.assertEqual(set(seen), set(self.urls))
+        self.assertEqual(len(seen), 80 + 20 * store.max_attempts)
+        stats = store.stats()
+        self.assertEqual(stats["done"], 80)
+        self.assertEqual(stats["failed"], 20)
+        self.assertEqual(stats["live_workers"], 0)
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()